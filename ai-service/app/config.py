@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -8,12 +9,82 @@ class Settings(BaseSettings):
 
     OPEN_AI_KEY: str
     MCP_URL: str = "http://localhost:6274/sse"
+    MCP_TRANSPORT: str = "sse"  # "sse" or "streamable-http" (e.g. http://localhost:8001/mcp)
     PORT: int = 8002  # Default port if not specified in .env
     
     # MCP connection settings
     MCP_RETRY_ATTEMPTS: int = 3
     MCP_RETRY_DELAY: int = 2  # seconds
     MCP_TIMEOUT: int = 30  # seconds
+    MCP_POOL_SIZE: int = 4  # concurrent MCP sessions
+    MCP_HEARTBEAT_INTERVAL: float = 15.0  # seconds between session pings
+    MCP_RECONNECT_MAX_DELAY: float = 30.0  # seconds, cap for reconnect backoff
+
+    # LLM backend: "ollama", "openai" (any OpenAI-compatible API) or "fake"
+    LLM_BACKEND: str = "ollama"
+    LLM_MODEL: str = "llama3.2:1b"
+    OLLAMA_URL: str = "http://localhost:11434/api/chat"
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"  # uses OPEN_AI_KEY
+
+    # Micro-batching of concurrent calls, for backends that accept batches.
+    # Only the fake backend does; Ollama and OpenAI-compatible APIs have no
+    # batch request, so for them this is a no-op (logged as a warning)
+    LLM_BATCH_ENABLED: bool = False
+    LLM_BATCH_WINDOW_MS: float = 5.0
+    LLM_BATCH_MAX_SIZE: int = 8
+
+    # LLM HTTP client settings (one pooled client per process)
+    OLLAMA_TIMEOUT: float = 120.0  # seconds
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0  # seconds
+    OLLAMA_MAX_CONNECTIONS: int = 20
+    OLLAMA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    OLLAMA_KEEPALIVE_EXPIRY: float = 30.0  # seconds
+
+    # Ollama model residency and admission control
+    OLLAMA_KEEP_ALIVE: str = "30m"  # how long Ollama keeps the model loaded after a call
+    OLLAMA_WARMUP: bool = True  # load the model during startup
+    OLLAMA_WARMUP_TIMEOUT: float = 300.0  # seconds
+    OLLAMA_MAX_CONCURRENCY: int = 4  # LLM calls in flight at once
+    OLLAMA_MAX_QUEUE: int = 32  # LLM calls allowed to wait; more get 429
+    OLLAMA_QUEUE_TIMEOUT: float = 30.0  # seconds a call may wait for a slot
+
+    # Agent tool execution
+    AGENT_TOOL_CONCURRENCY: int = 4  # parallel tool calls per model turn
+    AGENT_TOOL_TIMEOUT: float = 30.0  # seconds per tool call
+    TOOL_REFRESH_INTERVAL: float = 60.0  # seconds between list_tools checks, 0 disables
+    STARTUP_BLOCKING: bool = False  # wait for MCP tools and LLM warm-up before serving
+
+    # Conversation memory and prompt budget
+    CONVERSATION_MAX_SESSIONS: int = 1000
+    CONVERSATION_TTL: float = 3600.0  # seconds of inactivity before a conversation is forgotten
+    CONVERSATION_MAX_TOKENS: int = 8192  # estimated tokens of history kept per conversation, oldest turns dropped first
+    CONTEXT_TOKEN_BUDGET: int = 4096  # estimated tokens per LLM prompt
+    CONTEXT_TOOL_RESULT_MAX_TOKENS: int = 512  # estimated tokens kept per tool result
+
+    # Response cache for identical stand-alone prompts (opt-in)
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL: float = 30.0  # seconds
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MUTATING_TOOLS: List[str] = ["create_comment"]  # invalidate the user's entries
+
+    # Task feed: tasks joined with their comments (GET /api/v1/tasks/)
+    CORE_BASE_URL: str = "http://localhost:8000"
+    COMMENT_BASE_URL: str = "http://localhost:8003"
+    TASK_FEED_TIMEOUT: float = 10.0  # seconds per upstream request
+    TASK_FEED_MAX_CONNECTIONS: int = 50
+    TASK_FEED_LATEST_COMMENTS: int = 3  # default comments returned per task
+    TASK_FEED_CACHE_TTL: float = 0.0  # seconds an assembled page is reused, 0 disables
+    TASK_FEED_CACHE_MAX_ENTRIES: int = 1024
+
+    # Background agent jobs (POST /api/v1/chat/jobs/)
+    JOB_WORKERS: int = 4  # agent runs at once; keep at or below OLLAMA_MAX_CONCURRENCY
+    JOB_MAX_QUEUE: int = 100  # jobs allowed to wait; more get 429
+    JOB_RETENTION: float = 600.0  # seconds a finished job's result stays available
+    JOB_MAX_RETAINED: int = 1000  # finished jobs kept at most
+
+    # Logging and tracing (spans are always exported at /metrics)
+    LOG_LEVEL: str = "INFO"
+    TRACE_JSONL_PATH: Optional[str] = None  # also append every finished span here as JSON
     DJANGO_SECRET_KEY:str
     JWT_ALGORITHM:str 
 
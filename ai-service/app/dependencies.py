@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from .config import settings
 from dataclasses import dataclass
+import logging
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")  # dummy, token comes from Django
 
@@ -15,7 +16,7 @@ class User:
 def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     try:
         payload = jwt.decode(token, settings.DJANGO_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
-        print("Payload: ", payload)
+        logging.debug(f"Token payload: {payload}")
         user_id = payload.get("user_id") or payload.get("sub")  # Django SimpleJWT usually uses "user_id"
         username = payload.get("username")
         if user_id is None:
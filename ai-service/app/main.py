@@ -1,11 +1,18 @@
+import asyncio
+import logging
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from app.services import task_manager_mcp
+from app import tracing
+from app.services import jobs, llm, startup, task_feed, task_manager_mcp, tool_registry
 from app.config import settings
-from app.routes import chat
-from app.services.openai import initialise_llm
+from app.routes import chat, jobs as job_routes, tasks
+from app.services.admission import llm_admission
 from pydantic import BaseModel
 
+logging.basicConfig(level=settings.LOG_LEVEL)
+logger = logging.getLogger("App")
+
 
 class InputMessage(BaseModel):
     text: str
@@ -13,45 +20,51 @@ class InputMessage(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code (runs before app starts)
-    print(f"Starting application on port {settings.PORT}...")
-    try:
-        is_mcp_connected = await task_manager_mcp.mcp_service.connect()
-        if is_mcp_connected:
-            print("MCP Connected")
-            try:
-                tools = await task_manager_mcp.mcp_service.list_tools()
-                print("Available tools:", tools)
-                initialise_llm(tools=tools)
-                print("✅ LLM initialized with tools")
-                
-                # Store tools and mcp_service in app state for use in routes
-                app.state.tools = tools
-                app.state.mcp_service = task_manager_mcp.mcp_service
-                
-            except Exception as e:
-                print(f"Failed to list tools: {e}")
-                app.state.tools = None
-        else:
-            print("Failed to connect to MCP")
-            app.state.tools = None
-    except Exception as e:
-        print(f"Error during startup: {e}")
-        app.state.tools = None
+    logger.info(f"Starting application on port {settings.PORT}...")
+    logger.info(f"LLM backend: {llm.get_backend().name}")
+    app.state.mcp_service = task_manager_mcp.mcp_service
+
+    # MCP discovery and LLM warm-up finish in the background; /ready reports them
+    bootstrap = asyncio.create_task(startup.bootstrap())
+    if settings.STARTUP_BLOCKING:
+        # Still bounded so an unreachable MCP server cannot hang the deploy
+        await asyncio.wait({bootstrap}, timeout=settings.MCP_TIMEOUT)
+
+    # Keep the tool registry in sync with the MCP server
+    tool_watcher = None
+    if settings.TOOL_REFRESH_INTERVAL > 0:
+        tool_watcher = asyncio.create_task(
+            tool_registry.watch(
+                task_manager_mcp.mcp_service.list_tools, settings.TOOL_REFRESH_INTERVAL
+            )
+        )
     
-    print("Application startup complete")
+    # Background agent runs submitted through the job API
+    jobs.job_queue.start()
+
+    logger.info("Application startup complete")
     yield
     
     # Shutdown code (runs when app stops)
+    bootstrap.cancel()
+    if tool_watcher:
+        tool_watcher.cancel()
+    await jobs.job_queue.stop()
     try:
         await task_manager_mcp.mcp_service.close()
     except Exception as e:
-        print(f"Error during shutdown: {e}")
-    print("Application shutdown complete")
+        logger.error(f"Error during shutdown: {e}")
+    await llm.close_backend()
+    await task_feed.close_client()
+    logger.info("Application shutdown complete")
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(tracing.TracingMiddleware)
 
 app.include_router(chat.router, prefix="/api/v1")
+app.include_router(job_routes.router, prefix="/api/v1")
+app.include_router(tasks.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -59,6 +72,37 @@ def health_check():
     return {"status": "Ok", "port": settings.PORT}
 
 
+@app.get("/ready")
+def readiness_check():
+    report = startup.readiness.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/mcp/pool")
+def mcp_pool_stats():
+    return task_manager_mcp.mcp_service.stats()
+
+
+@app.get("/llm/admission")
+def llm_admission_stats():
+    return llm_admission.stats()
+
+
+@app.get("/jobs/queue")
+def job_queue_stats():
+    return jobs.job_queue.stats()
+
+
+@app.get("/tasks/cache")
+def task_feed_cache_stats():
+    return task_feed.page_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return tracing.render_metrics()
+
+
 @app.get("/config")
 def config_info():
     return {
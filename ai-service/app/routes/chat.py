@@ -1,7 +1,13 @@
 from fastapi import APIRouter, Body, Request, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+import json
 import logging
-from app.services.openai import run_agent
+from typing import Any, AsyncIterator, Dict, Optional
+from app.services import tool_registry
+from app.services.admission import LLMOverloadedError, llm_admission
+from app.services.conversations import conversation_store
+from app.services.openai import run_agent, run_agent_stream
 from app.dependencies import User, get_current_user
 
 router = APIRouter(prefix="/chat")
@@ -9,6 +15,8 @@ router = APIRouter(prefix="/chat")
 
 class InputMessage(BaseModel):
     text: str
+    # Client-chosen id; reuse it to continue a multi-turn conversation
+    conversation_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -16,30 +24,64 @@ class ChatResponse(BaseModel):
     success: bool
 
 
+async def _sse_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Format agent events as Server-Sent Events"""
+    try:
+        async for event in events:
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+    except Exception as e:
+        logging.error(f"Chat stream error: {type(e).__name__}: {str(e)}")
+        detail = json.dumps({"detail": f"Chat service error: {str(e)}"})
+        yield f"event: error\ndata: {detail}\n\n"
+
+
 @router.post("/")
-async def create_chat(request: Request, input: InputMessage = Body(),user:User = Depends(get_current_user) ):
+async def create_chat(request: Request, input: InputMessage = Body(), stream: bool = False, user:User = Depends(get_current_user) ):
     """
     Chat endpoint that uses the agent with MCP tools
+
+    With `?stream=true` the response is an SSE stream of token, tool_call,
+    tool_result and done events instead of a single JSON string.
     """
     try:
-        # Get tools from app state
-        tools = request.app.state.tools
+        # Snapshot the shared tool registry for this request
+        registry = tool_registry.current()
 
-        if tools is None:
+        if registry is None:
             raise HTTPException(
                 status_code=503,
                 detail="Tools not initialized. MCP service may not be connected.",
+                headers={"Retry-After": "1"},
             )
 
-        logging.info(f"🚀 Processing chat request: {input.text}")
+        logging.debug(f"🚀 Processing chat request: {input.text}")
+
+        conversation = None
+        if input.conversation_id:
+            conversation = conversation_store.get(user.user_id, input.conversation_id)
+
+        if stream:
+            # Refuse up front; once the stream has started we can only send an error event
+            if llm_admission.is_full:
+                raise LLMOverloadedError("LLM queue is full")
+            return StreamingResponse(
+                _sse_events(run_agent_stream(input.text, user.token, registry, conversation, user.user_id)),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
         
         # Run the agent with tool calling loop
-        result = await run_agent(input.text, user.token, tools)
+        result = await run_agent(input.text, user.token, registry, conversation, user.user_id)
 
-        logging.info(f"✅ Agent response: {result}")
+        logging.debug(f"✅ Agent response: {result}")
 
         return result
 
+    except HTTPException:
+        raise
+    except LLMOverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+from app.services import tool_registry
+from app.services.jobs import Job, JobQueueFullError, job_queue
+from app.dependencies import User, get_current_user
+
+router = APIRouter(prefix="/chat/jobs")
+
+
+class JobRequest(BaseModel):
+    text: str
+    # Client-chosen id; reuse it to continue a multi-turn conversation
+    conversation_id: Optional[str] = None
+    # Higher runs first
+    priority: int = Field(5, ge=0, le=9)
+
+
+def _job_or_404(job_id: str, user: User) -> Job:
+    job = job_queue.get(user.user_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+async def _sse_events(job: Job, after: int) -> AsyncIterator[str]:
+    """Replay the job's events from `after` on, then follow it until it finishes"""
+    async for position, event in job.follow(after):
+        data = {key: value for key, value in event.items() if key != "event"}
+        yield f"id: {position}\nevent: {event['event']}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/", status_code=202)
+async def create_job(request: Request, response: Response, input: JobRequest = Body(), user: User = Depends(get_current_user)):
+    """
+    Queue an agent run and return at once
+
+    Poll GET /chat/jobs/{id} for the result, or follow GET
+    /chat/jobs/{id}/events as Server-Sent Events.
+    """
+    if tool_registry.current() is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Tools not initialized. MCP service may not be connected.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        job = job_queue.submit(user.user_id, user.token, input.text, input.priority, input.conversation_id)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = str(request.url_for("get_job", job_id=job.id))
+    return job.summary()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, user: User = Depends(get_current_user)) -> Dict[str, Any]:
+    return _job_or_404(job_id, user).summary()
+
+
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: str,
+    user: User = Depends(get_current_user),
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    SSE stream of the job: status events (queued, running, then succeeded,
+    failed or cancelled) around the agent's token, tool_call, tool_result,
+    iteration, done and error events. Reconnect with Last-Event-ID to resume.
+    """
+    job = _job_or_404(job_id, user)
+    after = 0 if last_event_id is None else last_event_id + 1
+    return StreamingResponse(
+        _sse_events(job, after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, user: User = Depends(get_current_user)) -> Dict[str, Any]:
+    job = _job_or_404(job_id, user)
+    if not job_queue.cancel(job):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    return job.summary()
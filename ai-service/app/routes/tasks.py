@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from app.config import settings
+from app.services import task_feed
+from app.dependencies import User, get_current_user
+
+router = APIRouter(prefix="/tasks")
+
+
+@router.get("/")
+async def list_tasks_with_comments(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    comments: Optional[int] = Query(None, ge=0, le=20, description="latest comments per task"),
+    status: Optional[str] = None,
+    priority: Optional[int] = None,
+    due_before: Optional[str] = None,
+    due_after: Optional[str] = None,
+    ordering: Optional[str] = None,
+    user: User = Depends(get_current_user),
+):
+    """A page of the user's tasks, each with its comment count and latest comments"""
+    latest = settings.TASK_FEED_LATEST_COMMENTS if comments is None else comments
+    # Passed through to core-backend, which validates them
+    filters = {
+        name: str(value)
+        for name, value in (
+            ("status", status), ("priority", priority), ("due_before", due_before),
+            ("due_after", due_after), ("ordering", ordering),
+        )
+        if value is not None
+    }
+    try:
+        return await task_feed.get_page(user.user_id, user.token, page, page_size, latest, filters)
+    except task_feed.UpstreamError as e:
+        # Pass client errors (bad filter, bad token, page out of range) through; anything else is a gateway failure
+        status_code = e.status_code if e.status_code in (400, 401, 403, 404) else 502
+        raise HTTPException(status_code=status_code, detail=f"{e.service}: {e.detail}")
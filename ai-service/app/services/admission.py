@@ -0,0 +1,82 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict
+
+from app.config import settings
+
+
+class LLMOverloadedError(Exception):
+    """Raised when an LLM call is refused because the queue is full."""
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded wait queue
+
+    At most `max_concurrency` callers hold a slot at once. Up to `max_queue`
+    more may wait, each for at most `queue_timeout` seconds; anyone beyond
+    that is refused straight away with LLMOverloadedError so that excess
+    load fails fast instead of stretching everyone's latency.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def is_full(self) -> bool:
+        return self._semaphore.locked() and self.waiting >= self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.is_full:
+            self.rejected += 1
+            raise LLMOverloadedError("LLM queue is full")
+
+        self.waiting += 1
+        acquired = False
+        try:
+            # Cancels the acquire in this task, where the semaphore itself hands
+            # back a permit it was woken with; wait_for on 3.11 can leak one
+            async with asyncio.timeout(self.queue_timeout):
+                await self._semaphore.acquire()
+                acquired = True
+        except TimeoutError:
+            if acquired:
+                self._semaphore.release()
+            self.rejected += 1
+            raise LLMOverloadedError(f"Waited more than {self.queue_timeout}s for the LLM")
+        except BaseException:
+            if acquired:
+                self._semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+llm_admission = AdmissionController(
+    max_concurrency=settings.OLLAMA_MAX_CONCURRENCY,
+    max_queue=settings.OLLAMA_MAX_QUEUE,
+    queue_timeout=settings.OLLAMA_QUEUE_TIMEOUT,
+)
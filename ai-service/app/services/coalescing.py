@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Abandoned(Exception):
+    """Set on an in-flight build whose caller was cancelled, so a follower takes it over"""
+
+
+class CoalescingCache(Generic[T]):
+    """
+    Per-user TTL/LRU cache with in-flight coalescing
+
+    Keys are tuples whose first item is the user id. Entries expire after
+    `ttl` seconds and are evicted least-recently-used beyond `max_entries`.
+    Identical requests that arrive while a value is being built wait for
+    that build instead of starting their own; if the caller running it is
+    cancelled, one of them starts it again and the rest wait for that.
+    `invalidate_user` drops a user's entries and keeps builds already in
+    flight from storing values that may predate the change.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[Tuple, Tuple[float, T]]" = OrderedDict()
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+    def cacheable(self, value: T) -> bool:
+        """Whether a freshly built value may be stored; followers get it either way"""
+        return True
+
+    async def get_or_build(self, key: Tuple, build: Callable[[], Awaitable[T]]) -> T:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        pending = self._in_flight.get(key)
+        if pending:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except _Abandoned:
+                return await self.get_or_build(key, build)
+
+        self.misses += 1
+        user_id = key[0]
+        generation = self._generations.get(user_id, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await build()
+        except asyncio.CancelledError:
+            # Only this caller went away; the build is not failed for the others
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # followers re-raise it; don't warn if there are none
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+        future.set_result(value)
+        if self._generations.get(user_id, 0) == generation and self.cacheable(value):
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate_user(self, user_id: Hashable):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        for key in [k for k in self._entries if k[0] == user_id]:
+            del self._entries[key]
+        for key in [k for k in self._in_flight if k[0] == user_id]:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "ttl": self.ttl,
+        }
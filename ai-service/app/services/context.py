@@ -0,0 +1,83 @@
+import json
+from typing import Any, Dict, List
+
+# Rough size estimate; good enough to keep prompts bounded without a tokenizer
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+MIN_TOOL_RESULT_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += estimate_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(message_tokens(m) for m in messages)
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut `text` to about `max_tokens`, noting how much was dropped"""
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…[truncated {len(text) - limit} chars]"
+
+
+def fit_to_budget(
+    messages: List[Dict[str, Any]], keep_from: int, budget: int
+) -> List[Dict[str, Any]]:
+    """
+    Build a prompt from `messages` that stays under `budget` estimated tokens
+
+    messages[0] is the system prompt and messages[keep_from:] is the current
+    request (user prompt plus this run's tool rounds); both are always kept.
+    Earlier conversation turns are dropped oldest first, and if the current
+    request alone is still too large its tool results are shortened.
+
+    Args:
+        messages: Full message history for the run
+        keep_from: Index of the current user prompt
+        budget: Token budget for the prompt
+
+    Returns:
+        A new message list; `messages` is not modified
+    """
+    system, history, current = messages[:1], messages[1:keep_from], messages[keep_from:]
+
+    total = prompt_tokens(system) + prompt_tokens(current)
+    kept: List[Dict[str, Any]] = []
+    for message in reversed(history):
+        cost = message_tokens(message)
+        if total + cost > budget:
+            break
+        kept.append(message)
+        total += cost
+    kept.reverse()
+
+    dropped = len(history) - len(kept)
+    if dropped:
+        note = {
+            "role": "system",
+            "content": f"[{dropped} earlier messages omitted to fit the context budget]",
+        }
+        kept.insert(0, note)
+        total += message_tokens(note)
+
+    if total > budget:
+        tool_indexes = [i for i, m in enumerate(current) if m.get("role") == "tool"]
+        if tool_indexes:
+            tool_total = sum(message_tokens(current[i]) for i in tool_indexes)
+            room = max(budget - (total - tool_total), 0)
+            per_tool = max(room // len(tool_indexes), MIN_TOOL_RESULT_TOKENS)
+            current = list(current)
+            for i in tool_indexes:
+                current[i] = {**current[i], "content": truncate_text(current[i]["content"], per_tool)}
+
+    return system + kept + current
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+from app.services.context import prompt_tokens
+
+
+@dataclass
+class Conversation:
+    """
+    Past user/assistant turns of one chat; tool rounds are not kept.
+
+    At most `max_tokens` estimated tokens of turns are stored. Prompts are
+    trimmed again to CONTEXT_TOKEN_BUDGET at call time, so the cap only has
+    to stay above that to lose nothing a prompt could use.
+    """
+
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=time.monotonic)
+    max_tokens: int = settings.CONVERSATION_MAX_TOKENS
+
+    def add_turn(self, user_prompt: str, answer: str):
+        self.messages.append({"role": "user", "content": user_prompt})
+        self.messages.append({"role": "assistant", "content": answer})
+        # Whole turns go, oldest first; the newest is always kept
+        while len(self.messages) > 2 and prompt_tokens(self.messages) > self.max_tokens:
+            del self.messages[:2]
+
+
+class ConversationStore:
+    """Bounded LRU of conversations keyed by (user_id, conversation_id)."""
+
+    def __init__(self, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._items: "OrderedDict[Tuple[int, str], Conversation]" = OrderedDict()
+
+    def get(self, user_id: int, conversation_id: str) -> Conversation:
+        """Return the conversation, starting a new one if missing or expired"""
+        key = (user_id, conversation_id)
+        now = time.monotonic()
+
+        conversation = self._items.get(key)
+        if conversation is None or now - conversation.last_used > self.ttl:
+            conversation = Conversation()
+            self._items[key] = conversation
+
+        conversation.last_used = now
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_sessions:
+            self._items.popitem(last=False)
+        return conversation
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+conversation_store = ConversationStore(
+    max_sessions=settings.CONVERSATION_MAX_SESSIONS,
+    ttl=settings.CONVERSATION_TTL,
+)
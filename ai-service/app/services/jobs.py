@@ -0,0 +1,267 @@
+import asyncio
+import itertools
+import logging
+import secrets
+import statistics
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, List, Optional, Tuple
+
+from app import tracing
+from app.config import settings
+from app.services.conversations import conversation_store
+from app.services.openai import run_agent_stream
+
+logger = logging.getLogger("Jobs")
+
+# Job states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is refused because JOB_MAX_QUEUE jobs are already waiting"""
+
+
+@dataclass
+class Job:
+    """
+    One agent run submitted through the job API
+
+    `events` holds everything the run produced, in order: status changes and
+    the agent's token, tool_call, tool_result and iteration events, so a
+    late SSE subscriber can replay them.
+    """
+
+    id: str
+    user_id: Hashable
+    token: str
+    prompt: str
+    priority: int
+    conversation_id: Optional[str] = None
+    status: str = QUEUED
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    _updated: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def emit(self, event: Dict[str, Any]):
+        self.events.append(event)
+        # Wake current subscribers; later ones wait on the new event
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def set_status(self, status: str):
+        self.status = status
+        self.emit({"event": "status", "status": status})
+
+    async def follow(self, after: int = 0) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, event) from `after` on until the job has finished"""
+        position = after
+        while True:
+            updated = self._updated
+            while position < len(self.events):
+                yield position, self.events[position]
+                position += 1
+            if self.status in FINAL:
+                return
+            await updated.wait()
+
+    def summary(self) -> Dict[str, Any]:
+        queue_wait = (self.started_at or self.finished_at or time.time()) - self.created_at
+        run = (self.finished_at or time.time()) - self.started_at if self.started_at else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "conversation_id": self.conversation_id,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "queue_wait_ms": round(queue_wait * 1000, 1),
+            "run_ms": round(run * 1000, 1) if run is not None else None,
+        }
+
+
+class JobQueue:
+    """
+    Priority queue of agent runs drained by a fixed pool of workers
+
+    At most `workers` jobs run at once; higher `priority` runs first, and
+    jobs of equal priority run in submission order. Beyond `max_queue`
+    waiting jobs, submit raises JobQueueFullError. Finished jobs are kept
+    for `retention` seconds so their result can still be fetched, and at
+    most `max_retained` of them are kept at all.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retention: float, max_retained: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retention = retention
+        self.max_retained = max_retained
+        self.queued = 0
+        self.running = 0
+        self.rejected = 0
+        self.completed: Dict[str, int] = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._order = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._waits: Deque[float] = deque(maxlen=1000)
+        self._runs: Deque[float] = deque(maxlen=1000)
+
+    def start(self):
+        self._queue = asyncio.PriorityQueue()
+        self._workers = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self.workers)]
+        logger.info(f"🧵 Started {self.workers} job workers (max queue {self.max_queue})")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if job.status not in FINAL:
+                self._finish(job, CANCELLED, error="Service shutting down")
+
+    # ─────────────────────────────
+    def submit(
+        self, user_id: Hashable, token: str, prompt: str, priority: int, conversation_id: Optional[str] = None
+    ) -> Job:
+        if self._queue is None:
+            raise RuntimeError("Job workers are not running")
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise JobQueueFullError(f"{self.queued} jobs are already waiting")
+        self._prune()
+
+        job = Job(
+            id=secrets.token_urlsafe(12),
+            user_id=user_id,
+            token=token,
+            prompt=prompt,
+            priority=priority,
+            conversation_id=conversation_id,
+        )
+        job.set_status(QUEUED)
+        self._jobs[job.id] = job
+        self.queued += 1
+        self._queue.put_nowait((-priority, next(self._order), job))
+        return job
+
+    def get(self, user_id: Hashable, job_id: str) -> Optional[Job]:
+        """The job, if it exists and belongs to the user"""
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.user_id == user_id else None
+
+    def cancel(self, job: Job) -> bool:
+        """Cancel a queued or running job; False if it had already finished"""
+        if job.status == QUEUED:
+            # Its queue entry is skipped when a worker reaches it
+            self.queued -= 1
+            self._finish(job, CANCELLED)
+            return True
+        if job.status == RUNNING and job._task is not None:
+            job._task.cancel()
+            return True
+        return False
+
+    # ─────────────────────────────
+    async def _work(self):
+        while True:
+            _, _, job = await self._queue.get()
+            if job.status != QUEUED:
+                continue  # cancelled while waiting
+            self.queued -= 1
+            self.running += 1
+            job.started_at = time.time()
+            wait = job.started_at - job.created_at
+            self._waits.append(wait)
+            tracing.observe("job.queue_wait", wait, priority=job.priority)
+            job.set_status(RUNNING)
+            try:
+                job._task = asyncio.create_task(self._run(job))
+                # Waiting on the task instead of awaiting it keeps a job's
+                # cancellation from cancelling the worker
+                try:
+                    await asyncio.wait({job._task})
+                except asyncio.CancelledError:
+                    job._task.cancel()
+                    raise
+            finally:
+                self.running -= 1
+                job._task = None
+
+    async def _run(self, job: Job):
+        try:
+            with tracing.span("job.run", priority=job.priority):
+                conversation = None
+                if job.conversation_id:
+                    conversation = conversation_store.get(job.user_id, job.conversation_id)
+                async for event in run_agent_stream(job.prompt, job.token, None, conversation, job.user_id):
+                    job.emit(event)
+                    if event["event"] == "done":
+                        job.result = event["content"]
+                    elif event["event"] == "error":
+                        job.error = event["detail"]
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+            return
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {type(e).__name__}: {e}")
+            self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+            return
+        self._finish(job, FAILED if job.error else SUCCEEDED, error=job.error)
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        if job.status in FINAL:
+            return
+        job.finished_at = time.time()
+        job.error = error
+        if job.started_at is not None:
+            self._runs.append(job.finished_at - job.started_at)
+        self.completed[status] += 1
+        job.set_status(status)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        finished = [job for job in self._jobs.values() if job.status in FINAL]
+        excess = len(finished) - self.max_retained
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_at < cutoff:
+                del self._jobs[job.id]
+
+    def stats(self) -> Dict[str, Any]:
+        def percentiles(samples: Deque[float]) -> Dict[str, Optional[float]]:
+            if len(samples) < 2:
+                return {"p50_ms": None, "p95_ms": None}
+            cuts = statistics.quantiles(samples, n=20, method="inclusive")
+            return {"p50_ms": round(cuts[9] * 1000, 1), "p95_ms": round(cuts[18] * 1000, 1)}
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.queued,
+            "running": self.running,
+            "rejected": self.rejected,
+            "completed": dict(self.completed),
+            "queue_wait": percentiles(self._waits),
+            "run": percentiles(self._runs),
+        }
+
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_queue=settings.JOB_MAX_QUEUE,
+    retention=settings.JOB_RETENTION,
+    max_retained=settings.JOB_MAX_RETAINED,
+)
@@ -0,0 +1,474 @@
+import abc
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services.admission import AdmissionController, llm_admission
+
+logger = logging.getLogger("LLM")
+
+# Every backend speaks the agent's message format (Ollama's /api/chat shape):
+#   response: {"message": {"role", "content", "tool_calls"?}, "prompt_eval_count"?, "eval_count"?}
+#   stream chunks: the same, with "done": True on the last one
+Messages = List[Dict[str, Any]]
+Tools = Sequence[Dict[str, Any]]
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Build an LLM HTTP client with pooling and keep-alive from settings"""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            settings.OLLAMA_TIMEOUT, connect=settings.OLLAMA_CONNECT_TIMEOUT
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OLLAMA_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.OLLAMA_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+# ─────────────────────────────
+# Backend interface
+# ─────────────────────────────
+class LLMBackend(abc.ABC):
+    """Chat model used by the agent loop."""
+
+    name = "base"
+    # True if chat_batch sends a whole batch in one request
+    supports_batch = False
+
+    @abc.abstractmethod
+    async def chat(self, messages: Messages, tools: Tools) -> Dict[str, Any]:
+        """One complete response"""
+
+    @abc.abstractmethod
+    def chat_stream(self, messages: Messages, tools: Tools) -> AsyncIterator[Dict[str, Any]]:
+        """Response chunks as they arrive, implemented as an async generator"""
+
+    async def chat_batch(self, requests: List[Tuple[Messages, Tools]]) -> List[Dict[str, Any]]:
+        return list(await asyncio.gather(*(self.chat(m, t) for m, t in requests)))
+
+    async def warm_up(self):
+        """Prepare the model before the first request"""
+
+    async def aclose(self):
+        """Release connections"""
+
+
+# ─────────────────────────────
+# Ollama
+# ─────────────────────────────
+class OllamaBackend(LLMBackend):
+    name = "ollama"
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        model: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = url or settings.OLLAMA_URL
+        self.model = model or settings.LLM_MODEL
+        self.client = client or create_http_client()
+
+    def _payload(self, messages: Messages, tools: Tools, stream: bool) -> Dict[str, Any]:
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+        }
+
+        # Only include tools if they exist
+        if tools:
+            payload["tools"] = list(tools)
+
+        logger.debug(f"Ollama payload: {payload}")
+        return payload
+
+    async def chat(self, messages: Messages, tools: Tools) -> Dict[str, Any]:
+        return await self._post(self.client, self._payload(messages, tools, stream=False))
+
+    async def _post(self, client: httpx.AsyncClient, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a chat payload to Ollama, retrying without tools if unsupported"""
+        response = await client.post(self.url, json=payload)
+
+        # Check for errors
+        if response.status_code != 200:
+            error_text = response.text
+            logger.error(f"Ollama API error ({response.status_code}): {error_text}")
+
+            # If tools are not supported, try without tools
+            if "tools" in payload and response.status_code == 400:
+                logger.warning("Tools not supported, retrying without tools...")
+                payload.pop("tools", None)
+                response = await client.post(self.url, json=payload)
+
+        response.raise_for_status()
+        return response.json()
+
+    async def chat_stream(self, messages: Messages, tools: Tools) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a chat from Ollama, retrying without tools if unsupported"""
+        payload = self._payload(messages, tools, stream=True)
+        while True:
+            async with self.client.stream("POST", self.url, json=payload) as response:
+                if response.status_code != 200:
+                    error_text = (await response.aread()).decode(errors="replace")
+                    logger.error(f"Ollama API error ({response.status_code}): {error_text}")
+
+                    if "tools" in payload and response.status_code == 400:
+                        logger.warning("Tools not supported, retrying without tools...")
+                        payload.pop("tools", None)
+                        continue
+                    response.raise_for_status()
+
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+                return
+
+    async def warm_up(self):
+        """Load the model into memory and pin it for OLLAMA_KEEP_ALIVE"""
+        # A chat request without messages only loads the model
+        payload = {"model": self.model, "messages": [], "keep_alive": settings.OLLAMA_KEEP_ALIVE}
+        response = await self.client.post(
+            self.url, json=payload, timeout=settings.OLLAMA_WARMUP_TIMEOUT
+        )
+        response.raise_for_status()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ─────────────────────────────
+# OpenAI-compatible (/v1/chat/completions)
+# ─────────────────────────────
+def to_openai_messages(messages: Messages) -> Messages:
+    """
+    Convert agent messages to the OpenAI chat format
+
+    Assistant tool calls get ids (if the model did not supply them) and
+    JSON-encoded arguments; each following tool message is linked to the
+    next call id in order, which matches how the agent appends results.
+    """
+    converted: Messages = []
+    pending_ids: List[str] = []
+    for index, message in enumerate(messages):
+        if message.get("role") == "assistant" and message.get("tool_calls"):
+            calls = []
+            for n, call in enumerate(message["tool_calls"]):
+                function = call.get("function", {})
+                arguments = function.get("arguments", {})
+                calls.append({
+                    "id": call.get("id") or f"call_{index}_{n}",
+                    "type": "function",
+                    "function": {
+                        "name": function.get("name"),
+                        "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments),
+                    },
+                })
+            pending_ids = [c["id"] for c in calls]
+            converted.append({"role": "assistant", "content": message.get("content") or None, "tool_calls": calls})
+        elif message.get("role") == "tool":
+            tool_call_id = pending_ids.pop(0) if pending_ids else f"call_{index}"
+            converted.append({"role": "tool", "tool_call_id": tool_call_id, "content": message.get("content", "")})
+        else:
+            converted.append({"role": message["role"], "content": message.get("content", "")})
+    return converted
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    name = "openai"
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.url = f"{(base_url or settings.OPENAI_BASE_URL).rstrip('/')}/chat/completions"
+        self.model = model or settings.LLM_MODEL
+        self.headers = {"Authorization": f"Bearer {api_key or settings.OPEN_AI_KEY}"}
+        self.client = client or create_http_client()
+
+    def _payload(self, messages: Messages, tools: Tools, stream: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "messages": to_openai_messages(messages),
+            "stream": stream,
+        }
+        if tools:
+            payload["tools"] = list(tools)
+        if stream:
+            payload["stream_options"] = {"include_usage": True}
+        return payload
+
+    async def chat(self, messages: Messages, tools: Tools) -> Dict[str, Any]:
+        response = await self.client.post(
+            self.url, json=self._payload(messages, tools, stream=False), headers=self.headers
+        )
+        if response.status_code != 200:
+            logger.error(f"LLM API error ({response.status_code}): {response.text}")
+        response.raise_for_status()
+
+        body = response.json()
+        choice = body["choices"][0]["message"]
+        message = {"role": "assistant", "content": choice.get("content") or ""}
+        if choice.get("tool_calls"):
+            message["tool_calls"] = choice["tool_calls"]
+        usage = body.get("usage") or {}
+        return {
+            "message": message,
+            "prompt_eval_count": usage.get("prompt_tokens"),
+            "eval_count": usage.get("completion_tokens"),
+        }
+
+    async def chat_stream(self, messages: Messages, tools: Tools) -> AsyncIterator[Dict[str, Any]]:
+        payload = self._payload(messages, tools, stream=True)
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        usage: Dict[str, Any] = {}
+
+        async with self.client.stream("POST", self.url, json=payload, headers=self.headers) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode(errors="replace")
+                logger.error(f"LLM API error ({response.status_code}): {error_text}")
+                response.raise_for_status()
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                usage = chunk.get("usage") or usage
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta", {})
+                    if delta.get("content"):
+                        yield {"message": {"role": "assistant", "content": delta["content"]}, "done": False}
+                    # Tool calls arrive in fragments keyed by index
+                    for fragment in delta.get("tool_calls") or []:
+                        call = tool_calls.setdefault(
+                            fragment.get("index", 0),
+                            {"id": None, "type": "function", "function": {"name": "", "arguments": ""}},
+                        )
+                        call["id"] = fragment.get("id") or call["id"]
+                        function = fragment.get("function") or {}
+                        call["function"]["name"] += function.get("name") or ""
+                        call["function"]["arguments"] += function.get("arguments") or ""
+
+        message: Dict[str, Any] = {"role": "assistant", "content": ""}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+        yield {
+            "message": message,
+            "done": True,
+            "prompt_eval_count": usage.get("prompt_tokens"),
+            "eval_count": usage.get("completion_tokens"),
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# ─────────────────────────────
+# In-process fake
+# ─────────────────────────────
+class FakeBackend(LLMBackend):
+    """
+    Deterministic in-process backend for tests and benchmarks
+
+    Asks for `tool_iterations` rounds of `tool_name` calls (counted from the
+    tool messages in the prompt), then answers with `answer`. Each call or
+    batch takes `latency` seconds; batches cost the same as one call. With
+    `capacity` set, at most that many calls or batches run at once, like a
+    single accelerator.
+    """
+
+    name = "fake"
+    supports_batch = True
+
+    def __init__(
+        self,
+        tool_iterations: int = 0,
+        latency: float = 0.0,
+        tool_name: str = "fetch_comments",
+        answer: str = "Here are your comments for the requested tasks, most recent first.",
+        capacity: int = 0,
+    ):
+        self.tool_iterations = tool_iterations
+        self.latency = latency
+        self.capacity = capacity
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.tool_name = tool_name
+        self.answer = answer
+        self.calls = 0
+        self.batches = 0
+
+    async def _generate(self):
+        if not self.capacity:
+            await asyncio.sleep(self.latency)
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        async with self._slots:
+            await asyncio.sleep(self.latency)
+
+    def respond(self, messages: Messages) -> Dict[str, Any]:
+        self.calls += 1
+        done = sum(1 for m in messages if m.get("role") == "tool")
+        if done < self.tool_iterations:
+            call = {"function": {"name": self.tool_name, "arguments": {"entity_id": done + 1}}}
+            message = {"role": "assistant", "content": "", "tool_calls": [call]}
+        else:
+            message = {"role": "assistant", "content": self.answer}
+        return {"message": message, "done": True}
+
+    async def chat(self, messages: Messages, tools: Tools) -> Dict[str, Any]:
+        await self._generate()
+        return self.respond(messages)
+
+    async def chat_stream(self, messages: Messages, tools: Tools) -> AsyncIterator[Dict[str, Any]]:
+        await self._generate()
+        message = self.respond(messages)["message"]
+        if message.get("tool_calls"):
+            yield {"message": message, "done": False}
+        else:
+            for word in message["content"].split(" "):
+                yield {"message": {"role": "assistant", "content": word + " "}, "done": False}
+        yield {"message": {"role": "assistant", "content": ""}, "done": True}
+
+    async def chat_batch(self, requests: List[Tuple[Messages, Tools]]) -> List[Dict[str, Any]]:
+        self.batches += 1
+        await self._generate()
+        return [self.respond(messages) for messages, _ in requests]
+
+
+# ─────────────────────────────
+# Micro-batching
+# ─────────────────────────────
+class MicroBatcher:
+    """
+    Groups concurrent `chat` calls into one `chat_batch` call
+
+    A batch is sent when `max_size` calls are waiting or `window` seconds
+    after the first one arrived, whichever comes first. Each batch takes
+    one slot from `admission`, since the backend serves it as one request;
+    a refusal fails every call in the batch with LLMOverloadedError.
+    """
+
+    def __init__(self, backend: LLMBackend, window: float, max_size: int, admission: AdmissionController):
+        self.backend = backend
+        self.window = window
+        self.max_size = max_size
+        self.admission = admission
+        self._pending: List[Tuple[Messages, Tools, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def chat(self, messages: Messages, tools: Tools) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((messages, tools, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[Messages, Tools, asyncio.Future]]):
+        try:
+            async with self.admission.slot():
+                results = await self.backend.chat_batch([(m, t) for m, t, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# ─────────────────────────────
+# Shared backend
+# ─────────────────────────────
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "openai": OpenAICompatibleBackend,
+    "fake": FakeBackend,
+}
+
+_backend: Optional[LLMBackend] = None
+_batcher: Optional[MicroBatcher] = None
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    name = name or settings.LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def get_backend() -> LLMBackend:
+    """The backend selected by LLM_BACKEND, created on first use"""
+    global _backend
+    if _backend is None:
+        set_backend(create_backend())
+    return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Replace the shared backend (e.g. with a FakeBackend in tests)"""
+    global _backend, _batcher
+    _backend = backend
+    _batcher = None
+    if settings.LLM_BATCH_ENABLED and not backend.supports_batch:
+        logger.warning(f"LLM_BATCH_ENABLED has no effect: the {backend.name} backend has no batch request")
+    elif settings.LLM_BATCH_ENABLED:
+        _batcher = MicroBatcher(
+            backend, settings.LLM_BATCH_WINDOW_MS / 1000, settings.LLM_BATCH_MAX_SIZE, llm_admission
+        )
+
+
+async def close_backend():
+    global _backend, _batcher
+    if _backend is not None:
+        await _backend.aclose()
+    _backend = None
+    _batcher = None
+
+
+def batching() -> bool:
+    """True if `chat` calls are micro-batched, and so admitted per batch"""
+    get_backend()
+    return _batcher is not None
+
+
+async def chat(messages: Messages, tools: Tools) -> Dict[str, Any]:
+    """One non-streaming chat call, micro-batched when enabled"""
+    backend = get_backend()
+    if _batcher is not None:
+        return await _batcher.chat(messages, tools)
+    return await backend.chat(messages, tools)
+
+
+def chat_stream(messages: Messages, tools: Tools) -> AsyncIterator[Dict[str, Any]]:
+    return get_backend().chat_stream(messages, tools)
@@ -1,84 +1,105 @@
+import asyncio
+import contextlib
 import json
-import httpx
-from typing import Any, Dict, List, Optional
+import logging
+import time
+from typing import Any, AsyncIterator, ContextManager, Dict, Hashable, List, Optional, Sequence, Tuple
 from mcp.types import ListToolsResult
+from app import tracing
+from app.config import settings
+from app.services import llm, task_feed, tool_registry
+from app.services.admission import LLMOverloadedError, llm_admission
+from app.services.coalescing import CoalescingCache
+from app.services.context import fit_to_budget, prompt_tokens, truncate_text
+from app.services.conversations import Conversation
 from app.services.task_manager_mcp import mcp_service
+from app.services.tool_registry import ToolRegistry
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
-MODEL = "llama3.2:1b"
+logger = logging.getLogger("Agent")
 
 SYSTEM_PROMPT = """You are an awesome task management assistant that helps users manage their tasks.
 - Use the available tools to fetch, create, update, or delete tasks as needed.
 - Always provide clear and helpful responses to the user.
 - When you need information, use the appropriate tool before responding."""
 
-# Store tools globally
-tools_spec = []
-tool_implementations = {}
-
+class ResponseCache(CoalescingCache[str]):
+    """
+    Exact-match cache of final agent answers
 
-def format_mcp_tools_for_ollama(tools: ListToolsResult) -> List[Dict[str, Any]]:
-    """Convert MCP tools to Ollama function calling format"""
-    global tools_spec, tool_implementations
+    Keyed by user, normalized prompt and tool-registry version; see
+    CoalescingCache for expiry, coalescing and invalidation. Error
+    answers are handed to coalesced callers but never stored.
+    """
 
-    tools_spec = []
-    tool_implementations = {}
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(prompt.casefold().split()).rstrip("?!. ")
 
-    for tool in tools.tools:
-        tool_name = tool.name
-        description = getattr(tool, "description", "No description")
-        schema = tool.inputSchema if hasattr(tool, "inputSchema") else {}
+    def key(self, user_id: Hashable, prompt: str, registry: Optional[ToolRegistry]) -> Tuple:
+        return (user_id, self.normalize(prompt), registry.version if registry else 0)
 
-        # Format for Ollama
-        tool_spec = {
-            "type": "function",
-            "function": {
-                "name": tool_name,
-                "description": description,
-                "parameters": (
-                    schema if schema else {"type": "object", "properties": {}}
-                ),
-            },
-        }
+    def cacheable(self, answer: str) -> bool:
+        return not answer.startswith("[Agent error")
 
-        tools_spec.append(tool_spec)
-        tool_implementations[tool_name] = tool
 
-    return tools_spec
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=settings.RESPONSE_CACHE_TTL,
+)
 
 
-async def call_ollama(
-    messages: List[Dict[str, str]], tools: List[Dict[str, Any]]
-) -> Dict[str, Any]:
-    """Make a call to Ollama API with tools support"""
-    payload = {
-        "model": MODEL,
-        "messages": messages,
-        "stream": False,
-    }
+def _note_mutations(user_id: Optional[Hashable], tool_results: List[Tuple[str, Dict[str, Any], Dict[str, Any]]]):
+    """Invalidate a user's cached answers and task pages once one of their mutating tools ran"""
+    if user_id is None:
+        return
+    if any(fn_name in settings.RESPONSE_CACHE_MUTATING_TOOLS for fn_name, _, _ in tool_results):
+        response_cache.invalidate_user(user_id)
+        task_feed.page_cache.invalidate_user(user_id)
 
-    # Only include tools if they exist
-    if tools:
-        payload["tools"] = tools
 
-    print(f"PAYLOAD {payload}")
+def _llm_span(messages: List[Dict[str, Any]]) -> ContextManager[tracing.Span]:
+    return tracing.span(
+        "llm.chat",
+        backend=llm.get_backend().name,
+        prompt_messages=len(messages),
+        prompt_bytes=sum(len(str(m.get("content") or "")) for m in messages),
+    )
 
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        response = await client.post(OLLAMA_URL, json=payload)
 
-        # Check for errors
-        if response.status_code != 200:
-            error_text = response.text
-            print(f"❌ Ollama API error ({response.status_code}): {error_text}")
+def _record_usage(span: tracing.Span, response: Dict[str, Any], response_bytes: int):
+    span.set(
+        prompt_eval_tokens=response.get("prompt_eval_count") or 0,
+        completion_tokens=response.get("eval_count") or 0,
+        response_bytes=response_bytes,
+    )
 
-            # If tools are not supported, try without tools
-            if "tools" in payload and response.status_code == 400:
-                print("⚠️ Tools not supported, retrying without tools...")
-                payload.pop("tools", None)
-                response = await client.post(OLLAMA_URL, json=payload)
 
-        response.raise_for_status()
-        return response.json()
+async def call_llm(
+    messages: List[Dict[str, str]], tools: Sequence[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Make a chat call to the configured LLM backend with tools support"""
+    # A micro-batch is one request to the backend and takes one slot for all its calls
+    admitted = contextlib.nullcontext() if llm.batching() else llm_admission.slot()
+    async with admitted:
+        with _llm_span(messages) as span:
+            response = await llm.chat(messages, tools)
+            content = (response.get("message") or {}).get("content") or ""
+            _record_usage(span, response, len(content))
+            return response
+
+
+async def call_llm_stream(
+    messages: List[Dict[str, str]], tools: Sequence[Dict[str, Any]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """Make a streaming chat call, yielding each chunk as it arrives"""
+    async with llm_admission.slot():
+        with _llm_span(messages) as span:
+            response_bytes = 0
+            async for chunk in llm.chat_stream(messages, tools):
+                response_bytes += len((chunk.get("message") or {}).get("content") or "")
+                if chunk.get("done"):
+                    _record_usage(span, chunk, response_bytes)
+                yield chunk
 
 
 async def execute_tool(tool_name: str, arguments: Dict[str, Any], token: Optional[str] = None) -> Dict[str, Any]:
@@ -115,92 +136,328 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any], token: Optiona
         return {"success": False, "error": f"{type(e).__name__}: {str(e)}"}
 
 
+def _parse_tool_call(tool_call: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Return the function name and parsed arguments of a model tool call"""
+    function_info = tool_call.get("function", {})
+    fn_name = function_info.get("name")
+    raw_args = function_info.get("arguments", {})
+
+    # Parse arguments if they're a string
+    if isinstance(raw_args, str):
+        try:
+            raw_args = json.loads(raw_args)
+        except json.JSONDecodeError:
+            raw_args = {}
+
+    return fn_name, raw_args
+
+
+async def _run_tool(
+    fn_name: str, arguments: Dict[str, Any], token: str, registry: Optional[ToolRegistry]
+) -> Dict[str, Any]:
+    """Execute a registered tool, or report it as unknown"""
+    if registry and fn_name in registry.names:
+        return await execute_tool(fn_name, arguments, token)
+    return {"error": f"Unknown tool: {fn_name}"}
+
+
+async def _run_tool_calls(
+    tool_calls: List[Dict[str, Any]], token: str, registry: Optional[ToolRegistry]
+) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """
+    Execute one turn's tool calls concurrently
+
+    At most AGENT_TOOL_CONCURRENCY calls run at once and each is bounded by
+    AGENT_TOOL_TIMEOUT. Results come back in the order the model issued the
+    calls, as (name, arguments, result) tuples.
+    """
+    semaphore = asyncio.Semaphore(settings.AGENT_TOOL_CONCURRENCY)
+    timeout = settings.AGENT_TOOL_TIMEOUT
+
+    async def run_one(tool_call: Dict[str, Any]):
+        fn_name, raw_args = _parse_tool_call(tool_call)
+        async with semaphore:
+            logger.debug(f"Calling tool: {fn_name} with args: {raw_args}")
+            try:
+                tool_result = await asyncio.wait_for(
+                    _run_tool(fn_name, raw_args, token, registry), timeout=timeout
+                )
+            except asyncio.TimeoutError:
+                tool_result = {
+                    "success": False,
+                    "error": f"Timeout calling tool '{fn_name}' after {timeout}s",
+                }
+        logger.debug(f"Tool result: {tool_result}")
+        return fn_name, raw_args, tool_result
+
+    return await asyncio.gather(*(run_one(tool_call) for tool_call in tool_calls))
+
+
+def _start_messages(
+    user_prompt: str, conversation: Optional[Conversation]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Initial messages for a run and the index of the current user prompt"""
+    history = conversation.messages if conversation else []
+    messages: List[Dict[str, Any]] = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *history,
+        {"role": "user", "content": user_prompt},
+    ]
+    return messages, len(messages) - 1
+
+
+def _build_prompt(messages: List[Dict[str, Any]], keep_from: int) -> List[Dict[str, Any]]:
+    return fit_to_budget(messages, keep_from, settings.CONTEXT_TOKEN_BUDGET)
+
+
+def _tool_message(fn_name: str, tool_result: Dict[str, Any]) -> Dict[str, Any]:
+    content = truncate_text(json.dumps(tool_result), settings.CONTEXT_TOOL_RESULT_MAX_TOKENS)
+    return {"role": "tool", "name": fn_name, "content": content}
+
+
+def _iteration_report(
+    iteration: int, prompt: List[Dict[str, Any]], started: float, response: Dict[str, Any]
+) -> Dict[str, Any]:
+    report = {
+        "iteration": iteration,
+        "prompt_messages": len(prompt),
+        "prompt_tokens": prompt_tokens(prompt),
+        "prompt_eval_count": response.get("prompt_eval_count"),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    logger.info(
+        f"Iteration {iteration}: ~{report['prompt_tokens']} prompt tokens "
+        f"in {report['prompt_messages']} messages, LLM {report['latency_ms']} ms"
+    )
+    return report
+
+
+def _remember(
+    conversation: Optional[Conversation], user_prompt: str, content: str
+):
+    if conversation:
+        conversation.add_turn(user_prompt, content)
+
+
+def _interrupted(tools_ran: List[str], error: LLMOverloadedError) -> str:
+    """
+    Final answer when the LLM refuses a call after tools have run
+
+    LLM admission is per call, so a later call of a run can be refused.
+    Before any tool ran the refusal propagates and the caller gets a 429 to
+    retry; after that, a retry would repeat side effects such as
+    create_comment, so the run ends with an answer saying what already ran.
+    """
+    return f"[Agent error: {error}; stopped after these tools had already run: {', '.join(tools_ran)}]"
+
+
+def _conversation_lock(conversation: Optional[Conversation]):
+    # Turns of one conversation run one at a time so history stays ordered
+    return conversation.lock if conversation else contextlib.nullcontext()
+
+
 async def run_agent(
     user_prompt: str,
     token: str,
-    tools: Optional[ListToolsResult] = None,
+    registry: Optional[ToolRegistry] = None,
+    conversation: Optional[Conversation] = None,
+    user_id: Optional[Hashable] = None,
 ) -> str:
     """
     Run the agent with tool calling loop
 
     Args:
         user_prompt: The user's input message
-        tools: Optional MCP tools to use
+        registry: Tools to offer; defaults to the current shared registry
+        conversation: Optional chat history to continue and extend
+        user_id: Caller's id, used for the response cache
 
     Returns:
         The final response from the agent
+
+    Raises:
+        LLMOverloadedError: the LLM refused a call before any tool ran; once
+            one has, a refusal ends the run with an error answer instead
     """
-    # Format tools if provided
-    if tools:
-        format_mcp_tools_for_ollama(tools)
+    # Pin one registry snapshot for the whole run
+    registry = registry or tool_registry.current()
+
+    # Stand-alone prompts may be answered from the opt-in response cache
+    if settings.RESPONSE_CACHE_ENABLED and conversation is None and user_id is not None:
+        key = response_cache.key(user_id, user_prompt, registry)
+        return await response_cache.get_or_build(
+            key, lambda: _run_agent(user_prompt, token, registry, None, user_id)
+        )
 
-    messages: List[Dict[str, Any]] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-        {"role": "user", "content": user_prompt},
-    ]
+    async with _conversation_lock(conversation):
+        return await _run_agent(user_prompt, token, registry, conversation, user_id)
 
-    # Safety: limit tool-call iterations to prevent infinite loops
-    max_iterations = 8
 
-    for iteration in range(max_iterations):
-        print(f"🔄 Agent iteration {iteration + 1}/{max_iterations}")
+async def _run_agent(
+    user_prompt: str,
+    token: str,
+    registry: Optional[ToolRegistry],
+    conversation: Optional[Conversation],
+    user_id: Optional[Hashable],
+) -> str:
+    with tracing.span("agent.run", prompt_bytes=len(user_prompt)) as span:
+        tools_spec = registry.spec if registry else ()
+
+        messages, keep_from = _start_messages(user_prompt, conversation)
+        tools_ran: List[str] = []
+
+        # Safety: limit tool-call iterations to prevent infinite loops
+        max_iterations = 8
+
+        for iteration in range(max_iterations):
+            logger.debug(f"Agent iteration {iteration + 1}/{max_iterations}")
+            span.set(iterations=iteration + 1)
+
+            # Call the LLM with the prompt trimmed to the token budget
+            prompt = _build_prompt(messages, keep_from)
+            started = time.perf_counter()
+            try:
+                response = await call_llm(prompt, tools_spec)
+            except LLMOverloadedError as e:
+                if not tools_ran:
+                    raise
+                return _interrupted(tools_ran, e)
+            _iteration_report(iteration + 1, prompt, started, response)
+
+            # Extract the assistant message
+            assistant_msg = response.get("message")
+            if not assistant_msg:
+                return "[Agent error: no message in response]"
+
+            content = assistant_msg.get("content", "")
+            tool_calls = assistant_msg.get("tool_calls", [])
+
+            # If no tool calls, we have the final answer
+            if not tool_calls:
+                logger.debug(f"Final answer: {content}")
+                _remember(conversation, user_prompt, content)
+                return content
+
+            # Add assistant message with tool calls
+            messages.append(
+                {"role": "assistant", "content": content, "tool_calls": tool_calls}
+            )
+
+            # Execute the tool calls with the user's token
+            tool_results = await _run_tool_calls(tool_calls, token, registry)
+            _note_mutations(user_id, tool_results)
+            tools_ran.extend(fn_name for fn_name, _, _ in tool_results)
+            for fn_name, _, tool_result in tool_results:
+                # Add tool result to messages
+                messages.append(_tool_message(fn_name, tool_result))
+
+        return "[Agent error: Maximum iterations reached without final answer]"
+
 
-        # Call Ollama
-        response = await call_ollama(messages, tools_spec)
+async def run_agent_stream(
+    user_prompt: str,
+    token: str,
+    registry: Optional[ToolRegistry] = None,
+    conversation: Optional[Conversation] = None,
+    user_id: Optional[Hashable] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the agent with tool calling loop, yielding events as they happen
+
+    Args:
+        user_prompt: The user's input message
+        registry: Tools to offer; defaults to the current shared registry
+        conversation: Optional chat history to continue and extend
+        user_id: Caller's id, used to invalidate their cached answers
+
+    Yields:
+        Event dicts keyed by "event":
+            token: a piece of assistant text ({"content"})
+            tool_call: a tool is about to run ({"name", "arguments"})
+            tool_result: a tool has finished ({"name", "result"})
+            iteration: prompt size and LLM latency of one model call
+            done: the final answer ({"content"})
+            error: the agent gave up ({"detail"})
+    """
+    async with _conversation_lock(conversation):
+        with tracing.span("agent.run", prompt_bytes=len(user_prompt), stream=True) as span:
+            async for event in _run_agent_stream(user_prompt, token, registry, conversation, user_id):
+                if event["event"] == "iteration":
+                    span.set(iterations=event["iteration"])
+                yield event
+
+
+async def _run_agent_stream(
+    user_prompt: str,
+    token: str,
+    registry: Optional[ToolRegistry],
+    conversation: Optional[Conversation],
+    user_id: Optional[Hashable],
+) -> AsyncIterator[Dict[str, Any]]:
+    registry = registry or tool_registry.current()
+    tools_spec = registry.spec if registry else ()
 
-        # Extract the assistant message
-        assistant_msg = response.get("message")
-        if not assistant_msg:
-            return "[Agent error: no message in response]"
+    messages, keep_from = _start_messages(user_prompt, conversation)
+    tools_ran: List[str] = []
 
-        content = assistant_msg.get("content", "")
-        tool_calls = assistant_msg.get("tool_calls", [])
+    max_iterations = 8
+
+    for iteration in range(max_iterations):
+        logger.debug(f"Agent iteration {iteration + 1}/{max_iterations}")
+
+        content_parts: List[str] = []
+        tool_calls: List[Dict[str, Any]] = []
+        final_chunk: Dict[str, Any] = {}
+
+        prompt = _build_prompt(messages, keep_from)
+        started = time.perf_counter()
+        try:
+            async for chunk in call_llm_stream(prompt, tools_spec):
+                assistant_msg = chunk.get("message") or {}
+                token_text = assistant_msg.get("content")
+                if token_text:
+                    content_parts.append(token_text)
+                    yield {"event": "token", "content": token_text}
+                tool_calls.extend(assistant_msg.get("tool_calls") or [])
+                if chunk.get("done"):
+                    final_chunk = chunk
+        except LLMOverloadedError as e:
+            if not tools_ran:
+                raise
+            yield {"event": "error", "detail": _interrupted(tools_ran, e)}
+            return
+
+        yield {"event": "iteration", **_iteration_report(iteration + 1, prompt, started, final_chunk)}
+
+        content = "".join(content_parts)
 
-        # If no tool calls, we have the final answer
         if not tool_calls:
-            print(f"✅ Final answer: {content}")
-            messages.append({"role": "assistant", "content": content})
-            return content
+            _remember(conversation, user_prompt, content)
+            yield {"event": "done", "content": content}
+            return
 
-        # Add assistant message with tool calls
         messages.append(
             {"role": "assistant", "content": content, "tool_calls": tool_calls}
         )
 
-        # Execute each tool call
         for tool_call in tool_calls:
-            function_info = tool_call.get("function", {})
-            fn_name = function_info.get("name")
-            raw_args = function_info.get("arguments", {})
-
-            # Parse arguments if they're a string
-            if isinstance(raw_args, str):
-                try:
-                    raw_args = json.loads(raw_args)
-                except json.JSONDecodeError:
-                    raw_args = {}
-
-            print(f"🔧 Calling tool: {fn_name} with args: {raw_args}")
-
-            # Execute the tool with the user's token
-            if fn_name in tool_implementations:
-                tool_result = await execute_tool(fn_name, raw_args, token)
-            else:
-                tool_result = {"error": f"Unknown tool: {fn_name}"}
+            fn_name, raw_args = _parse_tool_call(tool_call)
+            yield {"event": "tool_call", "name": fn_name, "arguments": raw_args}
 
-            print(f"📥 Tool result: {tool_result}")
+        tool_results = await _run_tool_calls(tool_calls, token, registry)
+        _note_mutations(user_id, tool_results)
+        tools_ran.extend(fn_name for fn_name, _, _ in tool_results)
+        for fn_name, _, tool_result in tool_results:
+            yield {"event": "tool_result", "name": fn_name, "result": tool_result}
 
-            # Add tool result to messages
-            messages.append(
-                {"role": "tool", "name": fn_name, "content": json.dumps(tool_result)}
-            )
+            messages.append(_tool_message(fn_name, tool_result))
 
-    return "[Agent error: Maximum iterations reached without final answer]"
+    yield {"event": "error", "detail": "Maximum iterations reached without final answer"}
 
 
 def initialise_llm(tools: ListToolsResult):
     """
-    Initialize by formatting the tools (no agent object needed)
+    Initialize by building the shared tool registry (no agent object needed)
 
     Args:
         tools: List of MCP tools
@@ -209,13 +466,10 @@ def initialise_llm(tools: ListToolsResult):
         True if successful
     """
     try:
-        format_mcp_tools_for_ollama(tools)
-        print(f"✅ Tools formatted: {len(tools_spec)} tools available")
-        print(f"✅ Tools: {[t['function']['name'] for t in tools_spec]}")
+        tool_registry.refresh(tools)
+        registry = tool_registry.current()
+        logger.info(f"Tools formatted: {len(registry.spec)} tools available: {sorted(registry.names)}")
         return True
     except Exception as e:
-        import traceback
-
-        print(f"Error formatting tools: {type(e).__name__}: {str(e)}")
-        print(f"Full traceback:\n{traceback.format_exc()}")
+        logger.exception(f"Error formatting tools: {type(e).__name__}: {str(e)}")
         raise
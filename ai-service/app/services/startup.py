@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from app.config import settings
+from app.services import llm
+from app.services.openai import initialise_llm
+from app.services.task_manager_mcp import mcp_service
+
+logger = logging.getLogger("Startup")
+
+# Check states; "ok", "skipped" and "failed" are final
+PENDING = "pending"
+OK = "ok"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class Readiness:
+    """
+    State of the start-up work that runs after the server begins listening
+
+    The service is ready once tools have been discovered and the LLM
+    warm-up has finished. A failed warm-up does not block readiness; the
+    first chat then simply loads the model.
+    """
+
+    def __init__(self):
+        self.checks: Dict[str, str] = {"tools": PENDING, "llm": PENDING}
+        self.details: Dict[str, str] = {}
+
+    def set(self, check: str, state: str, detail: str = ""):
+        self.checks[check] = state
+        if detail:
+            self.details[check] = detail
+        else:
+            self.details.pop(check, None)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.checks["tools"] == OK and self.checks["llm"] != PENDING
+
+    def report(self) -> Dict[str, Any]:
+        return {"ready": self.is_ready, "checks": dict(self.checks), "details": dict(self.details)}
+
+
+readiness = Readiness()
+
+
+async def warm_up_llm():
+    if not settings.OLLAMA_WARMUP:
+        readiness.set("llm", SKIPPED)
+        return
+    try:
+        await llm.get_backend().warm_up()
+        readiness.set("llm", OK)
+        logger.info("✅ LLM model warmed up")
+    except Exception as e:
+        readiness.set("llm", FAILED, str(e))
+        logger.warning(f"Failed to warm up LLM model: {e}")
+
+
+async def discover_tools():
+    """Connect to MCP and load its tools, retrying until it succeeds"""
+    while True:
+        try:
+            if await mcp_service.connect():
+                initialise_llm(await mcp_service.list_tools())
+                readiness.set("tools", OK)
+                logger.info("✅ LLM initialized with tools")
+                return
+            readiness.set("tools", PENDING, "MCP not reachable yet")
+        except Exception as e:
+            readiness.set("tools", PENDING, f"{type(e).__name__}: {e}")
+            logger.error(f"Failed to load MCP tools: {e}")
+        await asyncio.sleep(settings.MCP_RETRY_DELAY)
+
+
+async def bootstrap():
+    """Run the start-up work that does not need to block serving"""
+    await asyncio.gather(warm_up_llm(), discover_tools())
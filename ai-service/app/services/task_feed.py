@@ -0,0 +1,108 @@
+import logging
+from typing import Any, Dict, Hashable, List, Optional
+
+import httpx
+
+from app import tracing
+from app.config import settings
+from app.services.coalescing import CoalescingCache
+
+logger = logging.getLogger("TaskFeed")
+
+
+class UpstreamError(Exception):
+    """Raised when core-backend or comment answers with an error or not at all"""
+
+    def __init__(self, service: str, status_code: int, detail: Any):
+        super().__init__(f"{service} returned {status_code}: {detail}")
+        self.service = service
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Assembled pages, keyed by user and page parameters
+page_cache = CoalescingCache(max_entries=settings.TASK_FEED_CACHE_MAX_ENTRIES, ttl=settings.TASK_FEED_CACHE_TTL)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """One pooled client per process for both upstream services"""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.TASK_FEED_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.TASK_FEED_MAX_CONNECTIONS),
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+
+
+async def _get(service: str, url: str, token: str, params) -> Any:
+    with tracing.span(f"task_feed.{service}") as span:
+        try:
+            response = await get_client().get(url, params=params, headers={"Authorization": f"Bearer {token}"})
+        except httpx.HTTPError as e:
+            raise UpstreamError(service, 502, f"{type(e).__name__}: {e}") from e
+        span.set(status_code=response.status_code, response_bytes=len(response.content))
+        if response.status_code >= 400:
+            raise UpstreamError(service, response.status_code, response.text)
+        return response.json()
+
+
+async def fetch_tasks(token: str, page: int, page_size: int, filters: Dict[str, str]) -> Dict[str, Any]:
+    return await _get(
+        "core", f"{settings.CORE_BASE_URL}/tasks/", token, {**filters, "page": page, "page_size": page_size}
+    )
+
+
+async def fetch_comment_summaries(token: str, task_ids: List[int], latest: int) -> List[Dict[str, Any]]:
+    """Counts and latest comments for every task of a page in one request"""
+    if not task_ids:
+        return []
+    params = [("entity_ids", task_id) for task_id in task_ids] + [("latest", latest)]
+    return await _get("comment", f"{settings.COMMENT_BASE_URL}/api/v1/comments/summary", token, params)
+
+
+async def build_page(
+    token: str, page: int, page_size: int, latest: int, filters: Dict[str, str]
+) -> Dict[str, Any]:
+    """One page of tasks joined with their comment counts and latest comments"""
+    with tracing.span("task_feed.page", page_size=page_size) as span:
+        tasks = await fetch_tasks(token, page, page_size, filters)
+        summaries = await fetch_comment_summaries(token, [t["id"] for t in tasks["results"]], latest)
+        by_task = {s["entity_id"]: s for s in summaries}
+        results = [
+            {
+                **task,
+                "comment_count": by_task.get(task["id"], {}).get("count", 0),
+                "latest_comments": by_task.get(task["id"], {}).get("latest", []),
+            }
+            for task in tasks["results"]
+        ]
+        span.set(tasks=len(results))
+    return {
+        "count": tasks["count"],
+        "page": page,
+        "page_size": page_size,
+        "has_next": tasks["next"] is not None,
+        "results": results,
+    }
+
+
+async def get_page(
+    user_id: Hashable, token: str, page: int, page_size: int, latest: int, filters: Dict[str, str]
+) -> Dict[str, Any]:
+    """`filters` are core's task list parameters (status, priority, due_before, due_after, ordering)"""
+    if settings.TASK_FEED_CACHE_TTL <= 0:
+        return await build_page(token, page, page_size, latest, filters)
+    return await page_cache.get_or_build(
+        (user_id, page, page_size, latest, tuple(sorted(filters.items()))),
+        lambda: build_page(token, page, page_size, latest, filters),
+    )
@@ -1,11 +1,16 @@
 import asyncio
+import json
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Optional
 
 from mcp import ClientSession
 from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from app import tracing
 from app.config import settings
-from mcp.types import ListToolsResult
+from mcp.types import CONNECTION_CLOSED, ListToolsResult
 
 
 # ─────────────────────────────
@@ -19,113 +24,271 @@ class MCPTimeoutError(Exception):
     """Raised when MCP request times out."""
 
 
+def is_transport_error(error: Exception) -> bool:
+    """True if the session failed, False if the server answered the call with an error"""
+    if isinstance(error, McpError):
+        # Error responses (unknown tool, invalid arguments...) come back on a healthy session
+        return error.error.code == CONNECTION_CLOSED
+    return True
+
+
+# ─────────────────────────────
+# Pooled session
+# ─────────────────────────────
+class PooledSession:
+    """One MCP session owned by a supervisor task.
+
+    The supervisor opens the transport and session, pings it every
+    heartbeat interval and reopens it with exponential backoff when the
+    ping fails or a call reports the session broken. Keeping the whole
+    lifecycle in one task lets the transport's context managers exit in
+    the task that entered them.
+    """
+
+    def __init__(self, index: int, client: "TaskManagerMCP"):
+        self.index = index
+        self.client = client
+        self.session: Optional[ClientSession] = None
+        self.ready = asyncio.Event()
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.reconnects = 0
+        self._connected_once = False
+        self._broken = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_connected(self) -> bool:
+        return self.ready.is_set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_broken(self):
+        self._broken.set()
+
+    @asynccontextmanager
+    async def _open(self):
+        if self.client.transport == "streamable-http":
+            transport = streamablehttp_client(self.client.url)
+        else:
+            transport = sse_client(self.client.url)
+
+        async with transport as streams:
+            read_stream, write_stream = streams[0], streams[1]
+            async with ClientSession(read_stream, write_stream) as session:
+                await asyncio.wait_for(session.initialize(), timeout=self.client.connect_timeout)
+                yield session
+
+    async def _supervise(self):
+        logger = self.client.logger
+        delay = self.client.retry_delay
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                logger.info(f"Connecting MCP session #{self.index}: {self.client.url} (Attempt {attempt})")
+                async with self._open() as session:
+                    self.session = session
+                    self._broken.clear()
+                    self.ready.set()
+                    if self._connected_once:
+                        self.reconnects += 1
+                    self._connected_once = True
+                    attempt = 0
+                    delay = self.client.retry_delay
+                    logger.info(f"✅ MCP session #{self.index} connected")
+                    await self._heartbeat(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ MCP session #{self.index} failed: {e}")
+            finally:
+                self.ready.clear()
+                self.session = None
+
+            logger.info(f"Reconnecting MCP session #{self.index} in {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.client.reconnect_max_delay)
+
+    async def _heartbeat(self, session: ClientSession):
+        """Return when the session should be reopened."""
+        while True:
+            try:
+                await asyncio.wait_for(self._broken.wait(), timeout=self.client.heartbeat_interval)
+                self.client.logger.warning(f"⚠️ MCP session #{self.index} reported broken")
+                return
+            except asyncio.TimeoutError:
+                pass
+
+            try:
+                await asyncio.wait_for(session.send_ping(), timeout=self.client.call_timeout)
+            except Exception as e:
+                self.client.logger.warning(f"⚠️ MCP session #{self.index} heartbeat failed: {e}")
+                return
+
+
 # ─────────────────────────────
 # MCP Client
 # ─────────────────────────────
 class TaskManagerMCP:
-    def __init__(self):
-        self.session: Optional[ClientSession] = None
-        self.read_stream = None
-        self.write_stream = None
-        self.client_context = None
-        self.session_context = None
-        self.is_connected = False
+    """Pool of MCP sessions with least-busy dispatch."""
 
+    def __init__(self, size: Optional[int] = None):
         # Retry settings
         self.retry_attempts = getattr(settings, "MCP_RETRY_ATTEMPTS", 3)
         self.retry_delay = getattr(settings, "MCP_RETRY_DELAY", 2)
+        self.reconnect_max_delay = getattr(settings, "MCP_RECONNECT_MAX_DELAY", 30)
+        self.heartbeat_interval = getattr(settings, "MCP_HEARTBEAT_INTERVAL", 15)
 
         # Auto-detect URL from env or default
         # Default to your Comment MCP on port 8001
         self.url = getattr(settings, "MCP_URL", "http://127.0.0.1:8001/sse")
+        self.transport = getattr(settings, "MCP_TRANSPORT", "sse")
 
         # Optional timeout for connect and calls
         self.connect_timeout = getattr(settings, "MCP_CONNECT_TIMEOUT", 5)
         self.call_timeout = getattr(settings, "MCP_CALL_TIMEOUT", 10)
 
-        # Logging setup
         self.logger = logging.getLogger("TaskManagerMCP")
-        logging.basicConfig(level=logging.INFO)
 
-    # ─────────────────────────────
-    async def connect(self) -> bool:
-        """Connect to MCP server with automatic retry logic."""
-        for attempt in range(1, self.retry_attempts + 1):
-            try:
-                await self._cleanup_existing_connections()
-                self.logger.info(f"Connecting to MCP server: {self.url} (Attempt {attempt})")
-
-                # Create SSE client and session
-                self.client_context = sse_client(self.url)
-                self.read_stream, self.write_stream = await self.client_context.__aenter__()
+        size = size or getattr(settings, "MCP_POOL_SIZE", 1)
+        self.sessions: List[PooledSession] = [PooledSession(i, self) for i in range(size)]
 
-                self.session_context = ClientSession(self.read_stream, self.write_stream)
-                self.session = await self.session_context.__aenter__()
-                await self.session.initialize()
+    @property
+    def is_connected(self) -> bool:
+        return any(s.is_connected for s in self.sessions)
 
-                self.is_connected = True
-                self.logger.info(f"✅ Connected to MCP at {self.url}")
-                return True
+    # ─────────────────────────────
+    async def connect(self) -> bool:
+        """Start every pooled session and wait until at least one is ready."""
+        for pooled in self.sessions:
+            pooled.start()
 
-            except Exception as e:
-                self.logger.warning(f"⚠️ Connection attempt {attempt} failed: {e}")
-                if attempt < self.retry_attempts:
-                    self.logger.info(f"Retrying in {self.retry_delay}s...")
-                    await asyncio.sleep(self.retry_delay)
-                else:
-                    self.logger.error(f"❌ Failed to connect to MCP after {attempt} attempts")
-                    return False
+        timeout = self.retry_attempts * (self.connect_timeout + self.retry_delay)
+        if await self._wait_ready(timeout):
+            self.logger.info(f"✅ Connected to MCP at {self.url}")
+            return True
+        self.logger.error(f"❌ Failed to connect to MCP within {timeout}s")
+        return False
 
     # ─────────────────────────────
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
-        """Call a tool on the MCP server with automatic reconnection."""
-        if not self.is_connected:
-            await self.connect()
-            if not self.is_connected:
-                raise MCPConnectionError("Unable to connect to MCP service")
-
+        """Call a tool on the least busy connected session."""
+        pooled = await self._acquire()
         try:
-            self.logger.info(f"🧰 Calling tool '{tool_name}' with args: {arguments}")
-            result = await asyncio.wait_for(
-                self.session.call_tool(tool_name, arguments=arguments),
-                timeout=self.call_timeout,
-            )
-            self.logger.info(f"✅ Tool '{tool_name}' executed successfully")
+            session = pooled.session
+            if session is None:
+                raise MCPConnectionError("MCP session dropped before the call")
+            self.logger.debug(f"🧰 Calling tool '{tool_name}' on session #{pooled.index} with args: {arguments}")
+            with tracing.span(
+                "mcp.call_tool",
+                tool=tool_name,
+                session=pooled.index,
+                request_bytes=len(json.dumps(arguments, default=str)),
+            ) as span:
+                result = await asyncio.wait_for(
+                    session.call_tool(tool_name, arguments=arguments),
+                    timeout=self.call_timeout,
+                )
+                span.set(response_bytes=sum(len(getattr(c, "text", "") or "") for c in result.content))
+            self.logger.debug(f"✅ Tool '{tool_name}' executed successfully")
             return result
         except asyncio.TimeoutError:
+            pooled.failures += 1
             raise MCPTimeoutError(f"Timeout calling tool '{tool_name}'")
         except Exception as e:
+            pooled.failures += 1
+            if is_transport_error(e):
+                pooled.mark_broken()
             self.logger.error(f"Error calling MCP tool '{tool_name}': {e}")
             raise
+        finally:
+            pooled.in_flight -= 1
 
     # ─────────────────────────────
     async def list_tools(self) -> ListToolsResult:
         """List available tools from MCP."""
-        if not self.is_connected:
-            await self.connect()
-        return await self.session.list_tools()
+        pooled = await self._acquire()
+        try:
+            session = pooled.session
+            if session is None:
+                raise MCPConnectionError("MCP session dropped before the call")
+            return await asyncio.wait_for(session.list_tools(), timeout=self.call_timeout)
+        finally:
+            pooled.in_flight -= 1
+
+    # ─────────────────────────────
+    def stats(self) -> Dict[str, Any]:
+        """Pool utilization metrics."""
+        in_flight = sum(s.in_flight for s in self.sessions)
+        return {
+            "size": len(self.sessions),
+            "connected": sum(1 for s in self.sessions if s.is_connected),
+            "in_flight": in_flight,
+            "utilization": in_flight / len(self.sessions),
+            "calls": sum(s.calls for s in self.sessions),
+            "failures": sum(s.failures for s in self.sessions),
+            "reconnects": sum(s.reconnects for s in self.sessions),
+            "sessions": [
+                {
+                    "index": s.index,
+                    "connected": s.is_connected,
+                    "in_flight": s.in_flight,
+                    "calls": s.calls,
+                    "failures": s.failures,
+                    "reconnects": s.reconnects,
+                }
+                for s in self.sessions
+            ],
+        }
 
     # ─────────────────────────────
     async def close(self):
-        """Gracefully close MCP connection."""
+        """Gracefully close every pooled session."""
         try:
-            if self.session_context:
-                await self.session_context.__aexit__(None, None, None)
-            if self.client_context:
-                await self.client_context.__aexit__(None, None, None)
-            self.is_connected = False
+            await asyncio.gather(*(s.stop() for s in self.sessions))
             self.logger.info("🔌 MCP connection closed.")
         except Exception as e:
             self.logger.error(f"Error closing MCP connection: {e}")
 
     # ─────────────────────────────
-    async def _cleanup_existing_connections(self):
-        """Clean up previous open connections."""
+    async def _acquire(self) -> PooledSession:
+        """Pick the connected session with the fewest in-flight calls."""
+        ready = [s for s in self.sessions if s.is_connected]
+        if not ready:
+            for pooled in self.sessions:
+                pooled.start()
+            if not await self._wait_ready(self.connect_timeout):
+                raise MCPConnectionError("Unable to connect to MCP service")
+            ready = [s for s in self.sessions if s.is_connected]
+
+        pooled = min(ready, key=lambda s: s.in_flight)
+        pooled.in_flight += 1
+        pooled.calls += 1
+        return pooled
+
+    async def _wait_ready(self, timeout: float) -> bool:
         if self.is_connected:
-            try:
-                await self.close()
-            except Exception as e:
-                self.logger.warning(f"Cleanup failed: {e}")
+            return True
+        waiters = [asyncio.create_task(s.ready.wait()) for s in self.sessions]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            return bool(done)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
 
 
 # ─────────────────────────────
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Tuple
+
+from mcp.types import ListToolsResult
+
+logger = logging.getLogger("ToolRegistry")
+
+
+# ─────────────────────────────
+# Registry snapshot
+# ─────────────────────────────
+@dataclass(frozen=True)
+class ToolRegistry:
+    """Immutable snapshot of the MCP tools, pre-formatted for Ollama.
+
+    Requests read `current()` once and use that snapshot for their whole
+    agent run; a refresh swaps in a new object and never mutates this one.
+    """
+
+    version: int
+    fingerprint: str
+    spec: Tuple[Dict[str, Any], ...]
+    names: FrozenSet[str]
+
+    @classmethod
+    def from_mcp(cls, tools: ListToolsResult, version: int) -> "ToolRegistry":
+        spec = tuple(format_tool(tool) for tool in tools.tools)
+        return cls(
+            version=version,
+            fingerprint=fingerprint(spec),
+            spec=spec,
+            names=frozenset(t["function"]["name"] for t in spec),
+        )
+
+
+def format_tool(tool) -> Dict[str, Any]:
+    """Convert one MCP tool to Ollama function calling format"""
+    description = getattr(tool, "description", None) or "No description"
+    schema = getattr(tool, "inputSchema", None)
+    return {
+        "type": "function",
+        "function": {
+            "name": tool.name,
+            "description": description,
+            "parameters": schema if schema else {"type": "object", "properties": {}},
+        },
+    }
+
+
+def fingerprint(spec: Tuple[Dict[str, Any], ...]) -> str:
+    encoded = json.dumps(spec, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+# ─────────────────────────────
+# Shared instance
+# ─────────────────────────────
+_current: Optional[ToolRegistry] = None
+
+
+def current() -> Optional[ToolRegistry]:
+    """The registry in use, or None before tools have been discovered"""
+    return _current
+
+
+def refresh(tools: ListToolsResult) -> bool:
+    """Swap in a new registry if the tool list changed. Returns True if it did."""
+    global _current
+    version = _current.version + 1 if _current else 1
+    candidate = ToolRegistry.from_mcp(tools, version)
+    if _current and candidate.fingerprint == _current.fingerprint:
+        return False
+    _current = candidate
+    logger.info(f"🧰 Tool registry v{version}: {sorted(candidate.names)}")
+    return True
+
+
+async def watch(list_tools: Callable[[], Awaitable[ListToolsResult]], interval: float):
+    """Poll `list_tools` every `interval` seconds and refresh on changes."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            refresh(await list_tools())
+        except Exception as e:
+            logger.warning(f"⚠️ Tool registry refresh failed: {e}")
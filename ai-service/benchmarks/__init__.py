@@ -0,0 +1,16 @@
+"""
+Benchmarks for the agent, run as modules from the ai-service/ directory,
+e.g. `python -m benchmarks.ollama_load`.
+
+app.config reads its settings when first imported and requires a few that
+the benchmarks never use, so placeholders are set here, before any
+benchmark module imports the app. Real values in the environment win.
+"""
+import os
+
+for _key, _value in {
+    "OPEN_AI_KEY": "benchmark",
+    "DJANGO_SECRET_KEY": "benchmark",
+    "JWT_ALGORITHM": "HS256",
+}.items():
+    os.environ.setdefault(_key, _value)
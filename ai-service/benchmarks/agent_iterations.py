@@ -0,0 +1,72 @@
+"""
+Multi-iteration run_agent benchmark against a local fake Ollama server.
+
+Compares a fresh httpx client per LLM call with the shared pooled client.
+Run from the ai-service/ directory:
+    python -m benchmarks.agent_iterations --runs 50 --iterations 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import time
+
+from app.services import llm, openai
+from benchmarks.fake_ollama import create_app, serve
+
+
+async def timed_runs(runs: int) -> list:
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await openai.run_agent("what are my comments?", token="benchmark")
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+class PerCallOllamaBackend(llm.OllamaBackend):
+    """Opens a new client, and so a new connection, for every call"""
+
+    async def chat(self, messages, tools):
+        async with llm.create_http_client() as client:
+            return await self._post(client, self._payload(messages, tools, stream=False))
+
+
+async def bench(runs: int, url: str):
+    results = {}
+    for mode, backend in (
+        ("client per call", PerCallOllamaBackend),
+        ("pooled client", llm.OllamaBackend),
+    ):
+        llm.set_backend(backend(url=url))
+        try:
+            results[mode] = await timed_runs(runs)
+        finally:
+            await llm.close_backend()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=4, help="tool rounds per run")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM latency (s)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with serve(create_app(tool_iterations=args.iterations, latency=args.latency)) as url:
+        results = asyncio.run(bench(args.runs, url))
+
+    calls = args.iterations + 1
+    print(f"{'mode':<16} {'mean run ms':>12} {'p95 run ms':>11} {'ms/LLM call':>12}")
+    for mode, durations in results.items():
+        mean = statistics.mean(durations) * 1000
+        p95 = statistics.quantiles(durations, n=20)[-1] * 1000
+        print(f"{mode:<16} {mean:>12.2f} {p95:>11.2f} {mean / calls:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
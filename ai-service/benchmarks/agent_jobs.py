@@ -0,0 +1,99 @@
+"""
+Background agent jobs under a burst: queue wait by priority, run time,
+rejections past the queue limit, and how quickly a running job cancels.
+
+Uses the in-process fake LLM backend, with `capacity` calls at once.
+Run from the ai-service/ directory:
+    python -m benchmarks.agent_jobs --jobs 60 --workers 4 --max-queue 50 --latency 0.1
+"""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+
+from app.services import jobs, llm
+
+BANDS = {"high (7-9)": range(7, 10), "normal (3-6)": range(3, 7), "low (0-2)": range(0, 3)}
+
+
+async def until_finished(job: jobs.Job):
+    async for _ in job.follow():
+        pass
+
+
+async def burst(queue: jobs.JobQueue, count: int) -> tuple:
+    rng = random.Random(0)
+    submitted, rejected, held = [], 0, []
+    for i in range(count):
+        started = time.perf_counter()
+        try:
+            submitted.append(queue.submit(i, "benchmark", "what are my comments?", rng.randrange(10)))
+        except jobs.JobQueueFullError:
+            rejected += 1
+        held.append(time.perf_counter() - started)
+    await asyncio.gather(*(until_finished(job) for job in submitted))
+    return submitted, rejected, held
+
+
+async def cancellation(queue: jobs.JobQueue) -> float:
+    job = queue.submit("cancel", "benchmark", "what are my comments?", 9)
+    while job.status != jobs.RUNNING:
+        await asyncio.sleep(0.001)
+    started = time.perf_counter()
+    queue.cancel(job)
+    await until_finished(job)
+    assert job.status == jobs.CANCELLED, job.status
+    return time.perf_counter() - started
+
+
+async def bench(args) -> dict:
+    llm.set_backend(llm.FakeBackend(tool_iterations=args.iterations, latency=args.latency, capacity=args.workers))
+    queue = jobs.JobQueue(workers=args.workers, max_queue=args.max_queue, retention=600, max_retained=10_000)
+    queue.start()
+    try:
+        submitted, rejected, held = await burst(queue, args.jobs)
+        cancel = await cancellation(queue)
+    finally:
+        await queue.stop()
+    return {"jobs": submitted, "rejected": rejected, "held": held, "cancel": cancel, "stats": queue.stats()}
+
+
+def ms(samples, cut) -> float:
+    if len(samples) < 2:
+        return samples[0] * 1000 if samples else 0.0
+    return statistics.quantiles(samples, n=20, method="inclusive")[cut] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2, help="tool rounds per run")
+    parser.add_argument("--latency", type=float, default=0.1, help="fake LLM latency (s)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    result = asyncio.run(bench(args))
+    finished = result["jobs"]
+    print(f"{args.jobs} jobs, {args.workers} workers, max queue {args.max_queue}, "
+          f"{args.iterations + 1} LLM calls of {args.latency * 1000:.0f} ms per run")
+    print(f"{'priority':<14} {'jobs':>5} {'p50 wait ms':>12} {'p95 wait ms':>12}")
+    for band, priorities in BANDS.items():
+        waits = [(j.started_at - j.created_at) for j in finished if j.priority in priorities]
+        print(f"{band:<14} {len(waits):>5} {ms(waits, 9):>12.1f} {ms(waits, 18):>12.1f}")
+
+    runs = [j.finished_at - j.started_at for j in finished]
+    whole = [j.finished_at - j.created_at for j in finished]
+    print(f"\nrun time p50 {ms(runs, 9):.1f} ms, p95 {ms(runs, 18):.1f} ms")
+    print(f"a blocking POST /chat/ would hold its connection p50 {ms(whole, 9):.1f} ms, p95 {ms(whole, 18):.1f} ms")
+    print(f"POST /chat/jobs/ returns after p95 {ms(result['held'], 18):.3f} ms of queueing work")
+    print(f"rejected past the queue limit: {result['rejected']}")
+    print(f"running job cancelled in {result['cancel'] * 1000:.1f} ms")
+    print(f"queue stats: {result['stats']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Turn latency with several tool calls per model turn, sequential vs concurrent.
+
+A stand-in MCP service answers each call after an artificial delay; later
+calls in a turn finish first, so the run also checks that tool messages
+are appended in the order the model issued the calls.
+
+Run from the ai-service/ directory:
+    python -m benchmarks.concurrent_tools --calls 4 --tool-latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import time
+from types import SimpleNamespace
+
+from mcp.types import ListToolsResult, Tool
+
+from app.config import settings
+from app.services import llm, openai, tool_registry
+from benchmarks.fake_ollama import create_app, serve
+
+
+class SlowMCP:
+    """Stand-in for TaskManagerMCP whose calls take `latency / entity_id` seconds"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def call_tool(self, tool_name, arguments):
+        entity_id = arguments["entity_id"]
+        await asyncio.sleep(self.latency / entity_id)
+        text = json.dumps({"entity_id": entity_id, "comments": []})
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+def check_order(messages, calls):
+    tool_ids = [json.loads(m["content"])["result"]["entity_id"] for m in messages if m["role"] == "tool"]
+    assert tool_ids == list(range(1, calls + 1)), f"tool messages out of order: {tool_ids}"
+
+
+async def one_turn(calls: int) -> float:
+    tool_calls = [
+        {"function": {"name": "fetch_comments", "arguments": {"entity_id": i + 1}}}
+        for i in range(calls)
+    ]
+    started = time.perf_counter()
+    results = await openai._run_tool_calls(tool_calls, "benchmark", tool_registry.current())
+    elapsed = time.perf_counter() - started
+
+    messages = [
+        {"role": "tool", "name": name, "content": json.dumps(result)}
+        for name, _, result in results
+    ]
+    check_order(messages, calls)
+    return elapsed
+
+
+async def bench(calls: int, runs: int, url: str):
+    results = {}
+    llm.set_backend(llm.OllamaBackend(url=url))
+    for mode, concurrency in (("sequential", 1), ("concurrent", calls)):
+        settings.AGENT_TOOL_CONCURRENCY = concurrency
+        with contextlib.redirect_stdout(io.StringIO()):
+            turn = min([await one_turn(calls) for _ in range(runs)])
+            started = time.perf_counter()
+            await openai.run_agent("comments for my tasks?", token="benchmark")
+            agent = time.perf_counter() - started
+        results[mode] = (turn, agent)
+    await llm.close_backend()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=4, help="tool calls per turn")
+    parser.add_argument("--tool-latency", type=float, default=0.2)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    openai.mcp_service = SlowMCP(args.tool_latency)
+    tool_registry.refresh(
+        ListToolsResult(tools=[Tool(name="fetch_comments", inputSchema={"type": "object"})])
+    )
+
+    app = create_app(tool_iterations=2, calls_per_turn=args.calls)
+    with serve(app) as url:
+        results = asyncio.run(bench(args.calls, args.runs, url))
+
+    print(f"{'mode':<11} {'turn ms':>9} {'agent run ms':>13}")
+    for mode, (turn, agent) in results.items():
+        print(f"{mode:<11} {turn * 1000:>9.1f} {agent * 1000:>13.1f}")
+    print("tool message order: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Minimal stand-in for Ollama's /api/chat used by the benchmarks.
+
+The fake asks for `tool_iterations` rounds of tool calls (counted from the
+`tool` messages already in the request) and then returns a final answer,
+so one agent run always takes `tool_iterations + 1` LLM calls. Each tool
+round asks for `calls_per_turn` calls with distinct `entity_id`s.
+
+`latency` is the delay before the first token and `token_delay` the time
+to generate each token of the answer. `capacity` limits how many requests
+are served at once, like a single GPU; the rest queue inside the server. With `"stream": true` the answer is
+sent as NDJSON chunks like Ollama does; otherwise it is sent at the end.
+
+The same behaviour is served in OpenAI's format at /v1/chat/completions
+for the OpenAI-compatible backend.
+
+Run it as a stand-alone server (e.g. for the load-test harness) with:
+    python -m benchmarks.fake_ollama --port 11434 --iterations 1 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ANSWER = "Here are your comments for the requested tasks, most recent first."
+
+
+def create_app(
+    tool_iterations: int = 3,
+    latency: float = 0.0,
+    token_delay: float = 0.0,
+    tool_name: str = "fetch_comments",
+    calls_per_turn: int = 1,
+    capacity: int = 0,
+) -> FastAPI:
+    app = FastAPI()
+    gpu = asyncio.Semaphore(capacity) if capacity else None
+
+    def decide(messages):
+        done = sum(1 for m in messages if m.get("role") == "tool")
+        if done < tool_iterations * calls_per_turn:
+            tool_calls = [
+                {"function": {"name": tool_name, "arguments": {"entity_id": done + i + 1}}}
+                for i in range(calls_per_turn)
+            ]
+            return [], tool_calls
+        return [word + " " for word in ANSWER.split()], []
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        payload = await request.json()
+        if gpu:
+            async with gpu:
+                return await respond(payload)
+        return await respond(payload)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        if gpu:
+            async with gpu:
+                return await respond_openai(payload)
+        return await respond_openai(payload)
+
+    async def respond_openai(payload):
+        tokens, tool_calls = decide(payload["messages"])
+        calls = [
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": c["function"]["name"], "arguments": json.dumps(c["function"]["arguments"])},
+            }
+            for i, c in enumerate(tool_calls)
+        ]
+        usage = {"prompt_tokens": sum(len(m.get("content") or "") for m in payload["messages"]) // 4}
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency + token_delay * len(tokens))
+            message = {"role": "assistant", "content": "".join(tokens) or None}
+            if calls:
+                message["tool_calls"] = calls
+            return {"choices": [{"index": 0, "message": message}], "usage": usage}
+
+        async def events():
+            await asyncio.sleep(latency)
+            for i, call in enumerate(calls):
+                delta = {"tool_calls": [{"index": i, **call}]}
+                yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+            for token in tokens:
+                await asyncio.sleep(token_delay)
+                delta = {"content": token}
+                yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+            yield f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def respond(payload):
+        model = payload["model"]
+        tokens, tool_calls = decide(payload["messages"])
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency + token_delay * len(tokens))
+            message = {"role": "assistant", "content": "".join(tokens)}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return {"model": model, "message": message, "done": True}
+
+        async def chunks():
+            await asyncio.sleep(latency)
+            if tool_calls:
+                message = {"role": "assistant", "content": "", "tool_calls": tool_calls}
+                yield json.dumps({"model": model, "message": message, "done": False}) + "\n"
+            for token in tokens:
+                await asyncio.sleep(token_delay)
+                message = {"role": "assistant", "content": token}
+                yield json.dumps({"model": model, "message": message, "done": False}) + "\n"
+            message = {"role": "assistant", "content": ""}
+            yield json.dumps({"model": model, "message": message, "done": True}) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return app
+
+
+@contextmanager
+def serve(app: FastAPI, host: str = "127.0.0.1", port: int = 11500):
+    """Run `app` with uvicorn in a background thread for the duration of the block"""
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://{host}:{port}/api/chat"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/chat server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--iterations", type=int, default=1, help="tool rounds per chat")
+    parser.add_argument("--latency", type=float, default=0.2, help="delay before the first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="per-token delay (s)")
+    parser.add_argument("--tool-name", default="fetch_comments")
+    parser.add_argument("--capacity", type=int, default=0, help="requests served at once, 0 for unlimited")
+    args = parser.parse_args()
+
+    app = create_app(
+        tool_iterations=args.iterations,
+        latency=args.latency,
+        token_delay=args.token_delay,
+        tool_name=args.tool_name,
+        capacity=args.capacity,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
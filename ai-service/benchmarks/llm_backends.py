@@ -0,0 +1,110 @@
+"""
+Compare LLM backends on the same agent traces.
+
+A trace is a list of chat prompts (one JSON object per line with a
+"prompt" key, or the built-in sample). Every backend replays the same
+trace through run_agent with `--concurrency` chats in flight, against the
+fake server (ollama, openai) or in process (fake, fake+batch). All of them
+serve `--capacity` LLM calls at once, so batching shows what grouping
+concurrent calls buys on a saturated model.
+
+Run from the ai-service/ directory:
+    python -m benchmarks.llm_backends --concurrency 16 --latency 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import statistics
+import time
+
+from app.config import settings
+from app.services import llm, openai
+from app.services.admission import AdmissionController
+from benchmarks.fake_ollama import create_app, serve
+
+SAMPLE_TRACE = [
+    "what are my tasks?",
+    "show the comments on task 3",
+    "add a comment to task 2 saying the fix is deployed",
+    "summarize the comments on task 7",
+    "which tasks mention the outage?",
+    "what did I comment on task 1?",
+    "list comments for task 4 and task 5",
+    "post 'looks good' on task 9",
+]
+
+
+def load_trace(path):
+    if not path:
+        return SAMPLE_TRACE
+    with open(path) as f:
+        return [json.loads(line)["prompt"] for line in f if line.strip()]
+
+
+async def replay(trace, repeat: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(prompt):
+        async with semaphore:
+            started = time.perf_counter()
+            await openai.run_agent(prompt, token="benchmark")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one(p) for p in trace * repeat))
+    return time.perf_counter() - started, latencies
+
+
+async def run_backend(factory, batch: bool, args, trace):
+    # Backends own an httpx client, so build them inside the running loop
+    backend = factory()
+    settings.LLM_BATCH_ENABLED = batch
+    settings.LLM_BATCH_WINDOW_MS = args.batch_window_ms
+    settings.LLM_BATCH_MAX_SIZE = args.concurrency
+    openai.llm_admission = llm.llm_admission = AdmissionController(args.concurrency, args.concurrency, 60)
+    llm.set_backend(backend)
+    try:
+        return await replay(trace, args.repeat, args.concurrency)
+    finally:
+        await llm.close_backend()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trace", help="JSONL file of {\"prompt\": ...} lines")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=1, help="tool rounds per chat")
+    parser.add_argument("--latency", type=float, default=0.05, help="LLM time per call (s)")
+    parser.add_argument("--capacity", type=int, default=1, help="LLM calls served at once")
+    parser.add_argument("--batch-window-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    trace = load_trace(args.trace)
+    app = create_app(tool_iterations=args.iterations, latency=args.latency, capacity=args.capacity)
+
+    with serve(app) as url:
+        backends = {
+            "ollama": (lambda: llm.OllamaBackend(url=url), False),
+            "openai": (lambda: llm.OpenAICompatibleBackend(base_url=url.replace("/api/chat", "/v1")), False),
+            "fake": (lambda: llm.FakeBackend(args.iterations, args.latency, capacity=args.capacity), False),
+            "fake+batch": (lambda: llm.FakeBackend(args.iterations, args.latency, capacity=args.capacity), True),
+        }
+        print(f"{'backend':<11} {'chats':>6} {'chats/s':>8} {'mean ms':>8} {'p95 ms':>8}")
+        for name, (factory, batch) in backends.items():
+            elapsed, latencies = asyncio.run(run_backend(factory, batch, args, trace))
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1000
+            print(
+                f"{name:<11} {len(latencies):>6} {len(latencies) / elapsed:>8.1f} "
+                f"{statistics.mean(latencies) * 1000:>8.1f} {p95:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tool-call throughput through TaskManagerMCP with 1 session vs a pool.
+
+Starts a stand-in SSE MCP server whose tool sleeps for `--tool-latency`,
+then runs `--chats` concurrent chats that each make `--calls` sequential
+tool calls.
+
+Run from the ai-service/ directory:
+    python -m benchmarks.mcp_pool --chats 100 --sizes 1 4 8
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+from app.services.task_manager_mcp import TaskManagerMCP
+
+
+def start_server(host: str, port: int, latency: float) -> uvicorn.Server:
+    server_mcp = FastMCP("Benchmark MCP", host=host, port=port)
+
+    @server_mcp.tool(name="fetch_comments")
+    async def fetch_comments(entity_id: int, token: str = ""):
+        await asyncio.sleep(latency)
+        return {"entity_id": entity_id, "comments": []}
+
+    server = uvicorn.Server(
+        uvicorn.Config(server_mcp.sse_app(), host=host, port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def chat(client: TaskManagerMCP, calls: int):
+    for i in range(calls):
+        await client.call_tool("fetch_comments", {"entity_id": i, "token": "benchmark"})
+
+
+async def measure(url: str, size: int, chats: int, calls: int):
+    client = TaskManagerMCP(size=size)
+    client.url = url
+    client.transport = "sse"
+    await client.connect()
+    # Let the remaining sessions of the pool come up
+    while sum(s.is_connected for s in client.sessions) < size:
+        await asyncio.sleep(0.05)
+
+    peak = 0.0
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, client.stats()["utilization"])
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    await asyncio.gather(*(chat(client, calls) for _ in range(chats)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+
+    stats = client.stats()
+    await client.close()
+    return stats["calls"] / elapsed, peak, stats["failures"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=5, help="tool calls per chat")
+    parser.add_argument("--tool-latency", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8021)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server = start_server("127.0.0.1", args.port, args.tool_latency)
+    url = f"http://127.0.0.1:{args.port}/sse"
+
+    print(f"{'sessions':>8} {'calls/s':>9} {'peak in-flight/session':>23} {'failures':>9}")
+    for size in args.sizes:
+        rate, peak, failures = asyncio.run(measure(url, size, args.chats, args.calls))
+        print(f"{size:>8} {rate:>9.1f} {peak:>23.1f} {failures:>9}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Open-loop load test of run_agent against a capacity-limited fake Ollama.
+
+Requests arrive at a fixed rate whether or not earlier ones finished.
+Each configuration reports latency percentiles of completed requests and
+how many were refused by the admission controller (HTTP 429 in the API).
+
+Run from the ai-service/ directory:
+    python -m benchmarks.ollama_load --rate 20 --duration 10 --capacity 2 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import time
+
+from app.services import llm, openai
+from app.services.admission import AdmissionController, LLMOverloadedError
+from benchmarks.fake_ollama import create_app, serve
+
+
+async def one_request(latencies: list, rejected: list):
+    started = time.perf_counter()
+    try:
+        await openai.run_agent("what are my tasks?", token="benchmark")
+        latencies.append(time.perf_counter() - started)
+    except LLMOverloadedError:
+        rejected.append(time.perf_counter() - started)
+
+
+async def run_load(controller: AdmissionController, rate: float, duration: float, url: str):
+    openai.llm_admission = controller
+    llm.set_backend(llm.OllamaBackend(url=url))
+    latencies, rejected, pending = [], [], []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            sent = 0
+            while time.perf_counter() - started < duration:
+                pending.append(asyncio.create_task(one_request(latencies, rejected)))
+                sent += 1
+                next_at = started + sent / rate
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            await asyncio.gather(*pending)
+    finally:
+        await llm.close_backend()
+    return latencies, rejected
+
+
+def percentiles(samples: list) -> tuple:
+    if len(samples) < 2:
+        value = samples[0] if samples else float("nan")
+        return value, value, value
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[94], cuts[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=20.0, help="requests per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--capacity", type=int, default=2, help="fake Ollama parallel slots")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM time per call (s)")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    configs = {
+        "unlimited": AdmissionController(10_000, 10_000, 3600),
+        "admission": AdmissionController(args.concurrency, args.queue, args.queue_timeout),
+    }
+
+    app = create_app(tool_iterations=0, latency=args.latency, capacity=args.capacity)
+    print(f"{'mode':<10} {'ok':>5} {'429':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    with serve(app) as url:
+        for mode, controller in configs.items():
+            latencies, rejected = asyncio.run(run_load(controller, args.rate, args.duration, url))
+            p50, p95, p99 = (p * 1000 for p in percentiles(latencies))
+            print(f"{mode:<10} {len(latencies):>5} {len(rejected):>5} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
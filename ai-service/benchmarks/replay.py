@@ -0,0 +1,438 @@
+"""
+Record-and-replay benchmark of the agent loop.
+
+`record` runs prompts through run_agent against the configured LLM backend
+and MCP server. It saves every model response and tool result, with its
+latency, to a cassette: JSON lines holding one "tools" header and then one
+"chat" per prompt.
+
+`replay` serves a cassette from a fake Ollama and a fake SSE MCP server.
+Both run in a child process. The same prompts then go through the real
+run_agent, OllamaBackend and TaskManagerMCP, so regressions in openai.py,
+llm.py or task_manager_mcp.py show up without a GPU or network. `--speed`
+scales the recorded latencies (0 replays as fast as possible).
+
+Replay reports:
+- throughput and latency percentiles
+- LLM calls per request, and how many prompts took a different number of
+  iterations than recorded
+- allocations under tracemalloc: process peak and the top sites in app/
+  code. This runs as a separate pass so tracing does not skew the timings.
+
+`--save` writes the results as JSON. `--baseline` exits non-zero if
+throughput or p95 latency moved more than `--tolerance` the wrong way, or
+if the iteration counts no longer match.
+
+Run from the ai-service/ directory:
+    python -m benchmarks.replay record --trace prompts.jsonl --out my-cassette.jsonl
+    python -m benchmarks.replay replay --cassette benchmarks/cassettes/sample.jsonl \\
+        --repeat 5 --concurrency 8 --save replay.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services import llm, openai
+from app.services.admission import AdmissionController
+from app.services.task_manager_mcp import TaskManagerMCP, mcp_service
+from benchmarks.llm_backends import load_trace
+from benchmarks.ollama_load import percentiles
+
+SAMPLE_CASSETTE = os.path.join(os.path.dirname(__file__), "cassettes", "sample.jsonl")
+
+
+# ─────────────────────────────
+# Cassettes
+# ─────────────────────────────
+def load_cassette(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """Return the recorded MCP tool definitions and the chats keyed by prompt"""
+    tools, chats = [], {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["kind"] == "tools":
+                tools = record["tools"]
+            else:
+                chats[record["prompt"]] = record
+    return tools, chats
+
+
+class RecordingBackend(llm.LLMBackend):
+    """Pass-through LLM backend that keeps each response and its latency"""
+
+    def __init__(self, inner: llm.LLMBackend):
+        self.inner = inner
+        self.name = inner.name
+        self.calls: List[Dict[str, Any]] = []
+
+    async def chat(self, messages, tools):
+        started = time.perf_counter()
+        response = await self.inner.chat(messages, tools)
+        self.calls.append({"latency": round(time.perf_counter() - started, 4), "response": response})
+        return response
+
+    def chat_stream(self, messages, tools):
+        # Recording drives run_agent, which never streams
+        return self.inner.chat_stream(messages, tools)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class RecordingMCP:
+    """Pass-through to the MCP pool that keeps each tool result and its latency"""
+
+    def __init__(self, inner: TaskManagerMCP):
+        self.inner = inner
+        self.calls: List[Dict[str, Any]] = []
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]):
+        started = time.perf_counter()
+        result = await self.inner.call_tool(tool_name, arguments)
+        self.calls.append({
+            "name": tool_name,
+            "arguments": {k: v for k, v in arguments.items() if k != "token"},
+            "latency": round(time.perf_counter() - started, 4),
+            "result": result.model_dump(mode="json", exclude_none=True),
+        })
+        return result
+
+
+async def record(prompts: List[str], out: str, token: str):
+    if not await mcp_service.connect():
+        raise SystemExit("Could not connect to the MCP server")
+    tools = await mcp_service.list_tools()
+    openai.initialise_llm(tools)
+    backend = RecordingBackend(llm.get_backend())
+    llm.set_backend(backend)
+    openai.mcp_service = RecordingMCP(mcp_service)
+
+    try:
+        with open(out, "w") as f:
+            header = [t.model_dump(mode="json", exclude_none=True) for t in tools.tools]
+            f.write(json.dumps({"kind": "tools", "tools": header}) + "\n")
+            # One prompt at a time so every call belongs to the prompt that made it
+            for prompt in prompts:
+                backend.calls, openai.mcp_service.calls = [], []
+                answer = await openai.run_agent(prompt, token=token)
+                f.write(json.dumps({
+                    "kind": "chat",
+                    "prompt": prompt,
+                    "answer": answer,
+                    "llm": backend.calls,
+                    "tools": openai.mcp_service.calls,
+                }) + "\n")
+                print(f"recorded {len(backend.calls)} LLM calls for {prompt!r}")
+    finally:
+        openai.mcp_service = mcp_service
+        await mcp_service.close()
+        await llm.close_backend()
+
+
+# ─────────────────────────────
+# Replay servers (child process)
+# ─────────────────────────────
+def ollama_replay_app(chats: Dict[str, Dict[str, Any]], speed: float):
+    """Fake /api/chat answering each turn with the response recorded for it"""
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.responses import StreamingResponse
+
+    app = FastAPI()
+    calls: Counter = Counter()
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        payload = await request.json()
+        messages = payload["messages"]
+        if not messages:
+            return {"model": payload["model"], "message": {"role": "assistant", "content": ""}, "done": True}
+
+        # The turn is the number of assistant replies after the current prompt
+        start = max(i for i, m in enumerate(messages) if m["role"] == "user")
+        prompt = messages[start]["content"]
+        if prompt not in chats:
+            raise HTTPException(status_code=404, detail=f"Prompt not in cassette: {prompt!r}")
+        turn = sum(1 for m in messages[start:] if m["role"] == "assistant")
+        recorded = chats[prompt]["llm"]
+        step = recorded[min(turn, len(recorded) - 1)]
+        calls[prompt] += 1
+
+        await asyncio.sleep(step["latency"] * speed)
+        response = {"model": payload["model"], "done": True, **step["response"]}
+        if not payload.get("stream"):
+            return response
+
+        async def chunks():
+            yield json.dumps({**response, "done": False}) + "\n"
+            final = {**response, "message": {"role": "assistant", "content": ""}}
+            yield json.dumps(final) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/calls")
+    async def call_counts():
+        return dict(calls)
+
+    return app
+
+
+def mcp_replay_app(tools: List[Dict[str, Any]], chats: Dict[str, Dict[str, Any]], speed: float):
+    """Fake SSE MCP server listing the recorded tools and replaying their results"""
+    from mcp import types
+    from mcp.server.lowlevel import Server
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+
+    server = Server("Replay MCP")
+    results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for chat in chats.values():
+        for call in chat["tools"]:
+            results[(call["name"], json.dumps(call["arguments"], sort_keys=True))] = call
+            by_name.setdefault(call["name"], call)
+
+    @server.list_tools()
+    async def list_tools() -> List[types.Tool]:
+        return [types.Tool.model_validate(t) for t in tools]
+
+    @server.call_tool(validate_input=False)
+    async def call_tool(name: str, arguments: Dict[str, Any]) -> types.CallToolResult:
+        arguments = {k: v for k, v in arguments.items() if k != "token"}
+        # Fall back to any result of the tool if the model asked for new arguments
+        call = results.get((name, json.dumps(arguments, sort_keys=True))) or by_name.get(name)
+        if call is None:
+            raise ValueError(f"Tool not in cassette: {name}")
+        await asyncio.sleep(call["latency"] * speed)
+        return types.CallToolResult.model_validate(call["result"])
+
+    sse = SseServerTransport("/messages/")
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
+            await server.run(streams[0], streams[1], server.create_initialization_options())
+        return Response()
+
+    return Starlette(routes=[
+        Route("/sse", endpoint=handle_sse, methods=["GET"]),
+        Mount("/messages/", app=sse.handle_post_message),
+    ])
+
+
+def _run_servers(cassette: str, ollama_port: int, mcp_port: int, speed: float):
+    import uvicorn
+
+    tools, chats = load_cassette(cassette)
+    servers = [
+        uvicorn.Server(uvicorn.Config(
+            ollama_replay_app(chats, speed), host="127.0.0.1", port=ollama_port, log_level="warning"
+        )),
+        uvicorn.Server(uvicorn.Config(
+            mcp_replay_app(tools, chats, speed), host="127.0.0.1", port=mcp_port, log_level="warning"
+        )),
+    ]
+
+    async def main():
+        await asyncio.gather(*(s.serve() for s in servers))
+
+    asyncio.run(main())
+
+
+def start_servers(cassette: str, ollama_port: int, mcp_port: int, speed: float) -> multiprocessing.Process:
+    process = multiprocessing.Process(
+        target=_run_servers, args=(cassette, ollama_port, mcp_port, speed), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{ollama_port}/calls").raise_for_status()
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.05)
+    process.terminate()
+    raise SystemExit("Replay servers did not start")
+
+
+# ─────────────────────────────
+# Replay
+# ─────────────────────────────
+async def replay(prompts: List[str], args, trace_allocations: bool) -> Dict[str, Any]:
+    ollama_url = f"http://127.0.0.1:{args.ollama_port}/api/chat"
+    pool = TaskManagerMCP(size=args.pool_size)
+    pool.url = f"http://127.0.0.1:{args.mcp_port}/sse"
+    pool.transport = "sse"
+    if not await pool.connect():
+        raise SystemExit("Could not connect to the replay MCP server")
+    openai.mcp_service = pool
+    openai.initialise_llm(await pool.list_tools())
+    llm.set_backend(llm.OllamaBackend(url=ollama_url))
+    # Production admission limits, on a semaphore bound to this event loop
+    openai.llm_admission = AdmissionController(
+        settings.OLLAMA_MAX_CONCURRENCY, settings.OLLAMA_MAX_QUEUE, settings.OLLAMA_QUEUE_TIMEOUT
+    )
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(prompt: str):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            answer = await openai.run_agent(prompt, token="benchmark")
+            latencies.append(time.perf_counter() - started)
+            errors += answer.startswith("[Agent error")
+
+    calls_before = Counter(httpx.get(ollama_url.replace("/api/chat", "/calls")).json())
+    if trace_allocations:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(p) for p in prompts))
+        elapsed = time.perf_counter() - started
+        if trace_allocations:
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+    finally:
+        openai.mcp_service = mcp_service
+        await pool.close()
+        await llm.close_backend()
+
+    calls = Counter(httpx.get(ollama_url.replace("/api/chat", "/calls")).json()) - calls_before
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "llm_calls": sum(calls.values()),
+        "calls_by_prompt": dict(calls),
+        "latencies": latencies,
+    }
+    if trace_allocations:
+        app_only = [tracemalloc.Filter(True, os.path.join("*", "app", "*"))]
+        stats = after.filter_traces(app_only).compare_to(before.filter_traces(app_only), "lineno")
+        result["peak_kib"] = peak / 1024
+        result["top_sites"] = [
+            {"site": str(s.traceback[0]), "size_kib": s.size_diff / 1024, "count": s.count_diff}
+            for s in stats[: args.top]
+        ]
+    return result
+
+
+def summarize(timing: Dict[str, Any], allocations: Dict[str, Any], chats, prompts: List[str]) -> Dict[str, Any]:
+    p50, p95, p99 = (p * 1000 for p in percentiles(timing["latencies"]))
+    runs = Counter(prompts)
+    mismatched = sorted(
+        prompt for prompt, count in runs.items()
+        if timing["calls_by_prompt"].get(prompt, 0) != len(chats[prompt]["llm"]) * count
+    )
+    return {
+        "requests": timing["requests"],
+        "errors": timing["errors"],
+        "requests_per_s": timing["requests"] / timing["elapsed_s"],
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "llm_calls_per_request": timing["llm_calls"] / max(timing["requests"], 1),
+        "recorded_llm_calls_per_request": statistics.mean(len(chats[p]["llm"]) for p in prompts),
+        "iteration_mismatches": mismatched,
+        "peak_kib_per_request": allocations["peak_kib"] / max(allocations["requests"], 1),
+        "top_sites": allocations["top_sites"],
+    }
+
+
+def regressions(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    found = []
+    if summary["requests_per_s"] < baseline["requests_per_s"] * (1 - tolerance):
+        found.append(f"throughput {summary['requests_per_s']:.1f}/s < baseline {baseline['requests_per_s']:.1f}/s")
+    if summary["p95_ms"] > baseline["p95_ms"] * (1 + tolerance):
+        found.append(f"p95 {summary['p95_ms']:.0f} ms > baseline {baseline['p95_ms']:.0f} ms")
+    if summary["iteration_mismatches"]:
+        found.append(f"{len(summary['iteration_mismatches'])} prompts changed iteration count")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="record a cassette against the configured services")
+    rec.add_argument("--trace", help="JSONL file of {\"prompt\": ...} lines (default: built-in sample)")
+    rec.add_argument("--out", required=True)
+    rec.add_argument("--token", default=os.environ.get("BENCHMARK_TOKEN", "benchmark"),
+                     help="JWT passed to the tools (default: $BENCHMARK_TOKEN)")
+
+    rep = commands.add_parser("replay", help="replay a cassette and report performance")
+    rep.add_argument("--cassette", default=SAMPLE_CASSETTE)
+    rep.add_argument("--repeat", type=int, default=5)
+    rep.add_argument("--concurrency", type=int, default=8)
+    rep.add_argument("--speed", type=float, default=1.0, help="multiplier for recorded latencies")
+    rep.add_argument("--pool-size", type=int, default=4, help="MCP sessions")
+    rep.add_argument("--top", type=int, default=5, help="allocation sites to show")
+    rep.add_argument("--ollama-port", type=int, default=11510)
+    rep.add_argument("--mcp-port", type=int, default=8031)
+    rep.add_argument("--save", help="write the results to this JSON file")
+    rep.add_argument("--baseline", help="JSON results to compare against")
+    rep.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.command == "record":
+        asyncio.run(record(load_trace(args.trace), args.out, args.token))
+        return
+
+    _, chats = load_cassette(args.cassette)
+    prompts = list(chats) * args.repeat
+    process = start_servers(args.cassette, args.ollama_port, args.mcp_port, args.speed)
+    try:
+        timing = asyncio.run(replay(prompts, args, trace_allocations=False))
+        allocations = asyncio.run(replay(list(chats), args, trace_allocations=True))
+    finally:
+        process.terminate()
+
+    summary = summarize(timing, allocations, chats, prompts)
+    print(f"{'requests':>8} {'errors':>6} {'req/s':>7} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'LLM calls/req':>13} {'recorded':>8} {'peak KiB/req':>12}")
+    print(
+        f"{summary['requests']:>8} {summary['errors']:>6} {summary['requests_per_s']:>7.1f} "
+        f"{summary['p50_ms']:>7.0f} {summary['p95_ms']:>7.0f} {summary['p99_ms']:>7.0f} "
+        f"{summary['llm_calls_per_request']:>13.2f} {summary['recorded_llm_calls_per_request']:>8.2f} "
+        f"{summary['peak_kib_per_request']:>12.1f}"
+    )
+    for prompt in summary["iteration_mismatches"]:
+        print(f"iterations differ from the recording for {prompt!r}")
+    print("\nNet allocations by app/ code still held after one pass over the cassette:")
+    for site in summary["top_sites"]:
+        print(f"  {site['size_kib']:>8.1f} KiB {site['count']:>6} blocks  {site['site']}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(summary, json.load(f), args.tolerance)
+        for problem in found:
+            print(f"REGRESSION: {problem}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
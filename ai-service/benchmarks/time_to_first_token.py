@@ -0,0 +1,76 @@
+"""
+Time-to-first-token of the blocking run_agent path versus run_agent_stream.
+
+Run from the ai-service/ directory:
+    python -m benchmarks.time_to_first_token --runs 20 --latency 0.3 --token-delay 0.05
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import statistics
+import time
+
+from app.services import llm, openai
+from benchmarks.fake_ollama import create_app, serve
+
+PROMPT = "what are my comments?"
+
+
+async def blocking_ttft() -> tuple:
+    started = time.perf_counter()
+    await openai.run_agent(PROMPT, token="benchmark")
+    elapsed = time.perf_counter() - started
+    # The whole answer arrives at once, so first token == full response
+    return elapsed, elapsed
+
+
+async def streaming_ttft() -> tuple:
+    started = time.perf_counter()
+    first = None
+    async for event in openai.run_agent_stream(PROMPT, token="benchmark"):
+        if first is None and event["event"] == "token":
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+async def bench(runs: int, url: str):
+    results = {"blocking": [], "streaming": []}
+    llm.set_backend(llm.OllamaBackend(url=url))
+    try:
+        for _ in range(runs):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results["blocking"].append(await blocking_ttft())
+                results["streaming"].append(await streaming_ttft())
+    finally:
+        await llm.close_backend()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=2, help="tool rounds per run")
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.05, help="per-token delay (s)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    app = create_app(
+        tool_iterations=args.iterations,
+        latency=args.latency,
+        token_delay=args.token_delay,
+    )
+    with serve(app) as url:
+        results = asyncio.run(bench(args.runs, url))
+
+    print(f"{'mode':<10} {'mean TTFT ms':>13} {'mean total ms':>14}")
+    for mode, samples in results.items():
+        ttft = statistics.mean(s[0] for s in samples) * 1000
+        total = statistics.mean(s[1] for s in samples) * 1000
+        print(f"{mode:<10} {ttft:>13.1f} {total:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Tests for the agent, run from the ai-service/ directory:
+    python -m pytest tests
+
+app.config reads its settings when first imported and requires a few that
+the tests never use, so placeholders are set before the app is imported.
+"""
+import os
+
+for _key, _value in {
+    "OPEN_AI_KEY": "test",
+    "DJANGO_SECRET_KEY": "test",
+    "JWT_ALGORITHM": "HS256",
+}.items():
+    os.environ.setdefault(_key, _value)
@@ -0,0 +1,96 @@
+import asyncio
+import contextlib
+import json
+from types import SimpleNamespace
+
+import pytest
+from mcp.types import ListToolsResult, Tool
+
+from app.services import llm, openai, tool_registry
+from app.services.admission import AdmissionController, LLMOverloadedError
+
+
+class RefuseFrom:
+    """Admission that lets the first `allowed` LLM calls through and refuses the rest"""
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.allowed <= 0:
+            raise LLMOverloadedError("LLM queue is full")
+        self.allowed -= 1
+        yield
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, tool_name, arguments):
+        self.calls.append(tool_name)
+        return SimpleNamespace(content=[SimpleNamespace(text=json.dumps({"ok": True}))])
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(openai, "mcp_service", session)
+    monkeypatch.setattr(llm, "_backend", llm.FakeBackend(tool_iterations=2, tool_name="create_comment"))
+    monkeypatch.setattr(llm, "_batcher", None)
+    tool_registry.refresh(ListToolsResult(tools=[Tool(name="create_comment", inputSchema={"type": "object"})]))
+    return session
+
+
+def test_refusal_before_any_tool_propagates(agent, monkeypatch):
+    monkeypatch.setattr(openai, "llm_admission", RefuseFrom(0))
+
+    with pytest.raises(LLMOverloadedError):
+        asyncio.run(openai.run_agent("comment on task 1", token="token"))
+    assert agent.calls == []
+
+
+def test_refusal_after_a_tool_ran_completes_with_an_error_answer(agent, monkeypatch):
+    monkeypatch.setattr(openai, "llm_admission", RefuseFrom(1))
+
+    answer = asyncio.run(openai.run_agent("comment on task 1", token="token"))
+
+    assert agent.calls == ["create_comment"]
+    assert answer.startswith("[Agent error: LLM queue is full")
+    assert "create_comment" in answer
+
+
+def test_streamed_refusal_after_a_tool_ran_ends_with_an_error_event(agent, monkeypatch):
+    monkeypatch.setattr(openai, "llm_admission", RefuseFrom(1))
+
+    async def events():
+        return [event async for event in openai.run_agent_stream("comment on task 1", token="token")]
+
+    received = asyncio.run(events())
+
+    assert [e["event"] for e in received if e["event"] in ("tool_result", "error")] == ["tool_result", "error"]
+    assert "create_comment" in received[-1]["detail"]
+
+
+def test_a_wait_timing_out_as_a_slot_frees_never_loses_the_permit():
+    async def main():
+        loop = asyncio.get_running_loop()
+        for offset in (-2e-3, -1e-4, 0.0, 1e-4, 2e-3):
+            admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.01)
+            await admission._semaphore.acquire()
+
+            async def wait_for_slot():
+                with contextlib.suppress(LLMOverloadedError):
+                    async with admission.slot():
+                        pass
+
+            waiter = asyncio.create_task(wait_for_slot())
+            await asyncio.sleep(0)
+            # The holder lets go around the moment the waiter's deadline passes
+            loop.call_at(loop.time() + 0.01 + offset, admission._semaphore.release)
+            await waiter
+            await asyncio.sleep(0.01)
+            assert (admission._semaphore._value, admission.waiting, admission.active) == (1, 0, 0), offset
+
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.coalescing import CoalescingCache
+
+
+def test_cancelled_leader_hands_the_build_to_a_follower():
+    cache = CoalescingCache(max_entries=8, ttl=30.0)
+    builds = []
+
+    async def build():
+        builds.append(len(builds))
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_build((1, "key"), build))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(cache.get_or_build((1, "key"), build)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # The client that started the build disconnects
+        leader.cancel()
+        return await asyncio.gather(*followers), leader
+
+    results, leader = asyncio.run(main())
+
+    assert leader.cancelled()
+    assert results == ["page"] * 3
+    # One follower built it again; the other two waited for that build
+    assert len(builds) == 2
+
+
+def test_cancelled_follower_leaves_the_build_running():
+    cache = CoalescingCache(max_entries=8, ttl=30.0)
+
+    async def build():
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def main():
+        leader = asyncio.create_task(cache.get_or_build((1, "key"), build))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(cache.get_or_build((1, "key"), build))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader, follower
+
+    result, follower = asyncio.run(main())
+
+    assert (result, follower.cancelled()) == ("page", True)
+
+
+def test_build_errors_reach_every_caller_and_are_not_cached():
+    cache = CoalescingCache(max_entries=8, ttl=30.0)
+    calls = []
+
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(
+            *(cache.get_or_build((1, "key"), build) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(calls) == 1 and cache.stats()["entries"] == 0
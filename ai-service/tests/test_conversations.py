@@ -0,0 +1,21 @@
+from app.services.context import prompt_tokens
+from app.services.conversations import Conversation
+
+
+def test_history_is_capped_dropping_whole_turns_oldest_first():
+    conversation = Conversation(max_tokens=200)
+    for i in range(50):
+        conversation.add_turn(f"question {i} " + "x" * 100, f"answer {i} " + "y" * 100)
+
+    assert prompt_tokens(conversation.messages) <= 200
+    assert [m["role"] for m in conversation.messages[:2]] == ["user", "assistant"]
+    assert conversation.messages[-1]["content"].startswith("answer 49 ")
+    assert len(conversation.messages) % 2 == 0
+
+
+def test_newest_turn_is_kept_even_above_the_cap():
+    conversation = Conversation(max_tokens=10)
+    conversation.add_turn("short", "short")
+    conversation.add_turn("q" * 400, "a" * 400)
+
+    assert [m["content"][0] for m in conversation.messages] == ["q", "a"]
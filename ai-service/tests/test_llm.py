@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from app.services import llm, openai
+from app.services.admission import AdmissionController, LLMOverloadedError
+
+
+def test_backends_must_implement_chat_and_stream():
+    class ChatOnly(llm.LLMBackend):
+        async def chat(self, messages, tools):
+            return {}
+
+    with pytest.raises(TypeError):
+        ChatOnly()
+
+
+def test_a_batch_takes_one_admission_slot(monkeypatch):
+    backend = llm.FakeBackend(latency=0.05)
+    admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setattr(openai, "llm_admission", admission)
+    monkeypatch.setattr(llm, "_backend", backend)
+    monkeypatch.setattr(llm, "_batcher", llm.MicroBatcher(backend, window=0.01, max_size=8, admission=admission))
+
+    async def burst():
+        return await asyncio.gather(*(openai.call_llm([{"role": "user", "content": str(i)}], ()) for i in range(8)))
+
+    responses = asyncio.run(burst())
+
+    assert len(responses) == 8
+    assert (backend.batches, backend.calls, admission.rejected) == (1, 8, 0)
+
+
+def test_a_refused_batch_fails_all_its_calls():
+    backend = llm.FakeBackend()
+    admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+    batcher = llm.MicroBatcher(backend, window=0.01, max_size=2, admission=admission)
+
+    async def while_full():
+        async with admission.slot():
+            return await asyncio.gather(
+                *(batcher.chat([{"role": "user", "content": "hi"}], ()) for _ in range(2)), return_exceptions=True
+            )
+
+    results = asyncio.run(while_full())
+
+    assert all(isinstance(result, LLMOverloadedError) for result in results)
+    assert backend.calls == 0
+
+
+def test_batching_is_a_logged_no_op_for_backends_without_batches(monkeypatch, caplog):
+    monkeypatch.setattr(llm.settings, "LLM_BATCH_ENABLED", True)
+    monkeypatch.setattr(llm, "_backend", None)
+    monkeypatch.setattr(llm, "_batcher", None)
+
+    with caplog.at_level("WARNING", logger="LLM"):
+        llm.set_backend(llm.OllamaBackend(url="http://llm.invalid/api/chat"))
+    assert not llm.batching()
+    assert "LLM_BATCH_ENABLED has no effect" in caplog.text
+
+    llm.set_backend(llm.FakeBackend())
+    assert llm.batching()
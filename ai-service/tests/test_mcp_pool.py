@@ -0,0 +1,49 @@
+import asyncio
+
+import anyio
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, INVALID_PARAMS, ErrorData
+
+from app.services.task_manager_mcp import TaskManagerMCP
+
+
+class FailingSession:
+    def __init__(self, error):
+        self.error = error
+
+    async def call_tool(self, tool_name, arguments):
+        raise self.error
+
+
+def call_with(error):
+    """Call a tool on a one-session pool whose session raises `error`; return the pooled session"""
+    pool = TaskManagerMCP(size=1)
+    pooled = pool.sessions[0]
+    pooled.session = FailingSession(error)
+    pooled.ready.set()
+
+    async def call():
+        with pytest.raises(type(error)):
+            await pool.call_tool("fetch_comments", {"entity_id": 1})
+
+    asyncio.run(call())
+    return pooled
+
+
+def test_tool_level_errors_keep_the_session():
+    pooled = call_with(McpError(ErrorData(code=INVALID_PARAMS, message="entity_id must be an integer")))
+
+    assert not pooled._broken.is_set()
+    assert (pooled.failures, pooled.in_flight) == (1, 0)
+
+
+@pytest.mark.parametrize("error", [
+    McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed")),
+    anyio.ClosedResourceError(),
+    ConnectionResetError(),
+])
+def test_transport_errors_mark_the_session_broken(error):
+    pooled = call_with(error)
+
+    assert pooled._broken.is_set()
@@ -0,0 +1,111 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import task_feed
+from app.services.coalescing import CoalescingCache
+from app.services.task_feed import UpstreamError
+
+TASKS = [{"id": 1, "title": "first"}, {"id": 2, "title": "second"}]
+
+
+class Upstream:
+    """Stand-in for core-backend and the comment service, recording every request"""
+
+    def __init__(self, tasks=TASKS, core_status=200, delay=0.0):
+        self.tasks = tasks
+        self.core_status = core_status
+        self.delay = delay
+        self.requests = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        await asyncio.sleep(self.delay)
+        if request.url.path == "/tasks/":
+            if self.core_status != 200:
+                return httpx.Response(self.core_status, text="invalid status filter")
+            return httpx.Response(200, json={"count": len(self.tasks), "next": None, "results": self.tasks})
+        ids = [int(i) for i in parse_qs(request.url.query.decode())["entity_ids"]]
+        return httpx.Response(200, json=[
+            {"entity_id": i, "count": 2, "latest": [{"id": 10 * i, "content": f"on {i}"}]} for i in ids if i != 2
+        ])
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    def install(**kwargs) -> Upstream:
+        stand_in = Upstream(**kwargs)
+        monkeypatch.setattr(task_feed, "_client", httpx.AsyncClient(transport=httpx.MockTransport(stand_in)))
+        return stand_in
+    return install
+
+
+def test_page_joins_tasks_with_one_summary_request(upstream):
+    stand_in = upstream()
+
+    page = asyncio.run(task_feed.build_page("token", 1, 20, 3, {"status": "todo"}))
+
+    assert [(t["id"], t["comment_count"], len(t["latest_comments"])) for t in page["results"]] == [(1, 2, 1), (2, 0, 0)]
+    assert (page["count"], page["has_next"]) == (2, False)
+    core, comment = stand_in.requests
+    assert core.url.params["status"] == "todo"
+    assert comment.url.params.get_list("entity_ids") == ["1", "2"]
+    assert comment.headers["Authorization"] == "Bearer token"
+
+
+def test_empty_page_skips_the_comment_service(upstream):
+    stand_in = upstream(tasks=[])
+
+    page = asyncio.run(task_feed.build_page("token", 1, 20, 3, {}))
+
+    assert page["results"] == []
+    assert [r.url.path for r in stand_in.requests] == ["/tasks/"]
+
+
+def test_upstream_errors_keep_their_status(upstream):
+    upstream(core_status=400)
+
+    with pytest.raises(UpstreamError) as raised:
+        asyncio.run(task_feed.build_page("token", 1, 20, 3, {"status": "nope"}))
+
+    assert (raised.value.service, raised.value.status_code) == ("core", 400)
+
+
+def test_cached_pages_coalesce_identical_requests(upstream, monkeypatch):
+    stand_in = upstream(delay=0.05)
+    monkeypatch.setattr(settings, "TASK_FEED_CACHE_TTL", 30.0)
+    monkeypatch.setattr(task_feed, "page_cache", CoalescingCache(max_entries=8, ttl=30.0))
+
+    async def main():
+        together = await asyncio.gather(*(task_feed.get_page(1, "token", 1, 20, 3, {}) for _ in range(5)))
+        again = await task_feed.get_page(1, "token", 1, 20, 3, {})
+        task_feed.page_cache.invalidate_user(1)
+        await task_feed.get_page(1, "token", 1, 20, 3, {})
+        return together, again
+
+    together, again = asyncio.run(main())
+
+    assert all(page is together[0] for page in together) and again is together[0]
+    # One build for the five concurrent calls and the cached one, one after the invalidation
+    assert len(stand_in.requests) == 4
+
+
+def test_page_built_across_an_invalidation_is_not_cached(upstream, monkeypatch):
+    stand_in = upstream(delay=0.05)
+    monkeypatch.setattr(settings, "TASK_FEED_CACHE_TTL", 30.0)
+    monkeypatch.setattr(task_feed, "page_cache", CoalescingCache(max_entries=8, ttl=30.0))
+
+    async def main():
+        building = asyncio.create_task(task_feed.get_page(1, "token", 1, 20, 3, {}))
+        await asyncio.sleep(0.01)
+        # A comment is created while the page is being assembled
+        task_feed.page_cache.invalidate_user(1)
+        await building
+        await task_feed.get_page(1, "token", 1, 20, 3, {})
+
+    asyncio.run(main())
+
+    assert len(stand_in.requests) == 4
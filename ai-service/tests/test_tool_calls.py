@@ -0,0 +1,124 @@
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+from mcp.types import ListToolsResult, Tool
+
+from app.config import settings
+from app.services import llm, openai, tool_registry
+
+
+class SlowSession:
+    """Stand-in for the MCP pool: each call sleeps for its entity's latency and is counted"""
+
+    def __init__(self, latencies):
+        self.latencies = latencies
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+
+    async def call_tool(self, tool_name, arguments):
+        entity_id = arguments["entity_id"]
+        self.started.append(entity_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latencies[entity_id])
+        finally:
+            self.in_flight -= 1
+        text = json.dumps({"entity_id": entity_id, "token": arguments.get("token")})
+        return SimpleNamespace(content=[SimpleNamespace(text=text)])
+
+
+class ScriptedBackend(llm.LLMBackend):
+    """Asks for every call in `tool_calls` in one turn, then answers; keeps each prompt"""
+
+    name = "scripted"
+
+    def __init__(self, tool_calls):
+        self.tool_calls = tool_calls
+        self.prompts = []
+
+    async def chat(self, messages, tools):
+        self.prompts.append(messages)
+        if len(self.prompts) == 1:
+            return {"message": {"role": "assistant", "content": "", "tool_calls": self.tool_calls}}
+        return {"message": {"role": "assistant", "content": "done"}}
+
+    async def chat_stream(self, messages, tools):
+        yield await self.chat(messages, tools)
+
+
+def calls_for(entity_ids):
+    return [{"function": {"name": "fetch_comments", "arguments": {"entity_id": i}}} for i in entity_ids]
+
+
+def entity_ids_of(results):
+    return [result["result"]["entity_id"] for _, _, result in results]
+
+
+@pytest.fixture
+def session(monkeypatch):
+    rng = random.Random(29)
+    latencies = {entity_id: rng.uniform(0.0, 0.05) for entity_id in range(1, 17)}
+    fake = SlowSession(latencies)
+    monkeypatch.setattr(openai, "mcp_service", fake)
+    monkeypatch.setattr(settings, "AGENT_TOOL_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "AGENT_TOOL_TIMEOUT", 1.0)
+    tool_registry.refresh(ListToolsResult(tools=[Tool(name="fetch_comments", inputSchema={"type": "object"})]))
+    return fake
+
+
+def test_results_keep_the_order_the_model_issued(session):
+    results = asyncio.run(openai._run_tool_calls(calls_for(range(1, 17)), "token", tool_registry.current()))
+
+    assert entity_ids_of(results) == list(range(1, 17))
+    # Calls start in order, finish in whatever order their latencies give
+    assert session.started == list(range(1, 17))
+    assert all(result["result"]["token"] == "token" for _, _, result in results)
+
+
+def test_at_most_the_configured_calls_run_at_once(session):
+    asyncio.run(openai._run_tool_calls(calls_for(range(1, 17)), "token", tool_registry.current()))
+
+    assert session.max_in_flight == settings.AGENT_TOOL_CONCURRENCY
+
+
+def test_a_slow_call_times_out_without_holding_up_the_rest(session, monkeypatch):
+    monkeypatch.setattr(settings, "AGENT_TOOL_TIMEOUT", 0.2)
+    session.latencies[3] = 5.0
+
+    started = time.perf_counter()
+    results = asyncio.run(openai._run_tool_calls(calls_for(range(1, 9)), "token", tool_registry.current()))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    by_entity = {raw_args["entity_id"]: result for _, raw_args, result in results}
+    assert by_entity[3] == {"success": False, "error": "Timeout calling tool 'fetch_comments' after 0.2s"}
+    assert all(by_entity[i]["success"] for i in by_entity if i != 3)
+
+
+def test_unknown_tools_are_reported_not_called(session):
+    tool_calls = calls_for([1]) + [{"function": {"name": "drop_tables", "arguments": "{}"}}] + calls_for([2])
+
+    results = asyncio.run(openai._run_tool_calls(tool_calls, "token", tool_registry.current()))
+
+    assert [name for name, _, _ in results] == ["fetch_comments", "drop_tables", "fetch_comments"]
+    assert results[1][2] == {"error": "Unknown tool: drop_tables"}
+    assert session.started == [1, 2]
+
+
+def test_run_agent_appends_tool_messages_in_call_order(session, monkeypatch):
+    backend = ScriptedBackend(calls_for(range(1, 13)))
+    monkeypatch.setattr(llm, "_backend", backend)
+    monkeypatch.setattr(llm, "_batcher", None)
+
+    answer = asyncio.run(openai.run_agent("comments on my tasks?", token="token"))
+
+    assert answer == "done"
+    assert session.max_in_flight <= settings.AGENT_TOOL_CONCURRENCY
+    tool_messages = [m for m in backend.prompts[1] if m["role"] == "tool"]
+    assert [json.loads(m["content"])["result"]["entity_id"] for m in tool_messages] == list(range(1, 13))
@@ -0,0 +1,142 @@
+"""
+Latency of comment search at several million comments.
+
+Seeds `--comments` synthetic comments over `--users` users and
+`--entities` entities into DATABASE_URL (use a scratch database; seeding
+is skipped when it already holds enough), then builds the search index.
+A small share of comments mention "outage", "rollback" or "invoice".
+Each query is then timed three ways for one user's comments:
+
+    list entities   what the agent did before: list_comments for every
+                    entity the user commented on, matched in Python
+    like scan       a LIKE '%word%' filter over the user's comments, first
+                    20 matches, unranked
+    search          the full-text index, one ranked page of 20
+
+Run from the repository root:
+    DATABASE_URL=sqlite:////tmp/comments.sqlite3 APP_NAME=bench PORT=0 \\
+        DJANGO_SECRET_KEY=x JWT_ALGORITHM=HS256 \\
+        python -m comment.benchmark_search --comments 3000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, select, text
+from sqlmodel import SQLModel
+
+from . import search
+from .database import engine
+from .models.comment import Comment
+
+PLANTED = {"outage": 0.001, "rollback": 0.005, "invoice": 0.02}
+QUERIES = ["outage", "rollback deploy", "invoice"]
+
+
+def vocabulary(rng: random.Random, size: int = 5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(size)]
+
+
+def seed(total: int, users: int, entities: int, batch_size: int = 50_000):
+    with engine.connect() as connection:
+        existing = connection.execute(select(func.count()).select_from(Comment)).scalar_one()
+    if existing >= total:
+        return
+    print(f"Seeding {total - existing:,} comments...")
+    rng = random.Random(0)
+    words = vocabulary(rng) + ["deploy", "service", "customer", "payment"] * 50
+    start = datetime(2020, 1, 1)
+    insert = Comment.__table__.insert()
+    started = time.perf_counter()
+    for offset in range(existing, total, batch_size):
+        rows = []
+        for i in range(offset, min(offset + batch_size, total)):
+            content = rng.choices(words, k=rng.randint(6, 24))
+            for word, share in PLANTED.items():
+                if rng.random() < share:
+                    content.insert(rng.randrange(len(content)), word)
+            created = start + timedelta(seconds=i * 30)
+            rows.append({
+                "content": " ".join(content),
+                "entity_id": rng.randrange(entities) + 1,
+                "user_id": i % users + 1,
+                "created_at": created,
+                "updated_at": created,
+            })
+        with engine.begin() as connection:
+            connection.execute(insert, rows)
+    print(f"  {time.perf_counter() - started:.1f} s")
+
+
+# ─────────────────────────────
+def list_entities(connection, user_id: int, query: str):
+    entity_ids = connection.execute(
+        select(Comment.entity_id).where(Comment.user_id == user_id).distinct()
+    ).scalars().all()
+    per_entity = select(Comment).where(
+        (Comment.entity_id == bindparam("entity_id")) & (Comment.deleted_at.is_(None))
+    )
+    words = query.split()
+    matches = []
+    for entity_id in entity_ids:
+        for comment in connection.execute(per_entity, {"entity_id": entity_id}).mappings():
+            if all(word in comment["content"] for word in words):
+                matches.append(comment)
+    return matches
+
+
+def like_scan(connection, user_id: int, query: str):
+    statement = select(Comment).where((Comment.user_id == user_id) & (Comment.deleted_at.is_(None)))
+    for word in query.split():
+        statement = statement.where(Comment.content.like(f"%{word}%"))
+    return connection.execute(statement.limit(20)).all()
+
+
+def full_text(connection, user_id: int, query: str):
+    return search.search(connection, query, user_id=user_id, limit=20)
+
+
+def measure(runs: int, users: int, method, query: str):
+    latencies = []
+    with engine.connect() as connection:
+        for i in range(runs):
+            started = time.perf_counter()
+            method(connection, i % users + 1, query)
+            latencies.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(latencies, n=20, method="inclusive")
+    return cuts[9], cuts[18]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=3_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20, help="timed runs per query and method")
+    parser.add_argument("--skip-baseline", action="store_true", help="time only the full-text search")
+    args = parser.parse_args()
+
+    SQLModel.metadata.create_all(engine)
+    seed(args.comments, args.users, args.entities)
+    started = time.perf_counter()
+    search.install(engine)
+    print(f"Search index ready in {time.perf_counter() - started:.1f} s")
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+    methods = {"search": full_text}
+    if not args.skip_baseline:
+        methods = {"list entities": list_entities, "like scan": like_scan, **methods}
+    print(f"\n{engine.dialect.name}, {args.comments:,} comments, ~{args.comments // args.users:,} per user")
+    print(f"{'query':<18} {'method':<14} {'p50 ms':>9} {'p95 ms':>9}")
+    for query in QUERIES:
+        for name, method in methods.items():
+            p50, p95 = measure(args.runs, args.users, method, query)
+            print(f"{query:<18} {name:<14} {p50:>9.2f} {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
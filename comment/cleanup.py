@@ -0,0 +1,159 @@
+"""
+Clean up the comments of deleted tasks.
+
+core-backend records every task deletion, cascaded ones included, in an
+outbox (GET /tasks/deletions/). This consumer reads it oldest first. For
+each batch it soft-deletes the comments of those tasks, or deletes them
+outright with TASK_CLEANUP_MODE=purge. Each statement touches at most
+TASK_CLEANUP_ROW_LIMIT rows. It then acknowledges the batch, so core
+drops it from the outbox. After a crash before the acknowledgement, the
+batch is simply processed again, which changes nothing the second time.
+
+Runs in the background of the service with TASK_CLEANUP_ENABLED, or by
+hand from the repository root:
+    python -m comment.cleanup            # drain the outbox once
+    python -m comment.cleanup --follow   # keep polling
+"""
+import argparse
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+from jose import jwt
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Engine
+
+from . import tracing
+from .config import settings
+from .database import engine as default_engine
+from .models.comment import Comment
+
+logger = logging.getLogger(settings.APP_NAME)
+
+
+def service_token() -> str:
+    """Short-lived token that core-backend accepts for its deletion outbox"""
+    claims = {"scope": "task-deletions", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}
+    return jwt.encode(claims, settings.DJANGO_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+class TaskDeletionConsumer:
+    def __init__(
+        self,
+        engine: Engine = default_engine,
+        core_url: str = settings.CORE_BASE_URL,
+        batch_size: int = settings.TASK_CLEANUP_BATCH_SIZE,
+        row_limit: int = settings.TASK_CLEANUP_ROW_LIMIT,
+        mode: str = settings.TASK_CLEANUP_MODE,
+    ):
+        if mode not in ("soft", "purge"):
+            raise ValueError(f"TASK_CLEANUP_MODE must be 'soft' or 'purge', not {mode!r}")
+        self.engine = engine
+        self.core_url = core_url.rstrip("/")
+        self.batch_size = batch_size
+        self.row_limit = row_limit
+        self.mode = mode
+        self._http = httpx.Client(timeout=30)
+
+    def close(self):
+        self._http.close()
+
+    # ─────────────────────────────
+    def fetch(self) -> List[Dict[str, Any]]:
+        response = self._http.get(
+            f"{self.core_url}/tasks/deletions/",
+            params={"limit": self.batch_size},
+            headers={"Authorization": f"Bearer {service_token()}"},
+        )
+        response.raise_for_status()
+        return response.json()["results"]
+
+    def ack(self, ids: List[int]):
+        response = self._http.post(
+            f"{self.core_url}/tasks/deletions/ack/",
+            json={"ids": ids},
+            headers={"Authorization": f"Bearer {service_token()}"},
+        )
+        response.raise_for_status()
+
+    def clean(self, task_ids: List[int]) -> int:
+        """Soft-delete or purge the tasks' comments, `row_limit` rows per transaction"""
+        matching = select(Comment.id).where(Comment.entity_id.in_(task_ids))
+        if self.mode == "soft":
+            now = datetime.now(timezone.utc)
+            chunk = matching.where(Comment.deleted_at.is_(None)).limit(self.row_limit)
+            statement = update(Comment).where(Comment.id.in_(chunk)).values(deleted_at=now, updated_at=now)
+        else:
+            statement = delete(Comment).where(Comment.id.in_(matching.limit(self.row_limit)))
+
+        total = 0
+        while True:
+            with self.engine.begin() as connection:
+                changed = connection.execute(statement.execution_options(synchronize_session=False)).rowcount
+            total += changed
+            if changed < self.row_limit:
+                return total
+
+    # ─────────────────────────────
+    def run_once(self, max_batches: Optional[int] = None) -> Dict[str, int]:
+        """Process outbox batches until it is empty (or `max_batches` ran)"""
+        totals = {"batches": 0, "tasks": 0, "comments": 0}
+        while max_batches is None or totals["batches"] < max_batches:
+            rows = self.fetch()
+            if not rows:
+                break
+            with tracing.span("task_cleanup.batch", tasks=len(rows)) as span:
+                comments = self.clean(sorted({row["task_id"] for row in rows}))
+                self.ack([row["id"] for row in rows])
+                span.set(comments=comments)
+            totals["batches"] += 1
+            totals["tasks"] += len(rows)
+            totals["comments"] += comments
+        if totals["tasks"]:
+            logger.info(
+                f"🧹 Cleaned {totals['comments']} comments of {totals['tasks']} deleted tasks ({self.mode})"
+            )
+        return totals
+
+    def follow(self, interval: float, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Task cleanup failed, retrying in {interval}s: {e}")
+            stop.wait(interval)
+
+
+def start_background(stop: threading.Event) -> threading.Thread:
+    consumer = TaskDeletionConsumer()
+    thread = threading.Thread(
+        target=consumer.follow, args=(settings.TASK_CLEANUP_INTERVAL, stop), name="task-cleanup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--follow", action="store_true", help="keep polling every TASK_CLEANUP_INTERVAL seconds")
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    consumer = TaskDeletionConsumer()
+    try:
+        if args.follow:
+            consumer.follow(settings.TASK_CLEANUP_INTERVAL, threading.Event())
+        else:
+            print(json.dumps(consumer.run_once(args.max_batches)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        consumer.close()
+
+
+if __name__ == "__main__":
+    main()
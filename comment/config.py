@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,5 +12,28 @@ class Settings(BaseSettings):
     DJANGO_SECRET_KEY: str
     JWT_ALGORITHM: str
 
+    # Cleanup of comments whose task was deleted in core-backend (comment/cleanup.py)
+    CORE_BASE_URL: str = "http://localhost:8000"
+    TASK_CLEANUP_ENABLED: bool = False  # poll core's deletion outbox in the background
+    TASK_CLEANUP_INTERVAL: float = 10.0  # seconds between polls once the outbox is empty
+    TASK_CLEANUP_BATCH_SIZE: int = 1000  # deleted tasks fetched and acknowledged at once
+    TASK_CLEANUP_ROW_LIMIT: int = 5000  # comments changed per transaction
+    TASK_CLEANUP_MODE: str = "soft"  # "soft" sets deleted_at, "purge" deletes the rows
+
+    # Monthly range partitions of the comment table on Postgres (comment/partitioning.py)
+    COMMENT_PARTITIONING: bool = False  # existing tables need `python -m comment.partitioning --convert`
+    COMMENT_PARTITION_PREMAKE: int = 3  # future months that always have a partition
+    COMMENT_PARTITION_RETENTION_MONTHS: int = 0  # older partitions are detached, 0 keeps all
+    COMMENT_PARTITION_INTERVAL: float = 3600.0  # seconds between maintenance runs
+
+    # Full-text search (comment/search.py)
+    SEARCH_BACKFILL_BATCH_SIZE: int = 10000  # comments given a search_vector per transaction when it is added
+
+    # Logging and tracing (spans are always exported at /metrics)
+    LOG_LEVEL: str = "INFO"
+    DB_ECHO: bool = False  # log every SQL statement
+    DB_CREATE_ON_STARTUP: bool = False  # otherwise run `python -m comment.migrate` once per deploy
+    TRACE_JSONL_PATH: Optional[str] = None  # also append every finished span here as JSON
+
 
 settings = Settings()
@@ -1,10 +1,17 @@
 from sqlmodel import SQLModel, create_engine, Session
+from . import indexes, partitioning, search
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+engine = create_engine(settings.DATABASE_URL, echo=settings.DB_ECHO)
 
 def init_db():
+    # With COMMENT_PARTITIONING the comment table is created partitioned, and create_all leaves it be
+    partitioning.install(engine)
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so indexes added to the model later are ensured here
+    indexes.ensure(engine, "ix_comment_entity_id", "comment", "(entity_id)")
+    # The search index is backend-specific DDL the model cannot declare
+    search.install(engine)
 
 def get_session():
     with Session(engine) as session:
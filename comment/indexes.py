@@ -0,0 +1,44 @@
+"""
+Indexes added to a comment table that may already be large and in use.
+
+A plain CREATE INDEX blocks writes to the table until the index is built.
+On Postgres `ensure` builds it with CREATE INDEX CONCURRENTLY instead,
+which lets writes through but cannot run inside a transaction, so it
+takes an engine and runs in autocommit. A concurrent build that failed
+half-way leaves an invalid index behind; it is dropped and built again.
+Partitioned tables cannot be indexed concurrently, so their indexes are
+built the plain way; they are declared when the table is created, while
+it is still empty.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .config import settings
+
+logger = logging.getLogger(settings.APP_NAME)
+
+
+def ensure(engine: Engine, name: str, table: str, definition: str):
+    """CREATE INDEX `name` ON `table` `definition`, unless a valid one exists"""
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as connection:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}"))
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        valid = connection.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        ).scalar()
+        if valid:
+            return
+        if valid is False:
+            logger.warning(f"Rebuilding {name}, left invalid by an interrupted build")
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        partitioned = connection.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+        concurrently = "" if partitioned else "CONCURRENTLY "
+        logger.info(f"🔨 Building index {name} on {table}")
+        connection.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {name} ON {table} {definition}"))
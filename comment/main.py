@@ -1,22 +1,54 @@
+import logging
+import threading
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from . import cleanup, partitioning, tracing
 from .config import settings
-from .database import init_db
+from .database import engine, init_db
 from .routers import comment
 
+logging.basicConfig(level=settings.LOG_LEVEL)
+logger = logging.getLogger(settings.APP_NAME)
+
 
 def lifespan(app: FastAPI):
-    print(f"🚀 Starting {settings.APP_NAME}...")
-    init_db()
+    logger.info(f"🚀 Starting {settings.APP_NAME}...")
+    # Schema creation is a deploy step (python -m comment.migrate), not a boot step
+    if settings.DB_CREATE_ON_STARTUP:
+        init_db()
+    stop_background = threading.Event()
+    if settings.TASK_CLEANUP_ENABLED:
+        cleanup.start_background(stop_background)
+    if partitioning.enabled(engine):
+        partitioning.start_background(engine, stop_background)
     yield
-    print("🛑 Shutting down...")
+    stop_background.set()
+    logger.info("🛑 Shutting down...")
 
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(tracing.TracingMiddleware)
 
 app.include_router(comment.router, prefix="/api/v1")
 
 
 @app.get("/")
 def health_check():
-    return "Ok"
\ No newline at end of file
+    return "Ok"
+
+
+@app.get("/ready")
+def readiness_check():
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse({"ready": False, "detail": str(e)}, status_code=503)
+    return {"ready": True}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return tracing.render_metrics()
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+Create the comment tables.
+
+Run once per deploy, before starting the service, from the repository root:
+    python -m comment.migrate
+"""
+import logging
+
+from .config import settings
+from .database import init_db
+from .models import comment  # noqa: F401  registers the tables on the metadata
+
+logger = logging.getLogger(settings.APP_NAME)
+
+
+def main():
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    init_db()
+    logger.info("✅ Database schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Monthly range partitions of the comment table on Postgres.
+
+With COMMENT_PARTITIONING on, `comment` is created as a table partitioned
+by range on created_at, with one partition per month named
+comment_pYYYYMM. The primary key becomes (id, created_at), as Postgres
+requires the partition key in it; ids stay unique through the identity
+column. Indexes are declared on the parent, so every partition gets its
+own small copy and the current month's stay hot.
+
+Maintenance, run from the service's background thread every
+COMMENT_PARTITION_INTERVAL seconds, or by hand:
+- creates the partitions for the current month and the next
+  COMMENT_PARTITION_PREMAKE months. There is no default partition, so a
+  comment dated past the last partition is refused; keep the premake
+  window wider than the longest gap between runs.
+- detaches partitions that ended more than COMMENT_PARTITION_RETENTION_MONTHS
+  months ago (0 keeps every partition). Detached partitions remain as
+  plain tables, to archive or drop.
+
+Filters on created_at let the planner skip partitions, e.g.
+GET /comments/?entity_id=&created_after=. PUT and DELETE /comments/{id}
+each run a single UPDATE; by id alone it probes every partition's primary
+key, and with the comment's created_at as a query parameter it touches
+one partition.
+
+Every worker runs maintenance, so each run holds a transaction-level
+advisory lock and the runs of other workers wait their turn.
+
+From the repository root:
+    python -m comment.partitioning              # maintain once
+    python -m comment.partitioning --convert    # move an existing unpartitioned table over
+"""
+import argparse
+import json
+import logging
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import Column, Identity, MetaData, Table, text
+from sqlalchemy.engine import Connection, Engine
+
+from . import search
+from .config import settings
+from .models.comment import Comment
+
+logger = logging.getLogger(settings.APP_NAME)
+
+TABLE = "comment"
+# pg_advisory_xact_lock key serializing maintenance across workers
+MAINTENANCE_LOCK = 0x636F6D6D  # "comm"
+
+
+def enabled(engine: Engine) -> bool:
+    if not settings.COMMENT_PARTITIONING:
+        return False
+    if engine.dialect.name != "postgresql":
+        logger.warning(f"COMMENT_PARTITIONING needs Postgres; {engine.dialect.name} keeps a single table")
+        return False
+    return True
+
+
+def month_start(moment: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the one holding `moment`"""
+    months = moment.year * 12 + moment.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(connection: Connection, table: str = TABLE) -> Optional[bool]:
+    """True or False, or None if the table does not exist"""
+    kind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+    return None if kind is None else kind == "p"
+
+
+def definition(table: str = TABLE, partitioned: bool = True) -> Table:
+    """
+    models.comment.Comment as a table named `table`
+
+    Partitioned, created_at joins the primary key and id becomes an
+    identity column, which keeps ids unique across partitions. Unpartitioned,
+    it is the model's own table under another name.
+    """
+    columns = []
+    for column in Comment.__table__.columns:
+        if partitioned and column.name == "id":
+            columns.append(Column(column.name, column.type, Identity(), primary_key=True))
+        elif partitioned and column.name == "created_at":
+            columns.append(Column(column.name, column.type, nullable=False, primary_key=True))
+        else:
+            columns.append(column._copy())
+    kwargs = {"postgresql_partition_by": "RANGE (created_at)"} if partitioned else {}
+    # Copied columns keep index=True, which names their index ix_<table>_<column>
+    return Table(table, MetaData(), *columns, **kwargs)
+
+
+def create_table(connection: Connection, table: str = TABLE):
+    """The partitioned parent, with the columns and indexes of models.comment.Comment"""
+    definition(table).create(connection)
+
+
+def partitions(connection: Connection, table: str = TABLE) -> List[str]:
+    return list(connection.execute(
+        text("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(:table)
+            ORDER BY child.relname
+        """),
+        {"table": table},
+    ).scalars())
+
+
+def create_partitions(connection: Connection, first: date, last: date, table: str = TABLE) -> List[str]:
+    """Monthly partitions from the month of `first` through the month of `last`, where missing"""
+    existing = set(partitions(connection, table))
+    created = []
+    month = month_start(first)
+    while month <= last:
+        name = partition_name(table, month)
+        if name not in existing:
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{month_start(month, 1)}')"
+            ))
+            created.append(name)
+        month = month_start(month, 1)
+    return created
+
+
+def detach_partitions(connection: Connection, before: date, table: str = TABLE) -> List[str]:
+    """Detach the partitions that end on or before the month of `before`"""
+    cutoff = partition_name(table, month_start(before))
+    detached = []
+    for name in partitions(connection, table):
+        # Names sort by month, and every partition ends where the next month starts
+        if name < cutoff:
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            detached.append(name)
+    return detached
+
+
+# ─────────────────────────────
+def install(engine: Engine):
+    """Create the partitioned table and its first partitions, unless the table already exists"""
+    if not enabled(engine):
+        return
+    with engine.begin() as connection:
+        if is_partitioned(connection) is None:
+            create_table(connection)
+            logger.info("🗂️ Created the partitioned comment table")
+        elif not is_partitioned(connection):
+            logger.warning("comment is not partitioned yet; run `python -m comment.partitioning --convert`")
+            return
+    maintain(engine)
+
+
+def maintain(engine: Engine, today: Optional[date] = None) -> Dict[str, List[str]]:
+    today = today or datetime.utcnow().date()
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return {"created": [], "detached": []}
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+        created = create_partitions(
+            connection, month_start(today), month_start(today, settings.COMMENT_PARTITION_PREMAKE)
+        )
+        detached = []
+        if settings.COMMENT_PARTITION_RETENTION_MONTHS > 0:
+            detached = detach_partitions(connection, month_start(today, -settings.COMMENT_PARTITION_RETENTION_MONTHS))
+    if created or detached:
+        logger.info(f"🗂️ Comment partitions created {created}, detached {detached}")
+    return {"created": created, "detached": detached}
+
+
+def convert(engine: Engine) -> Dict[str, int]:
+    """
+    Move an unpartitioned comment table into a partitioned one
+
+    The old table is kept as comment_unpartitioned. Run it with the
+    service stopped: rows written during the copy would be lost.
+    """
+    with engine.begin() as connection:
+        if is_partitioned(connection) is not False:
+            raise RuntimeError("comment is missing or already partitioned")
+        first, last, rows = connection.execute(
+            text("SELECT min(created_at), max(created_at), count(*) FROM comment")
+        ).one()
+        connection.execute(text("ALTER TABLE comment RENAME TO comment_unpartitioned"))
+        for index in ("ix_comment_entity_id", "ix_comment_user_id", "comment_search_idx"):
+            connection.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_unpartitioned"))
+        create_table(connection)
+        # Add the search column while the table is still empty
+        search.install_schema(connection)
+        today = datetime.utcnow().date()
+        create_partitions(
+            connection,
+            min(first.date(), today) if first else today,
+            month_start(max(last.date(), today) if last else today, settings.COMMENT_PARTITION_PREMAKE),
+        )
+        connection.execute(text("""
+            INSERT INTO comment (id, content, entity_id, user_id, created_at, updated_at, deleted_at)
+            SELECT id, content, entity_id, user_id, created_at, updated_at, deleted_at
+            FROM comment_unpartitioned
+        """))
+        # New ids continue after the copied ones
+        connection.execute(text(
+            "SELECT setval(pg_get_serial_sequence('comment', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM comment), false)"
+        ))
+    logger.info(f"🗂️ Moved {rows} comments into the partitioned table")
+    return {"rows": rows}
+
+
+def follow(engine: Engine, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            maintain(engine)
+        except Exception as e:
+            logger.warning(f"Comment partition maintenance failed, retrying in {interval}s: {e}")
+
+
+def start_background(engine: Engine, stop: threading.Event) -> threading.Thread:
+    thread = threading.Thread(
+        target=follow, args=(engine, settings.COMMENT_PARTITION_INTERVAL, stop),
+        name="comment-partitions", daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def main():
+    from .database import engine  # which imports this module
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--convert", action="store_true", help="partition an existing unpartitioned comment table")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    if not enabled(engine):
+        raise SystemExit("Set COMMENT_PARTITIONING=true with a Postgres DATABASE_URL")
+    if args.convert:
+        result = convert(engine)
+    else:
+        result = maintain(engine)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
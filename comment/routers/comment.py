@@ -1,7 +1,11 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from ..models.comment import Comment, CommentBase
+from sqlalchemy import func, update
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
+from .. import search
 from ..database import get_session
 from ..dependencies import get_current_user, User
 from datetime import datetime, timezone
@@ -19,26 +23,44 @@ def create_comment(comment: CommentBase, session: Session = Depends(get_session)
     return db_comment
 
 
+def by_id(id: int, created_at: Optional[datetime]):
+    """
+    The WHERE clause of a single-comment write
+
+    With a partitioned table, a statement on id alone probes every
+    partition's primary key; created_at narrows it to one partition.
+    """
+    clause = Comment.id == id
+    if created_at:
+        clause = clause & (Comment.created_at == created_at)
+    return clause
+
+
 @router.put("/{id}", response_model=Comment)
-def update_comment(id: int,comment: CommentBase, session: Session = Depends(get_session), _: User= Depends(get_current_user)):
-    db_comment = session.exec(select(Comment).where((Comment.id == id) & (Comment.deleted_at.is_(None)) )).first()
+def update_comment(id: int,comment: CommentBase, created_at: Optional[datetime] = None, session: Session = Depends(get_session), _: User= Depends(get_current_user)):
+    # One UPDATE ... RETURNING, so no statement falls back to id alone
+    db_comment = session.execute(
+        update(Comment)
+        .where(by_id(id, created_at) & Comment.deleted_at.is_(None))
+        .values(content=comment.content, updated_at=datetime.now(timezone.utc))
+        .returning(Comment)
+    ).scalars().first()
     if not db_comment:
         raise HTTPException(status_code=404, detail="Comment not found")
-    db_comment.content = comment.content
-    db_comment.updated_at = datetime.now(timezone.utc)
-    session.add(db_comment)
+    # Detached, commit leaves the returned row loaded instead of expiring it for a reload by id
+    session.expunge(db_comment)
     session.commit()
-    session.refresh(db_comment)
     return db_comment
     
 
 # delete
 @router.delete("/{id}")
-def delete_comment(id: int,  session: Session = Depends(get_session), current_user: User= Depends(get_current_user)):
-    db_comment = session.get(Comment, id)
-    if not db_comment:
+def delete_comment(id: int, created_at: Optional[datetime] = None, session: Session = Depends(get_session), current_user: User= Depends(get_current_user)):
+    deleted = session.execute(
+        update(Comment).where(by_id(id, created_at)).values(deleted_at=datetime.now(timezone.utc))
+    ).rowcount
+    if not deleted:
         raise HTTPException(status_code=404, detail="Comment not found")
-    db_comment.deleted_at = datetime.now(timezone.utc)
     session.commit()
     return {
         "message": "Successfully deleted!"
@@ -47,13 +69,84 @@ def delete_comment(id: int,  session: Session = Depends(get_session), current_us
 
 # List all comment based on entity Id
 @router.get("/")
-def list_comments(entity_id: int,session: Session = Depends(get_session), current_user: User= Depends(get_current_user) ):
-    comments = session.exec(
-        select(Comment).where(
-            (Comment.entity_id == entity_id) & (Comment.deleted_at.is_(None))
-        )
-    ).all()
+def list_comments(
+    entity_id: int,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """With a partitioned table, created_after/created_before skip the partitions outside the range"""
+    statement = select(Comment).where((Comment.entity_id == entity_id) & (Comment.deleted_at.is_(None)))
+    if created_after:
+        statement = statement.where(Comment.created_at >= created_after)
+    if created_before:
+        statement = statement.where(Comment.created_at < created_before)
+    comments = session.exec(statement).all()
     return comments
-    
 
 
+# Ranked full-text search
+@router.get("/search")
+def search_comments(
+    q: str = Query(..., min_length=1, max_length=200),
+    entity_ids: Optional[List[int]] = Query(None, max_length=500),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Comments matching `q`, best match first
+
+    Searches the comments the caller wrote, on the given entities only when
+    `entity_ids` is set.
+    """
+    # One extra row tells whether there is a next page without counting every match
+    try:
+        rows = search.search(
+            session.connection(), q,
+            user_id=current_user.user_id, entity_ids=entity_ids,
+            limit=page_size + 1, offset=(page - 1) * page_size,
+        )
+    except search.SearchUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {
+        "page": page,
+        "page_size": page_size,
+        "has_next": len(rows) > page_size,
+        "results": rows[:page_size],
+    }
+
+
+# Latest comments and comment count for many entities in one query
+@router.get("/summary")
+def summarize_comments(
+    entity_ids: List[int] = Query(..., max_length=500),
+    latest: int = Query(3, ge=0, le=20),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    live = (Comment.entity_id.in_(entity_ids)) & (Comment.deleted_at.is_(None))
+    ranked = select(
+        Comment,
+        func.row_number().over(
+            partition_by=Comment.entity_id, order_by=(Comment.created_at.desc(), Comment.id.desc())
+        ).label("rank"),
+        func.count().over(partition_by=Comment.entity_id).label("total"),
+    ).where(live).subquery()
+    ranked_comment = aliased(Comment, ranked)
+    # Every entity keeps its first row so counts survive latest=0
+    rows = session.exec(
+        select(ranked_comment, ranked.c.rank, ranked.c.total)
+        .where(ranked.c.rank <= max(latest, 1))
+        .order_by(ranked.c.entity_id, ranked.c.rank)
+    ).all()
+
+    summaries = {entity_id: {"entity_id": entity_id, "count": 0, "latest": []} for entity_id in entity_ids}
+    for comment, rank, total in rows:
+        summary = summaries[comment.entity_id]
+        summary["count"] = total
+        if rank <= latest:
+            summary["latest"].append(comment)
+    return list(summaries.values())
@@ -1,5 +1,13 @@
 # run.py
+import argparse
+
 import uvicorn
 from .config import settings
+from .migrate import main as migrate
+
+parser = argparse.ArgumentParser(description="Run the comment service with auto-reload")
+parser.add_argument("--migrate", action="store_true", help="run `python -m comment.migrate` first")
+if parser.parse_args().migrate:
+    migrate()
 
 uvicorn.run("comment.main:app", host="127.0.0.1", port=settings.PORT, reload=True)
@@ -0,0 +1,192 @@
+"""
+Full-text search over comment content.
+
+Postgres: a `search_vector` tsvector column with a GIN index, queried
+with websearch_to_tsquery (quoted phrases, OR and -word work) and ranked
+with ts_rank_cd. A trigger fills the column on insert and when content
+changes. On an existing table none of this takes a long lock: the column
+is added without a default, existing rows are filled in batches of
+SEARCH_BACKFILL_BATCH_SIZE, one transaction each, and the index is built
+concurrently (comment/indexes.py).
+
+SQLite, for local testing: an external-content FTS5 table, comment_fts,
+kept in sync with the comment table by triggers and ranked with bm25 on
+the content alone. user_id and entity_id are indexed as tokens too, so the
+caller's scope is intersected inside the index instead of by joining every
+match. Every word of the query must match; FTS5 operators are not exposed.
+
+Results are always limited to comments the caller wrote; entity_ids only
+narrows that further. The comment service cannot tell who may read an
+entity's comments, so it never returns anyone else's.
+
+Both use English stemming, so "outages" finds "outage". `install` creates
+either one and is safe to run on every deploy (python -m comment.migrate).
+Other databases have no search: `install` warns and GET /comments/search
+answers 501.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from . import indexes
+from .config import settings
+
+logger = logging.getLogger(settings.APP_NAME)
+
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database is not one comment search supports"""
+
+_VECTOR = "to_tsvector('english', coalesce(content, ''))"
+
+_POSTGRES_DDL = (
+    "ALTER TABLE comment ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE OR REPLACE FUNCTION comment_search_vector() RETURNS trigger AS $$ BEGIN "
+    f"NEW.search_vector := {_VECTOR.replace('content', 'NEW.content')}; RETURN NEW; "
+    "END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS comment_search_vector ON comment",
+    "CREATE TRIGGER comment_search_vector BEFORE INSERT OR UPDATE OF content ON comment "
+    "FOR EACH ROW EXECUTE FUNCTION comment_search_vector()",
+)
+
+_POSTGRES_INDEXES = (
+    ("comment_search_idx", "USING GIN (search_vector)"),
+    ("ix_comment_user_id", "(user_id)"),
+)
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE comment_fts USING fts5("
+    "content, user_id, entity_id, content='comment', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER comment_fts_insert AFTER INSERT ON comment BEGIN "
+    "INSERT INTO comment_fts (rowid, content, user_id, entity_id) "
+    "VALUES (new.id, new.content, new.user_id, new.entity_id); END",
+    "CREATE TRIGGER comment_fts_delete AFTER DELETE ON comment BEGIN "
+    "INSERT INTO comment_fts (comment_fts, rowid, content, user_id, entity_id) "
+    "VALUES ('delete', old.id, old.content, old.user_id, old.entity_id); END",
+    "CREATE TRIGGER comment_fts_update AFTER UPDATE OF content, user_id, entity_id ON comment BEGIN "
+    "INSERT INTO comment_fts (comment_fts, rowid, content, user_id, entity_id) "
+    "VALUES ('delete', old.id, old.content, old.user_id, old.entity_id); "
+    "INSERT INTO comment_fts (rowid, content, user_id, entity_id) "
+    "VALUES (new.id, new.content, new.user_id, new.entity_id); END",
+    # Index the rows that existed before the table did
+    "INSERT INTO comment_fts (comment_fts) VALUES ('rebuild')",
+    "CREATE INDEX IF NOT EXISTS ix_comment_user_id ON comment (user_id)",
+)
+
+_COLUMNS = "c.id, c.content, c.entity_id, c.user_id, c.created_at, c.updated_at"
+
+
+def install(engine: Engine):
+    """Create the search column, trigger and index, or the FTS5 table, if missing"""
+    if engine.dialect.name not in SUPPORTED_DIALECTS:
+        logger.warning(f"Comment search needs Postgres or SQLite; on {engine.dialect.name} it answers 501")
+        return
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as connection:
+            install_schema(connection)
+        return
+    with engine.begin() as connection:
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+    # The trigger covers rows written from here on; older ones are filled before indexing
+    backfill(engine)
+    for name, definition in _POSTGRES_INDEXES:
+        indexes.ensure(engine, name, "comment", definition)
+
+
+def backfill(engine: Engine, batch_size: int = settings.SEARCH_BACKFILL_BATCH_SIZE) -> int:
+    """Fill search_vector where it is missing, one id range per transaction"""
+    with engine.connect() as connection:
+        low, high = connection.execute(text("SELECT min(id), max(id) FROM comment")).one()
+    filled = 0
+    while low is not None and low <= high:
+        with engine.begin() as connection:
+            filled += connection.execute(text(f"""
+                UPDATE comment SET search_vector = {_VECTOR}
+                WHERE id >= :low AND id < :low + :batch AND search_vector IS NULL
+            """), {"low": low, "batch": batch_size}).rowcount
+        low += batch_size
+    return filled
+
+
+def install_schema(connection: Connection):
+    """All of `install` in the caller's transaction, for a table that is still empty"""
+    if connection.dialect.name == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+        for name, definition in _POSTGRES_INDEXES:
+            connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON comment {definition}"))
+    elif connection.dialect.name == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'comment_fts'")
+        ).first()
+        if not exists:
+            for statement in _SQLITE_DDL:
+                connection.execute(text(statement))
+
+
+def fts5_query(query: str, user_id: int, entity_ids: Optional[List[int]]) -> str:
+    """
+    FTS5 expression for the query within the caller's scope
+
+    Each word becomes a quoted term, so user input cannot be parsed as syntax.
+    """
+    words = " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+    if not words:
+        return ""
+    scope = f'user_id : "{int(user_id)}"'
+    if entity_ids:
+        scope += " AND entity_id : (" + " OR ".join(f'"{int(entity_id)}"' for entity_id in entity_ids) + ")"
+    return f"content : ({words}) AND {scope}"
+
+
+def search(
+    connection: Connection,
+    query: str,
+    *,
+    user_id: int,
+    entity_ids: Optional[List[int]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Live comments matching `query`, best match first, as dicts with a `rank`
+
+    Restricted to comments written by `user_id`, and to `entity_ids` when
+    given. Higher ranks are better on both backends. Raises SearchUnavailable
+    on any other database.
+    """
+    params: Dict[str, Any] = {"query": query, "user_id": user_id, "limit": limit, "offset": offset}
+
+    if connection.dialect.name == "postgresql":
+        scope = "c.user_id = :user_id"
+        if entity_ids:
+            scope += " AND c.entity_id IN (" + ", ".join(f":entity_{i}" for i in range(len(entity_ids))) + ")"
+            params.update({f"entity_{i}": entity_id for i, entity_id in enumerate(entity_ids)})
+        statement = f"""
+            SELECT {_COLUMNS}, ts_rank_cd(c.search_vector, q.query) AS rank
+            FROM comment c, websearch_to_tsquery('english', :query) AS q(query)
+            WHERE c.search_vector @@ q.query AND {scope} AND c.deleted_at IS NULL
+            ORDER BY rank DESC, c.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    elif connection.dialect.name == "sqlite":
+        params["query"] = fts5_query(query, user_id, entity_ids)
+        if not params["query"]:
+            return []
+        # bm25() is lower for better matches; weights rank on content only
+        statement = f"""
+            SELECT {_COLUMNS}, -bm25(comment_fts, 1.0, 0.0, 0.0) AS rank
+            FROM comment_fts JOIN comment c ON c.id = comment_fts.rowid
+            WHERE comment_fts MATCH :query AND c.deleted_at IS NULL
+            ORDER BY bm25(comment_fts, 1.0, 0.0, 0.0), c.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        raise SearchUnavailable(f"Comment search needs Postgres or SQLite, not {connection.dialect.name}")
+    return [dict(row) for row in connection.execute(text(statement), params).mappings()]
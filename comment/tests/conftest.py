@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+# Settings and the engine are read at import, so the test database is set before comment.* is imported
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/comments.sqlite3")
+os.environ.setdefault("APP_NAME", "comment-tests")
+os.environ.setdefault("PORT", "0")
+os.environ.setdefault("DJANGO_SECRET_KEY", "comment-tests")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import text
+
+from comment.config import settings
+from comment.database import engine, init_db
+from comment.main import app
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    init_db()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    yield
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM comment"))
+
+
+def token_for(user_id: int) -> str:
+    return jwt.encode({"user_id": user_id, "username": f"user{user_id}"}, settings.DJANGO_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+@pytest.fixture
+def client_for():
+    """A TestClient authenticated as the given user id"""
+    def make(user_id: int) -> TestClient:
+        return TestClient(app, headers={"Authorization": f"Bearer {token_for(user_id)}"})
+    return make
@@ -0,0 +1,49 @@
+from sqlalchemy import event
+
+from comment.database import engine
+
+
+def test_update_and_delete_narrowed_by_created_at(client_for):
+    alice = client_for(1)
+    comment = alice.post("/api/v1/comments/", json={"content": "draft", "entity_id": 10}).json()
+    path = f"/api/v1/comments/{comment['id']}"
+
+    wrong = alice.put(path, params={"created_at": "2001-01-01T00:00:00"}, json={"content": "edited", "entity_id": 10})
+    right = alice.put(path, params={"created_at": comment["created_at"]}, json={"content": "edited", "entity_id": 10})
+    deleted = alice.delete(path, params={"created_at": comment["created_at"]})
+
+    assert wrong.status_code == 404
+    assert (right.status_code, right.json()["content"]) == (200, "edited")
+    assert deleted.status_code == 200
+    assert alice.get("/api/v1/comments/", params={"entity_id": 10}).json() == []
+
+
+def test_update_and_delete_by_id_alone(client_for):
+    alice = client_for(1)
+    comment = alice.post("/api/v1/comments/", json={"content": "draft", "entity_id": 10}).json()
+    path = f"/api/v1/comments/{comment['id']}"
+
+    assert alice.put(path, json={"content": "edited", "entity_id": 10}).status_code == 200
+    assert alice.delete(path).status_code == 200
+    assert alice.delete("/api/v1/comments/999999").status_code == 404
+
+
+def test_writes_with_created_at_never_address_a_row_by_id_alone(client_for):
+    alice = client_for(1)
+    comment = alice.post("/api/v1/comments/", json={"content": "draft", "entity_id": 10}).json()
+    path = f"/api/v1/comments/{comment['id']}"
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        alice.put(path, params={"created_at": comment["created_at"]}, json={"content": "edited", "entity_id": 10})
+        alice.delete(path, params={"created_at": comment["created_at"]})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    touching = [s for s in statements if "comment.id" in s]
+    assert len(touching) == 2
+    assert all("comment.created_at" in s for s in touching)
@@ -0,0 +1,57 @@
+from comment.database import engine
+
+
+def test_search_finds_own_comments_best_match_first(client_for):
+    alice = client_for(1)
+    alice.post("/api/v1/comments/", json={"content": "outage in the payment service", "entity_id": 10})
+    alice.post("/api/v1/comments/", json={"content": "outage outage, deploy rolled back after the outage", "entity_id": 11})
+    alice.post("/api/v1/comments/", json={"content": "nothing to see here", "entity_id": 10})
+
+    response = alice.get("/api/v1/comments/search", params={"q": "outages"})
+
+    assert response.status_code == 200
+    assert [row["entity_id"] for row in response.json()["results"]] == [11, 10]
+
+
+def test_search_never_returns_other_users_comments(client_for):
+    alice, bob = client_for(1), client_for(2)
+    alice.post("/api/v1/comments/", json={"content": "secret outage report", "entity_id": 10})
+    bob.post("/api/v1/comments/", json={"content": "an outage of my own", "entity_id": 20})
+
+    own = bob.get("/api/v1/comments/search", params={"q": "outage"}).json()["results"]
+    on_alices_entity = bob.get("/api/v1/comments/search", params={"q": "outage", "entity_ids": [10]}).json()["results"]
+    on_both = bob.get("/api/v1/comments/search", params={"q": "outage", "entity_ids": [10, 20]}).json()["results"]
+
+    assert [row["user_id"] for row in own] == [2]
+    assert on_alices_entity == []
+    assert [row["user_id"] for row in on_both] == [2]
+
+
+def test_search_pages_with_has_next(client_for):
+    alice = client_for(1)
+    for i in range(3):
+        alice.post("/api/v1/comments/", json={"content": f"invoice {i}", "entity_id": 10})
+
+    first = alice.get("/api/v1/comments/search", params={"q": "invoice", "page_size": 2}).json()
+    second = alice.get("/api/v1/comments/search", params={"q": "invoice", "page_size": 2, "page": 2}).json()
+
+    assert (len(first["results"]), first["has_next"]) == (2, True)
+    assert (len(second["results"]), second["has_next"]) == (1, False)
+
+
+def test_search_ignores_fts_syntax_in_the_query(client_for):
+    alice = client_for(1)
+    alice.post("/api/v1/comments/", json={"content": "deploy NEAR rollback", "entity_id": 10})
+
+    response = alice.get("/api/v1/comments/search", params={"q": 'deploy" OR user_id : "2'})
+
+    assert response.status_code == 200
+
+
+def test_search_on_an_unsupported_database_answers_501(client_for, monkeypatch):
+    monkeypatch.setattr(engine.dialect, "name", "mysql")
+
+    response = client_for(1).get("/api/v1/comments/search", params={"q": "outage"})
+
+    assert response.status_code == 501
+    assert "Postgres or SQLite" in response.json()["detail"]
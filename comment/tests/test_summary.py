@@ -0,0 +1,36 @@
+def test_summary_counts_and_latest_comments_per_entity(client_for):
+    alice = client_for(1)
+    for i in range(4):
+        alice.post("/api/v1/comments/", json={"content": f"first task {i}", "entity_id": 10})
+    alice.post("/api/v1/comments/", json={"content": "second task", "entity_id": 11})
+
+    response = alice.get("/api/v1/comments/summary", params={"entity_ids": [10, 11, 12], "latest": 2})
+
+    assert response.status_code == 200
+    summaries = response.json()
+    assert [(s["entity_id"], s["count"]) for s in summaries] == [(10, 4), (11, 1), (12, 0)]
+    assert [c["content"] for c in summaries[0]["latest"]] == ["first task 3", "first task 2"]
+    assert [c["content"] for c in summaries[1]["latest"]] == ["second task"]
+    assert summaries[2]["latest"] == []
+
+
+def test_summary_skips_deleted_comments(client_for):
+    alice = client_for(1)
+    kept = alice.post("/api/v1/comments/", json={"content": "kept", "entity_id": 10}).json()
+    deleted = alice.post("/api/v1/comments/", json={"content": "deleted", "entity_id": 10}).json()
+    alice.delete(f"/api/v1/comments/{deleted['id']}")
+
+    summary = alice.get("/api/v1/comments/summary", params={"entity_ids": [10]}).json()[0]
+
+    assert summary["count"] == 1
+    assert [c["id"] for c in summary["latest"]] == [kept["id"]]
+
+
+def test_summary_with_latest_zero_still_counts(client_for):
+    alice = client_for(1)
+    for i in range(3):
+        alice.post("/api/v1/comments/", json={"content": f"comment {i}", "entity_id": 10})
+
+    summary = alice.get("/api/v1/comments/summary", params={"entity_ids": [10], "latest": 0}).json()[0]
+
+    assert (summary["count"], summary["latest"]) == (3, [])
@@ -0,0 +1,63 @@
+"""
+Response compression for the API.
+
+Bodies of at least COMPRESSION_MIN_BYTES are compressed with brotli when
+the client accepts it and the brotli package is installed, and with gzip
+otherwise. Smaller bodies gain little and cost CPU, so they are sent as
+they are.
+"""
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+_accepts = _lazy_re_compile(r"\b(br|gzip)\b(?!\s*;\s*q=0(?:\.0*)?\b)")
+
+
+def choose_encoding(accept_encoding):
+    offered = set(_accepts.findall(accept_encoding))
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+        # The compressed body is a different representation of the same resource
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
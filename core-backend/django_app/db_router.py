@@ -0,0 +1,176 @@
+"""
+Read replicas for core-backend.
+
+Replicas are the DATABASES aliases listed in REPLICA_DATABASES; writes
+always go to "default". Only reads made while serving a GET, HEAD or
+OPTIONS request go to a replica. Reads in any other request, in
+management commands and in tests, go to the primary, so a write request
+never validates against stale data.
+
+Read-your-writes: a request that writes pins its user to the primary for
+READ_YOUR_WRITES_SECONDS, so their next list shows what they just saved.
+Pins live in Django's cache; with several worker processes, configure a
+shared CACHES backend so every worker sees them.
+
+Health: each replica is checked at most every REPLICA_HEALTH_CHECK_INTERVAL
+seconds, on the first read that finds its last check stale. A replica
+that cannot be reached, or (on Postgres) lags more than
+REPLICA_MAX_LAG_SECONDS, takes no reads until a later check passes. With
+no healthy replica, reads go to the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+logger = logging.getLogger(__name__)
+
+# Replay lag, or 0 when the replica has replayed everything it received
+_POSTGRES_LAG = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+@dataclass
+class RoutingState:
+    use_replica: bool = False
+    wrote: bool = False
+
+
+# Unset outside requests, where everything uses the primary
+_state: ContextVar[Optional[RoutingState]] = ContextVar("db_routing", default=None)
+
+
+@contextmanager
+def use_primary():
+    """Send every read in the block to the primary"""
+    current = _state.get()
+    inner = RoutingState(use_replica=False)
+    token = _state.set(inner)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+        if current is not None and inner.wrote:
+            current.wrote = True
+            current.use_replica = False
+
+
+class ReplicaHealth:
+    def __init__(self):
+        self._checked_at: Dict[str, float] = {}
+        self._healthy: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._checked_at.get(alias, float("-inf")) >= settings.REPLICA_HEALTH_CHECK_INTERVAL
+            if due:
+                # Claim the check so concurrent requests keep using the last result meanwhile
+                self._checked_at[alias] = now
+        if due:
+            healthy = self.check(alias)
+            if healthy != self._healthy.get(alias, True):
+                logger.warning(f"Replica {alias} is now {'healthy' if healthy else 'unhealthy'}")
+            self._healthy[alias] = healthy
+        return self._healthy.get(alias, True)
+
+    def check(self, alias: str) -> bool:
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            if connection.vendor != "postgresql":
+                return True
+            with connection.cursor() as cursor:
+                cursor.execute(_POSTGRES_LAG)
+                lag = float(cursor.fetchone()[0])
+            return lag <= settings.REPLICA_MAX_LAG_SECONDS
+        except DatabaseError as e:
+            logger.warning(f"Replica {alias} health check failed: {e}")
+            connection.close()
+            return False
+
+    def reset(self):
+        with self._lock:
+            self._checked_at.clear()
+            self._healthy.clear()
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replica:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in settings.REPLICA_DATABASES if health.is_healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            # Later reads in the same request must see the write
+            state.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in settings.REPLICA_DATABASES
+
+
+def _user_id(request) -> Optional[str]:
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    try:
+        return str(AccessToken(header[len("Bearer "):])["user_id"])
+    except (TokenError, KeyError):
+        return None
+
+
+def _pin_key(user_id: str) -> str:
+    return f"db-router:pinned:{user_id}"
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use a replica, and pin users after writes"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        user_id = _user_id(request)
+        pinned = user_id is not None and cache.get(_pin_key(user_id)) is not None
+        state = RoutingState(use_replica=request.method in SAFE_METHODS and not pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote and user_id is not None:
+            cache.set(_pin_key(user_id), True, settings.READ_YOUR_WRITES_SECONDS)
+        return response
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -22,7 +23,9 @@ PROJECT_VERSION = "1.0.0"
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-zznm#y=si79w)lytl-7**)^^fj_@z^voijdm*h2i*4e%^b1hvs'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY', 'django-insecure-zznm#y=si79w)lytl-7**)^^fj_@z^voijdm*h2i*4e%^b1hvs'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
@@ -32,6 +35,13 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# "full" serves the admin and the browsable API alongside the JSON API.
+# "api" is for JWT-only API workers: no sessions, CSRF, messages or
+# clickjacking middleware, and no admin.
+MIDDLEWARE_PROFILE = os.environ.get('MIDDLEWARE_PROFILE', 'full')
+if MIDDLEWARE_PROFILE not in ('full', 'api'):
+    raise ValueError(f"MIDDLEWARE_PROFILE must be 'full' or 'api', not {MIDDLEWARE_PROFILE!r}")
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -45,7 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'django_app.tracing.TracingMiddleware',
+    'django_app.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'django_app.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +67,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if MIDDLEWARE_PROFILE == 'api':
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in ('django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages')
+    ]
+    MIDDLEWARE = [
+        'django_app.tracing.TracingMiddleware',
+        'django_app.db_router.ReplicaRoutingMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django_app.compression.CompressionMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+
+# Response compression (django_app/compression.py); brotli is used when installed
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))  # smaller bodies are sent as they are
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))  # 1-9
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))  # 0-11; above ~5 costs more than it saves
+
 ROOT_URLCONF = 'django_app.urls'
 
 TEMPLATES = [
@@ -77,17 +108,39 @@ WSGI_APPLICATION = 'django_app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_* environment variables override the docker-compose defaults
 DATABASES = {
    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'taskmanager',
-        'USER': 'user',
-        'PASSWORD': 'password',
-        'HOST': 'localhost',
-        'PORT': '5444',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
+        'NAME': os.environ.get('DB_NAME', 'taskmanager'),
+        'USER': os.environ.get('DB_USER', 'user'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'password'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5444'),
     }
 }
 
+# Read replicas (django_app/db_router.py). DB_REPLICAS is a comma-separated
+# list of host[:port] entries, or of database files with SQLite; each becomes
+# an alias replica1, replica2, ... with the default's other settings. Under
+# test each replica mirrors default, so DB_REPLICAS=<the default's own host or
+# file> gives two aliases on one database for local testing.
+REPLICA_DATABASES = []
+for _number, _replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    _alias = f'replica{_number}'
+    if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        DATABASES[_alias] = {**DATABASES['default'], 'NAME': _replica.strip()}
+    else:
+        _host, _, _port = _replica.strip().partition(':')
+        DATABASES[_alias] = {**DATABASES['default'], 'HOST': _host, 'PORT': _port or DATABASES['default']['PORT']}
+    DATABASES[_alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(_alias)
+
+DATABASE_ROUTERS = ['django_app.db_router.ReplicaRouter']
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))  # reads pinned to primary after a write
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))  # seconds
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 30))  # more and the replica takes no reads
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -107,11 +160,41 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing runs on a small bounded pool (users/hashing.py), which caps
+# the CPU a burst of signups or logins can take. Request workers still wait
+# for their hash; the queue and per-IP limits refuse the excess early.
+PASSWORD_HASHERS = [
+    'users.hashing.IsolatedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHER_ITERATIONS = int(os.environ.get('PASSWORD_HASHER_ITERATIONS', 1_000_000))  # PBKDF2-SHA256 rounds
+PASSWORD_HASHING_ISOLATED = os.environ.get('PASSWORD_HASHING_ISOLATED', 'true').lower() == 'true'  # false hashes inline
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 2))  # hashes computed at once
+PASSWORD_HASHING_QUEUE = int(os.environ.get('PASSWORD_HASHING_QUEUE', 32))  # hashes allowed to wait; more get 503
+PASSWORD_HASHING_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_QUEUE_TIMEOUT', 10.0))  # seconds
+PASSWORD_HASHING_PER_IP = int(os.environ.get('PASSWORD_HASHING_PER_IP', 4))  # register/login in flight per IP, 0 disables
+# META key holding the client address when behind a proxy, e.g. HTTP_X_FORWARDED_FOR; empty uses REMOTE_ADDR
+PASSWORD_HASHING_CLIENT_IP_HEADER = os.environ.get('PASSWORD_HASHING_CLIENT_IP_HEADER', '')
+# Proxies in front of the app that append to that header; the client is the entry this far from the right
+PASSWORD_HASHING_TRUSTED_PROXIES = max(1, int(os.environ.get('PASSWORD_HASHING_TRUSTED_PROXIES', 1)))
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.PrimaryFallbackJWTAuthentication',
     ),
+    # orjson in both directions (django_app/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'django_app.renderers.ORJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if MIDDLEWARE_PROFILE == 'full' else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'django_app.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 # Internationalization
@@ -138,6 +221,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 SIMPLE_JWT = {
+    "ALGORITHM": "HS256",    # the other services verify tokens with their JWT_ALGORITHM; keep them equal
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),    # Access token expiry
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),      # Refresh token expiry
-}
\ No newline at end of file
+}
+
+# Logging and tracing (spans are always exported at /metrics)
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH")  # also append every finished span here as JSON
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "root": {"handlers": ["console"], "level": os.environ.get("LOG_LEVEL", "INFO")},
+    # Replace Django's own debug-only console handler so records print once
+    "loggers": {"django": {"handlers": ["console"], "propagate": False}},
+}
@@ -0,0 +1,17 @@
+"""
+Settings for running the test suite:
+    python manage.py test --settings=django_app.test_settings
+
+Everything comes from django_app.settings, with test-only changes on top.
+"""
+from .settings import *  # noqa: F401,F403
+
+# Tests hash a password for every user they create; production's 1,000,000
+# PBKDF2 rounds would dominate the run. The hasher and pool stay the same.
+PASSWORD_HASHER_ITERATIONS = 1_000
+
+# A replica1 alias mirroring default, so the router tests run on one
+# database. They turn it on with override_settings(REPLICA_DATABASES=...);
+# other tests keep reading from default.
+if 'replica1' not in DATABASES:  # noqa: F405
+    DATABASES['replica1'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}  # noqa: F405
@@ -0,0 +1,61 @@
+"""
+Tracing for core-backend: the Django middleware and the /metrics view.
+
+Spans and their exporters come from the shared observability package
+(observability/, installed from observability/pyproject.toml).
+"""
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from observability.tracing import Span, configure, observe, render_metrics, span
+
+__all__ = ["Span", "TracingMiddleware", "metrics_view", "observe", "render_metrics", "span"]
+
+configure(jsonl_path=settings.TRACE_JSONL_PATH)
+
+
+class TracingMiddleware:
+    """Wrap each request in an `http` span with payload sizes and database time."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with span("http", method=request.method, path=request.path) as current:
+            queries = {"db_queries": 0, "db_ms": 0.0}
+
+            def observe_query(execute, sql, params, many, context):
+                started = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    queries["db_queries"] += 1
+                    queries["db_ms"] += (time.perf_counter() - started) * 1000
+
+            # Every alias, so reads routed to a replica are counted too
+            with ExitStack() as wrappers:
+                for alias_connection in connections.all():
+                    wrappers.enter_context(alias_connection.execute_wrapper(observe_query))
+                response = self.get_response(request)
+
+            match = request.resolver_match
+            if match is not None:
+                current.set(route=match.route)
+            current.set(
+                status_code=response.status_code,
+                request_bytes=int(request.META.get("CONTENT_LENGTH") or 0),
+                response_bytes=0 if response.streaming else len(response.content),
+                db_queries=queries["db_queries"],
+                db_ms=round(queries["db_ms"], 3),
+            )
+            if response.status_code >= 500:
+                current.status = "error"
+            return response
+
+
+def metrics_view(request):
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4")
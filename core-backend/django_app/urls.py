@@ -14,12 +14,19 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 
+from .tracing import metrics_view
+
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('users/', include('users.urls')),
     path('tasks/', include('tasks.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
+
+# Not installed under MIDDLEWARE_PROFILE=api
+if apps.is_installed('django.contrib.admin'):
+    urlpatterns.append(path('admin/', admin.site.urls))
@@ -0,0 +1,45 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Task
+
+# ?ordering= values, each optionally prefixed with "-"
+ORDERING_FIELDS = ("id", "due_at", "priority", "created_at")
+
+
+def filter_tasks(queryset, params):
+    """
+    Apply the task list's query parameters
+
+    status, priority, due_before, due_after filter; ordering sorts, with
+    id as the tie-break in the same direction. The indexes on Task are
+    laid out for the common combinations: ?status=open&ordering=due_at,
+    ?status=open&ordering=-priority and ?ordering=-created_at.
+    """
+    status = params.get("status")
+    if status:
+        if status not in Task.Status.values:
+            raise ValidationError({"status": [f"Choose from {', '.join(Task.Status.values)}."]})
+        queryset = queryset.filter(status=status)
+
+    priority = params.get("priority")
+    if priority:
+        if not priority.isdigit() or int(priority) not in Task.Priority.values:
+            raise ValidationError({"priority": [f"Choose from {', '.join(map(str, Task.Priority.values))}."]})
+        queryset = queryset.filter(priority=int(priority))
+
+    for param, lookup in (("due_before", "due_at__lt"), ("due_after", "due_at__gte")):
+        value = params.get(param)
+        if value:
+            moment = parse_datetime(value)
+            if moment is None:
+                raise ValidationError({param: ["Use an ISO 8601 date and time."]})
+            queryset = queryset.filter(**{lookup: moment})
+
+    ordering = params.get("ordering", "id")
+    field = ordering.removeprefix("-")
+    if field not in ORDERING_FIELDS:
+        raise ValidationError({"ordering": [f"Choose from {', '.join(ORDERING_FIELDS)}, optionally prefixed with -."]})
+    if field == "id":
+        return queryset.order_by(ordering)
+    return queryset.order_by(ordering, "-id" if ordering.startswith("-") else "id")
@@ -0,0 +1,94 @@
+"""
+Serialization time and bytes on the wire for large task lists.
+
+Builds `--sizes` unsaved tasks, so no database is needed, and times for
+each list:
+- the serializer, which both renderers share
+- rendering with DRF's JSONRenderer and with ORJSONRenderer
+- parsing the body back with JSONParser and with ORJSONParser
+- the body's size raw, gzipped and brotli-compressed at the configured
+  levels, and how long compressing it took
+
+    python manage.py benchmark_task_json --sizes 100 1000 10000
+"""
+import io
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from django_app import compression
+from django_app.renderers import ORJSONParser, ORJSONRenderer
+from tasks.models import Task
+from tasks.serializers import TaskSerializer
+
+
+class Command(BaseCommand):
+    help = "Time rendering, parsing and compressing large task lists"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+        parser.add_argument("--runs", type=int, default=20, help="timed runs per measurement")
+
+    def handle(self, *args, **options):
+        runs = options["runs"]
+        self.stdout.write(f"{'tasks':>7} {'step':<22} {'p50 ms':>9} {'bytes':>11}")
+        for size in options["sizes"]:
+            tasks = self.build(size)
+            data = TaskSerializer(tasks, many=True).data
+            rows = [("serializer", self.measure(runs, lambda: TaskSerializer(tasks, many=True).data), None)]
+
+            for name, renderer in (("render json", JSONRenderer()), ("render orjson", ORJSONRenderer())):
+                body = renderer.render(data)
+                rows.append((name, self.measure(runs, lambda: renderer.render(data)), len(body)))
+            for name, parser in (("parse json", JSONParser()), ("parse orjson", ORJSONParser())):
+                rows.append((name, self.measure(runs, lambda: parser.parse(io.BytesIO(body))), None))
+
+            rows.append(("gzip", self.measure(runs, lambda: compression.compress(body, "gzip")),
+                         len(compression.compress(body, "gzip"))))
+            if compression.brotli is not None:
+                rows.append(("brotli", self.measure(runs, lambda: compression.compress(body, "br")),
+                             len(compression.compress(body, "br"))))
+
+            for name, p50, size_bytes in rows:
+                shown = f"{size_bytes:,}" if size_bytes is not None else ""
+                self.stdout.write(f"{size:>7,} {name:<22} {p50:>9.2f} {shown:>11}")
+        self.stdout.write(
+            f"\ngzip level {settings.COMPRESSION_GZIP_LEVEL}, brotli quality {settings.COMPRESSION_BROTLI_QUALITY}"
+            + ("" if compression.brotli is not None else " (brotli not installed)")
+        )
+
+    # ─────────────────────────────
+    @staticmethod
+    def build(size):
+        user = User(id=1, username="bench")
+        now = timezone.now()
+        statuses, priorities = Task.Status.values, Task.Priority.values
+        return [
+            Task(
+                id=i + 1,
+                title=f"Task number {i}: follow up on the quarterly report",
+                description="Collect the figures, check them against last quarter and send the summary round.",
+                user=user,
+                status=statuses[i % len(statuses)],
+                priority=priorities[i % len(priorities)],
+                due_at=now + timedelta(hours=i % 500) if i % 5 else None,
+                created_at=now - timedelta(minutes=i),
+            )
+            for i in range(size)
+        ]
+
+    @staticmethod
+    def measure(runs, step):
+        latencies = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            step()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.median(latencies)
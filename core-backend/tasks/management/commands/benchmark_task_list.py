@@ -0,0 +1,116 @@
+"""
+Latency of the task list queries at scale.
+
+Seeds `--tasks` tasks spread over `--users` users into the configured
+database. Run it against a scratch database; seeding is skipped when the
+benchmark users already hold enough tasks. It then times:
+- client-side: what clients did before server-side filtering, fetching
+  every task of the user and filtering and sorting locally
+- one page of each common server-side query, as the list endpoint runs it:
+  the count, the page of ids, then those rows
+
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=/tmp/bench.sqlite3 \\
+        python manage.py migrate
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=/tmp/bench.sqlite3 \\
+        python manage.py benchmark_task_list --tasks 1000000
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from tasks.filters import filter_tasks
+from tasks.models import Task
+
+QUERIES = {
+    "open by due date": {"status": "open", "ordering": "due_at"},
+    "open by priority": {"status": "open", "ordering": "-priority"},
+    "newest": {"ordering": "-created_at"},
+    "default (id)": {},
+}
+
+
+class Command(BaseCommand):
+    help = "Time the task list queries against a large seeded table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tasks", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--page-size", type=int, default=20)
+        parser.add_argument("--runs", type=int, default=50, help="timed runs per query")
+
+    def handle(self, *args, **options):
+        users = self.seed(options["tasks"], options["users"])
+        runs, page_size = options["runs"], options["page_size"]
+
+        results = {"client-side (all rows)": self.measure(users, runs, self.client_side, page_size)}
+        for name, params in QUERIES.items():
+            results[name] = self.measure(users, runs, self.server_page, page_size, params)
+
+        per_user = options["tasks"] // options["users"]
+        self.stdout.write(f"\n{connection.vendor}, {options['tasks']:,} tasks, ~{per_user:,} per user")
+        self.stdout.write(f"{'query':<24} {'p50 ms':>9} {'p95 ms':>9}")
+        for name, (p50, p95) in results.items():
+            self.stdout.write(f"{name:<24} {p50:>9.2f} {p95:>9.2f}")
+        self.stdout.write("\nPlans for the page of ids:")
+        for name, params in QUERIES.items():
+            plan = filter_tasks(Task.objects.filter(user=users[0]), params).values_list("pk", flat=True)[:page_size]
+            self.stdout.write(f"  {name}: {plan.explain()}")
+
+    # ─────────────────────────────
+    def seed(self, total, user_count):
+        users = [User.objects.get_or_create(username=f"bench{i}")[0] for i in range(user_count)]
+        existing = Task.objects.filter(user__in=users).count()
+        if existing >= total:
+            return users
+        self.stdout.write(f"Seeding {total - existing:,} tasks...")
+        now, rng = timezone.now(), random.Random(0)
+        batch = []
+        for i in range(existing, total):
+            batch.append(
+                Task(
+                    title=f"task {i}",
+                    description="benchmark",
+                    user=users[i % user_count],
+                    status=rng.choice(Task.Status.values),
+                    priority=rng.choice(Task.Priority.values),
+                    due_at=now + timedelta(minutes=rng.randrange(60 * 24 * 90)) if rng.random() < 0.8 else None,
+                    created_at=now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+                )
+            )
+            if len(batch) == 10_000:
+                Task.objects.bulk_create(batch)
+                batch.clear()
+        Task.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return users
+
+    def measure(self, users, runs, query, *args):
+        latencies = []
+        for i in range(runs):
+            user = users[i % len(users)]
+            started = time.perf_counter()
+            query(user, *args)
+            latencies.append((time.perf_counter() - started) * 1000)
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        return cuts[49], cuts[94]
+
+    @staticmethod
+    def client_side(user, page_size):
+        tasks = [t for t in Task.objects.filter(user=user) if t.status == Task.Status.OPEN]
+        tasks.sort(key=lambda t: (t.due_at is None, t.due_at, t.id))
+        return tasks[:page_size]
+
+    @staticmethod
+    def server_page(user, page_size, params):
+        queryset = filter_tasks(Task.objects.filter(user=user), params)
+        queryset.count()
+        ids = list(queryset.values_list("pk", flat=True)[:page_size])
+        rows = Task.objects.in_bulk(ids)
+        return [rows[pk] for pk in ids]
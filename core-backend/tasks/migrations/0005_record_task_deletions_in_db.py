@@ -0,0 +1,65 @@
+"""
+Record task deletions in the TaskDeletion outbox with a database trigger.
+
+A post_delete receiver made Django load and delete tasks one by one,
+cascades from a user included. A trigger sees every delete, keeps Django's
+single-statement fast delete, and writes the outbox in the same
+transaction. On Postgres it fires once per DELETE statement and inserts
+all the deleted ids with one INSERT ... SELECT.
+"""
+from django.db import migrations
+
+POSTGRES = (
+    """
+    CREATE OR REPLACE FUNCTION tasks_record_task_deletions() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO tasks_taskdeletion (task_id, deleted_at) SELECT id, now() FROM deleted_tasks ORDER BY id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER tasks_task_record_deletions AFTER DELETE ON tasks_task
+    REFERENCING OLD TABLE AS deleted_tasks
+    FOR EACH STATEMENT EXECUTE FUNCTION tasks_record_task_deletions()
+    """,
+)
+POSTGRES_REVERSE = (
+    "DROP TRIGGER IF EXISTS tasks_task_record_deletions ON tasks_task",
+    "DROP FUNCTION IF EXISTS tasks_record_task_deletions()",
+)
+
+# SQLite has no statement-level triggers; a row trigger still runs inside the one DELETE
+SQLITE = (
+    """
+    CREATE TRIGGER tasks_task_record_deletions AFTER DELETE ON tasks_task BEGIN
+        INSERT INTO tasks_taskdeletion (task_id, deleted_at)
+        VALUES (old.id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    """,
+)
+SQLITE_REVERSE = ("DROP TRIGGER IF EXISTS tasks_task_record_deletions",)
+
+
+def run(statements_by_vendor):
+    def apply(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor not in statements_by_vendor:
+            raise NotImplementedError(f"The task deletion trigger is not written for {vendor}")
+        for statement in statements_by_vendor[vendor]:
+            schema_editor.execute(statement, params=None)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_status_priority_due'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"postgresql": POSTGRES, "sqlite": SQLITE}),
+            run({"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE}),
+        ),
+    ]
@@ -1,8 +1,48 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 class Task(models.Model):
+    class Status(models.TextChoices):
+        OPEN = "open"
+        IN_PROGRESS = "in_progress"
+        DONE = "done"
+
+    class Priority(models.IntegerChoices):
+        LOW = 1
+        MEDIUM = 2
+        HIGH = 3
+
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=500)
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
\ No newline at end of file
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.OPEN)
+    priority = models.SmallIntegerField(choices=Priority.choices, default=Priority.MEDIUM)
+    due_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        # Every list is one user's tasks, so each index leads with user. The
+        # trailing id is the ordering tie-break; with it the index alone
+        # answers a page of ids (see tasks/filters.py).
+        indexes = [
+            models.Index(fields=["user", "status", "due_at", "id"], name="task_user_status_due_idx"),
+            models.Index(fields=["user", "status", "priority", "id"], name="task_user_status_prio_idx"),
+            models.Index(fields=["user", "created_at", "id"], name="task_user_created_idx"),
+        ]
+
+class TaskDeletion(models.Model):
+    """
+    Outbox of deleted tasks, written in the same transaction as the delete
+
+    Rows are inserted by a database trigger on the task table (migration
+    0005), not by Django, so bulk and cascaded deletes stay single
+    statements and raw SQL deletes are recorded too.
+
+    Comments live in the comment service's database and point at tasks by
+    id. That service reads this table in id order (GET /tasks/deletions/)
+    and cleans up the comments of each deleted task.
+    """
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
@@ -3,7 +3,7 @@ from .models import Task
 class TaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description']
-        read_only_fields = ['id']
+        fields = ['id', 'title', 'description', 'status', 'priority', 'due_at', 'created_at']
+        read_only_fields = ['id', 'created_at']
 
     
\ No newline at end of file
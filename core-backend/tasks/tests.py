@@ -1,3 +1,451 @@
-from django.test import TestCase
+import gzip
+import importlib.util
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import jwt
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from django_app import compression, db_router
+
+from .filters import filter_tasks
+from .models import Task, TaskDeletion
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def seed_tasks(user, count):
+    now = timezone.now()
+    statuses, priorities = Task.Status.values, Task.Priority.values
+    Task.objects.bulk_create(
+        (
+            Task(
+                title=f"task {i}",
+                description="",
+                user=user,
+                status=statuses[i % len(statuses)],
+                priority=priorities[i % len(priorities)],
+                due_at=now + timedelta(hours=i % 97) if i % 5 else None,
+                created_at=now - timedelta(minutes=i),
+            )
+            for i in range(count)
+        ),
+        batch_size=1000,
+    )
+
+
+class TaskListQueryPlanTests(TestCase):
+    """A page of ids for the common list queries comes from one index, without a sort"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(f"user{i}", password="unused") for i in range(5)]
+        for user in cls.users:
+            seed_tasks(user, 2000)
+
+    def page_ids(self, **params):
+        return filter_tasks(Task.objects.filter(user=self.users[0]), params).values_list("pk", flat=True)[:20]
+
+    def assert_index_only(self, queryset, index):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE tasks_task")
+                # Test tables are too small for the planner to prefer an index on its own
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_bitmapscan = off")
+        plan = queryset.explain()
+        self.assertIn(index, plan)
+        if connection.vendor == "sqlite":
+            self.assertIn("COVERING INDEX", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+        elif connection.vendor == "postgresql":
+            self.assertIn("Index Only Scan", plan)
+            self.assertNotIn("Sort", plan)
+
+    def test_open_tasks_by_due_date(self):
+        self.assert_index_only(self.page_ids(status="open", ordering="due_at"), "task_user_status_due_idx")
+        self.assert_index_only(self.page_ids(status="open", ordering="-due_at"), "task_user_status_due_idx")
+
+    def test_open_tasks_by_priority(self):
+        self.assert_index_only(self.page_ids(status="open", ordering="-priority"), "task_user_status_prio_idx")
+
+    def test_newest_tasks(self):
+        self.assert_index_only(self.page_ids(ordering="-created_at"), "task_user_created_idx")
+
+
+@override_settings(REPLICA_DATABASES=[])
+class TaskListFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="unused")
+        seed_tasks(self.user, 60)
+        seed_tasks(User.objects.create_user("bob", password="unused"), 10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_plain_list_is_unpaginated(self):
+        response = self.client.get("/tasks/")
+        self.assertEqual(len(response.json()), 60)
+
+    def test_filter_and_order_page(self):
+        response = self.client.get("/tasks/", {"status": "open", "ordering": "-priority", "page_size": 5})
+        body = response.json()
+        self.assertEqual(body["count"], Task.objects.filter(user=self.user, status="open").count())
+        expected = Task.objects.filter(user=self.user, status="open").order_by("-priority", "-id")[:5]
+        self.assertEqual([t["id"] for t in body["results"]], [t.id for t in expected])
+        self.assertTrue(all(t["status"] == "open" for t in body["results"]))
+
+    def test_due_window(self):
+        cutoff = timezone.now() + timedelta(hours=10)
+        response = self.client.get("/tasks/", {"due_before": cutoff.isoformat(), "ordering": "due_at"})
+        due = [t["due_at"] for t in response.json()]
+        self.assertEqual(len(due), Task.objects.filter(user=self.user, due_at__lt=cutoff).count())
+        self.assertEqual(due, sorted(due))
+
+    def test_invalid_parameters(self):
+        for params in ({"status": "later"}, {"priority": "9"}, {"ordering": "title"}, {"due_after": "soon"}):
+            self.assertEqual(self.client.get("/tasks/", params).status_code, 400, params)
+
+
+@override_settings(REPLICA_DATABASES=[])
+class TaskListEncodingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice", password="unused")
+        seed_tasks(self.user, 200)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_large_list_is_compressed(self):
+        response = self.client.get("/tasks/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertIn("Accept-Encoding", response["Vary"])
+        tasks = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(tasks), 200)
+
+    @skipUnless(compression.brotli, "brotli is not installed")
+    def test_brotli_is_preferred(self):
+        response = self.client.get("/tasks/", HTTP_ACCEPT_ENCODING="gzip, deflate, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(len(json.loads(compression.brotli.decompress(response.content))), 200)
+
+    def test_small_or_unaccepted_responses_are_not_compressed(self):
+        small = self.client.get("/tasks/", {"page_size": 1}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(small.has_header("Content-Encoding"))
+        refused = self.client.get("/tasks/", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(len(refused.json()), 200)
+
+    def test_orjson_round_trip(self):
+        response = self.client.post(
+            "/tasks/", json.dumps({"title": "ünïcode", "description": "d", "priority": 3}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["title"], "ünïcode")
+        malformed = self.client.post("/tasks/", "{", content_type="application/json")
+        self.assertEqual(malformed.status_code, 400)
+
+    def test_api_profile_passes_system_checks(self):
+        result = subprocess.run(
+            [sys.executable, "manage.py", "check", "--fail-level", "WARNING"],
+            cwd=settings.BASE_DIR, env={**os.environ, "MIDDLEWARE_PROFILE": "api"},
+            capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+def service_token(**claims):
+    """A task-deletions service token like comment/cleanup.py mints; `claims` override its own"""
+    claims = {"scope": "task-deletions", "exp": timezone.now() + timedelta(minutes=5), **claims}
+    return jwt.encode(
+        {name: value for name, value in claims.items() if value is not None},
+        settings.SECRET_KEY,
+        algorithm=settings.SIMPLE_JWT["ALGORITHM"],
+    )
+
+
+class StubCommentService:
+    """
+    The comment service's side of the deletion outbox, in process
+
+    Holds a live comment count per task and drains the outbox through the
+    same endpoints and token as comment/cleanup.py.
+    """
+
+    def __init__(self, task_ids, comments_per_task, batch_size=1000):
+        self.live = Counter({task_id: comments_per_task for task_id in task_ids})
+        self.batch_size = batch_size
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {service_token()}")
+
+    def drain(self, max_batches=None):
+        tasks = comments = batches = 0
+        while max_batches is None or batches < max_batches:
+            response = self.client.get("/tasks/deletions/", {"limit": self.batch_size})
+            assert response.status_code == 200, response.content
+            rows = response.json()["results"]
+            if not rows:
+                break
+            for row in rows:
+                comments += self.live.pop(row["task_id"], 0)
+            response = self.client.post("/tasks/deletions/ack/", {"ids": [row["id"] for row in rows]}, format="json")
+            assert response.json()["acknowledged"] == len(rows), response.content
+            tasks += len(rows)
+            batches += 1
+        return {"tasks": tasks, "comments": comments}
+
+
+@override_settings(REPLICA_DATABASES=[])
+class TaskDeletionOutboxTests(TestCase):
+    DELETED = 100_000
+    KEPT = 500
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="unused")
+        Task.objects.bulk_create(Task(title=f"t{i}", description="", user=self.owner) for i in range(50))
+
+    def test_queryset_delete_stays_one_statement_and_is_recorded(self):
+        ids = list(Task.objects.order_by("id").values_list("id", flat=True)[:30])
+        with CaptureQueriesContext(connection) as queries:
+            Task.objects.filter(id__in=ids).delete()
+        self.assertEqual([q["sql"].split()[0] for q in queries], ["DELETE"])
+        self.assertEqual(list(TaskDeletion.objects.order_by("id").values_list("task_id", flat=True)), ids)
+
+    def test_deletes_cascaded_from_a_user_are_recorded(self):
+        ids = set(Task.objects.values_list("id", flat=True))
+        self.owner.delete()
+        self.assertEqual(set(TaskDeletion.objects.values_list("task_id", flat=True)), ids)
+        self.assertTrue(all(TaskDeletion.objects.values_list("deleted_at", flat=True)))
+
+    def test_outbox_needs_a_service_token(self):
+        user_client = APIClient()
+        user_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.owner)}")
+        self.assertEqual(APIClient().get("/tasks/deletions/").status_code, 403)
+        self.assertEqual(user_client.get("/tasks/deletions/").status_code, 403)
+        self.assertEqual(user_client.post("/tasks/deletions/ack/", {"ids": [1]}, format="json").status_code, 403)
+
+    def test_ack_rejects_malformed_bodies(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {service_token()}")
+        for body in ([1, 2], 3, "ids", {"ids": 1}, {"ids": ["1"]}, {"ids": [True]}, {}):
+            with self.subTest(body=body):
+                self.assertEqual(client.post("/tasks/deletions/ack/", body, format="json").status_code, 400)
+        self.assertEqual(client.post("/tasks/deletions/ack/", {"ids": []}, format="json").status_code, 200)
+
+    def test_service_token_must_expire(self):
+        def status_with(token):
+            return APIClient().get("/tasks/deletions/", HTTP_AUTHORIZATION=f"Bearer {token}").status_code
+
+        self.assertEqual(status_with(service_token()), 200)
+        self.assertEqual(status_with(service_token(exp=None)), 403)
+        self.assertEqual(status_with(service_token(exp=timezone.now() - timedelta(minutes=1))), 403)
+        self.assertEqual(status_with(service_token(scope="tasks")), 403)
+
+    def test_comments_of_deleted_tasks_converge(self):
+        leaving = User.objects.create_user("leaving", password="unused")
+        keeper = User.objects.create_user("keeper", password="unused")
+        Task.objects.bulk_create(
+            (Task(title=f"t{i}", description="", user=self.owner) for i in range(self.DELETED - 50)), batch_size=5000
+        )
+        Task.objects.bulk_create(Task(title=f"l{i}", description="", user=leaving) for i in range(self.KEPT))
+        Task.objects.bulk_create(Task(title=f"k{i}", description="", user=keeper) for i in range(self.KEPT))
+        kept = set(Task.objects.filter(user=keeper).values_list("id", flat=True))
+        comments = StubCommentService(Task.objects.values_list("id", flat=True), comments_per_task=2)
+
+        Task.objects.filter(user=self.owner).delete()
+        leaving.delete()
+        self.assertEqual(TaskDeletion.objects.count(), self.DELETED + self.KEPT)
+
+        # Stopping part-way leaves the rest in the outbox for the next run
+        self.assertEqual(comments.drain(max_batches=10)["tasks"], 10 * 1000)
+        self.assertEqual(TaskDeletion.objects.count(), self.DELETED + self.KEPT - 10 * 1000)
+
+        comments.drain()
+        self.assertEqual(TaskDeletion.objects.count(), 0)
+        self.assertEqual(set(comments.live), kept)
+
+        # Replaying an already-handled deletion changes nothing
+        TaskDeletion.objects.create(task_id=min(kept) - 1)
+        self.assertEqual(comments.drain(), {"tasks": 1, "comments": 0})
+        self.assertEqual(set(comments.live), kept)
+
+
+@skipUnless(
+    importlib.util.find_spec("sqlmodel"),
+    "end-to-end run of comment/cleanup.py needs comment/requirements.txt installed; "
+    "TaskDeletionOutboxTests covers the outbox protocol without it",
+)
+@override_settings(REPLICA_DATABASES=[])
+class TaskDeletionCleanupTests(LiveServerTestCase):
+    """Deleting tasks here converges the comment service's own table through comment/cleanup.py"""
+
+    DELETED = 100_000
+    KEPT = 500
+    COMMENTS_PER_TASK = 2
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.comment_db = Path(self.tmp.name) / "comment.sqlite3"
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{self.comment_db}",
+            "APP_NAME": "comment",
+            "PORT": "0",
+            "DJANGO_SECRET_KEY": settings.SECRET_KEY,
+            "JWT_ALGORITHM": "HS256",
+            "CORE_BASE_URL": self.live_server_url,
+            "LOG_LEVEL": "WARNING",
+        }
+        self.comment("migrate")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def comment(self, module, *args):
+        result = subprocess.run(
+            [sys.executable, "-m", f"comment.{module}", *args],
+            cwd=REPO_ROOT, env=self.env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout
+
+    def cleanup(self, *args):
+        return json.loads(self.comment("cleanup", *args))
+
+    def seed_comments(self, task_ids):
+        with sqlite3.connect(self.comment_db) as db:
+            db.executemany(
+                "INSERT INTO comment (content, entity_id, user_id, created_at, updated_at) "
+                "VALUES ('seeded', ?, 1, '2025-01-01 00:00:00', '2025-01-01 00:00:00')",
+                ((task_id,) for task_id in task_ids for _ in range(self.COMMENTS_PER_TASK)),
+            )
+
+    def live_comment_tasks(self):
+        with sqlite3.connect(self.comment_db) as db:
+            rows = db.execute("SELECT DISTINCT entity_id FROM comment WHERE deleted_at IS NULL").fetchall()
+        return {row[0] for row in rows}
+
+    def test_comments_of_deleted_tasks_converge(self):
+        owner = User.objects.create_user("owner", password="unused")
+        leaving = User.objects.create_user("leaving", password="unused")
+        keeper = User.objects.create_user("keeper", password="unused")
+        Task.objects.bulk_create(
+            (Task(title=f"t{i}", description="", user=owner) for i in range(self.DELETED)), batch_size=5000
+        )
+        Task.objects.bulk_create(Task(title=f"l{i}", description="", user=leaving) for i in range(self.KEPT))
+        Task.objects.bulk_create(Task(title=f"k{i}", description="", user=keeper) for i in range(self.KEPT))
+        kept = set(Task.objects.filter(user=keeper).values_list("id", flat=True))
+        self.seed_comments(Task.objects.values_list("id", flat=True))
+
+        # A queryset delete and a delete cascaded from a user both reach the outbox
+        Task.objects.filter(user=owner).delete()
+        leaving.delete()
+        self.assertEqual(TaskDeletion.objects.count(), self.DELETED + self.KEPT)
+
+        # Stopping part-way leaves the rest in the outbox for the next run
+        partial = self.cleanup("--max-batches", "10")
+        self.assertEqual(partial["tasks"], 10 * 1000)
+        self.assertEqual(TaskDeletion.objects.count(), self.DELETED + self.KEPT - 10 * 1000)
+
+        self.cleanup()
+        self.assertEqual(TaskDeletion.objects.count(), 0)
+        self.assertEqual(self.live_comment_tasks(), kept)
+
+        # Replaying an already-handled deletion changes nothing
+        TaskDeletion.objects.create(task_id=min(kept) - 1)
+        self.assertEqual(self.cleanup()["comments"], 0)
+        self.assertEqual(self.live_comment_tasks(), kept)
+
+
+@skipUnless("replica1" in settings.DATABASES, "needs the replica1 alias of django_app.test_settings or DB_REPLICAS")
+@override_settings(REPLICA_DATABASES=["replica1"])
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        db_router.health.reset()
+        self.replica = "replica1"
+        self.alice = self.client_for(User.objects.create_user("alice", password="unused"))
+        self.bob = self.client_for(User.objects.create_user("bob", password="unused"))
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    def queries_by_alias(self, request):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections[self.replica]) as replica:
+            response = request()
+        self.assertLess(response.status_code, 400, response.content)
+        return len(primary), len(replica)
+
+    def test_reads_use_the_replica(self):
+        self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/tasks/"))[0], 0)
+        self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/users/profile/"))[0], 0)
+
+    def test_request_span_counts_replica_queries(self):
+        with mock.patch("observability.tracing._record") as record:
+            self.queries_by_alias(lambda: self.alice.get("/tasks/"))
+        http = next(call.args[0] for call in record.call_args_list if call.args[0].name == "http")
+        self.assertGreater(http.attributes["db_queries"], 0)
+
+    def test_writes_and_their_request_use_the_primary(self):
+        primary, replica = self.queries_by_alias(
+            lambda: self.alice.post("/tasks/", {"title": "t", "description": "d"}, format="json")
+        )
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_writer_reads_the_primary_until_the_pin_expires(self):
+        self.alice.post("/tasks/", {"title": "t", "description": "d"}, format="json")
+        self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/tasks/"))[1], 0)
+        # Other users are not pinned
+        self.assertEqual(self.queries_by_alias(lambda: self.bob.get("/tasks/"))[0], 0)
+
+        with override_settings(READ_YOUR_WRITES_SECONDS=0):
+            self.alice.post("/tasks/", {"title": "t", "description": "d"}, format="json")
+        self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/tasks/"))[0], 0)
+
+    @override_settings(REPLICA_HEALTH_CHECK_INTERVAL=0)
+    def test_unhealthy_replica_falls_back_to_the_primary(self):
+        with mock.patch.object(db_router.health, "check", return_value=False):
+            self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/tasks/"))[1], 0)
+        # The next check passes and reads return to the replica
+        self.assertEqual(self.queries_by_alias(lambda: self.alice.get("/tasks/"))[0], 0)
+
+    def test_user_missing_on_the_replica_is_looked_up_on_the_primary(self):
+        aliases = []
+        real_get_user = JWTAuthentication.get_user
+
+        def lagging_get_user(authentication, token):
+            alias = db_router.ReplicaRouter().db_for_read(User)
+            aliases.append(alias)
+            if alias != "default":
+                # The user has not replicated yet
+                raise AuthenticationFailed("User not found")
+            return real_get_user(authentication, token)
+
+        with mock.patch.object(JWTAuthentication, "get_user", lagging_get_user):
+            response = self.alice.get("/users/profile/")
+        self.assertEqual(response.json()["username"], "alice")
+        self.assertEqual(aliases, [self.replica, "default"])
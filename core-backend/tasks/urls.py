@@ -4,4 +4,6 @@ from . import views
 
 urlpatterns = [
     path("", view=views.TaskListCreateView.as_view(), name="task-list-create"),
+    path("deletions/", view=views.TaskDeletionListView.as_view(), name="task-deletion-list"),
+    path("deletions/ack/", view=views.TaskDeletionAckView.as_view(), name="task-deletion-ack"),
 ]
\ No newline at end of file
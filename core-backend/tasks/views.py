@@ -1,23 +1,92 @@
+import jwt
+from django.conf import settings
 from django.shortcuts import render
 from django.http import HttpResponse
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .filters import filter_tasks
 from .serializers import TaskSerializer
-from .models import Task
-from django.contrib.auth.models import User
+from .models import Task, TaskDeletion
 # Create your views here.
 
 
 def index(request):
     return HttpResponse("Tasks")
 
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Paginate only when the client asks for a page, so plain lists keep working
+
+    A page is read in two steps: the ids, which the (user, ...) indexes
+    answer without touching the table, then those rows by primary key.
+    """
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        ids = super().paginate_queryset(queryset.values_list("pk", flat=True), request, view)
+        rows = queryset.model._base_manager.in_bulk(ids)
+        return [rows[pk] for pk in ids]
+
+
 class TaskListCreateView(generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalPageNumberPagination
 
     def get_queryset(self):
-        return Task.objects.filter(user__username=self.request.user)
+        return filter_tasks(Task.objects.filter(user=self.request.user), self.request.query_params)
     
     def perform_create(self, serializer):
-        user = User.objects.get(username=self.request.user)
-        return serializer.save(user=user)
+        return serializer.save(user=self.request.user)
+
+
+class IsTaskDeletionConsumer(permissions.BasePermission):
+    """A service token: an expiring JWT signed with the shared secret whose scope is task-deletions"""
+
+    def has_permission(self, request, view):
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return False
+        try:
+            claims = jwt.decode(
+                header[len("Bearer "):],
+                settings.SECRET_KEY,
+                algorithms=[settings.SIMPLE_JWT["ALGORITHM"]],
+                options={"require": ["exp"]},
+            )
+        except jwt.InvalidTokenError:
+            return False
+        return claims.get("scope") == "task-deletions"
+
+
+class TaskDeletionListView(APIView):
+    """Oldest task deletions not yet acknowledged by the comment service"""
+    authentication_classes = []
+    permission_classes = [IsTaskDeletionConsumer]
+
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 1000)), 10000))
+        except ValueError:
+            return Response({"detail": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        rows = TaskDeletion.objects.order_by("id").values("id", "task_id")[:limit]
+        return Response({"results": list(rows)})
+
+
+class TaskDeletionAckView(APIView):
+    """Drop outbox rows once their comments are cleaned up; acking twice is harmless"""
+    authentication_classes = []
+    permission_classes = [IsTaskDeletionConsumer]
 
+    def post(self, request):
+        ids = request.data.get("ids") if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return Response({"detail": "ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        deleted, _ = TaskDeletion.objects.filter(id__in=ids).delete()
+        return Response({"acknowledged": deleted})
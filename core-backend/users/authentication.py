@@ -0,0 +1,16 @@
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from django_app.db_router import use_primary
+
+
+class PrimaryFallbackJWTAuthentication(JWTAuthentication):
+    """JWT authentication that looks a user up on the primary when a replica does not have them yet"""
+
+    def get_user(self, validated_token):
+        try:
+            return super().get_user(validated_token)
+        except AuthenticationFailed:
+            # A user who registered a moment ago may not have replicated yet
+            with use_primary():
+                return super().get_user(validated_token)
@@ -0,0 +1,171 @@
+"""
+Password hashing on a bounded pool.
+
+PBKDF2 at Django's default 1,000,000 iterations costs a few hundred
+milliseconds of CPU per hash. If every request thread hashes for itself, a
+burst of signups or logins takes every core and stalls unrelated requests.
+Here hashing runs on a small dedicated pool, PASSWORD_HASHING_WORKERS
+threads wide. hashlib releases the GIL while it hashes, so the pool bounds
+the CPU hashing can take. Requests wait for a hash in a bounded queue, and
+anything beyond PASSWORD_HASHING_QUEUE is refused with 503. Per client IP,
+at most PASSWORD_HASHING_PER_IP register/login requests are in flight at
+once; more get 429.
+
+The pool only caps the CPU that hashing takes; it does not free request
+workers. The register and login views are synchronous DRF views, so
+their worker stays blocked while the hash waits and runs, for up to
+PASSWORD_HASHING_QUEUE_TIMEOUT seconds. What keeps a burst of logins
+from holding every worker is refusing early: the queue bound (503) and
+the per-IP limit (429).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class HashingOverloaded(Exception):
+    """Raised when a hash cannot get a worker in time"""
+
+
+class TooManyAttempts(Exception):
+    """Raised when one client IP already has its share of hashing requests in flight"""
+
+
+class HashingExecutor:
+    """
+    Thread pool with at most `workers + max_queue` hashes admitted at once
+
+    A hash keeps its slot until it finishes or is cancelled, including after
+    its caller gave up waiting, so timeouts cannot admit more hashes than
+    the pool can hold.
+    """
+
+    def __init__(self, workers, max_queue, queue_timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rejected = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+        self._admitted = threading.BoundedSemaphore(workers + max_queue)
+
+    def run(self, fn, *args):
+        if not self._admitted.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded("password hashing queue is full")
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._admitted.release()
+            raise
+        future.add_done_callback(lambda _: self._admitted.release())
+        try:
+            return future.result(timeout=self.queue_timeout)
+        except FutureTimeoutError:
+            # A queued hash is dropped; one that has started runs on, holding its slot
+            future.cancel()
+            self.rejected += 1
+            raise HashingOverloaded(f"password hashing took more than {self.queue_timeout}s")
+
+
+class PerIPAdmission:
+    """Count of hashing requests in flight per client IP"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.rejected = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, ip):
+        if self.limit <= 0:
+            yield
+            return
+        with self._lock:
+            if self._in_flight.get(ip, 0) >= self.limit:
+                self.rejected += 1
+                raise TooManyAttempts(ip)
+            self._in_flight[ip] = self._in_flight.get(ip, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[ip] -= 1
+                if not self._in_flight[ip]:
+                    del self._in_flight[ip]
+
+
+executor = HashingExecutor(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_queue=settings.PASSWORD_HASHING_QUEUE,
+    queue_timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT,
+)
+per_ip = PerIPAdmission(settings.PASSWORD_HASHING_PER_IP)
+
+
+class IsolatedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 run on the hashing pool, with configurable iterations
+
+    It keeps the `pbkdf2_sha256` algorithm name, so existing hashes still
+    verify. A hash stored with a different iteration count is upgraded at
+    the user's next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHER_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        # verify() and harden_runtime() both go through encode, so this is the only hook
+        if not settings.PASSWORD_HASHING_ISOLATED:
+            return super().encode(password, salt, iterations)
+        return executor.run(super().encode, password, salt, iterations)
+
+
+def client_ip(request):
+    """
+    The address the nearest trusted proxy saw the request come from
+
+    Each proxy appends the address it received from, so the leftmost
+    entries are whatever the client sent. Only the entry added by the
+    outermost of the PASSWORD_HASHING_TRUSTED_PROXIES proxies is trusted.
+    """
+    header = settings.PASSWORD_HASHING_CLIENT_IP_HEADER
+    if header and request.META.get(header):
+        entries = [entry.strip() for entry in request.META[header].split(",") if entry.strip()]
+        if entries:
+            return entries[-min(settings.PASSWORD_HASHING_TRUSTED_PROXIES, len(entries))]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def hashing_admission(view_method):
+    """Apply per-IP admission to a view method that hashes, and map overload to 429/503"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        retry_after = {"Retry-After": "1"}
+        try:
+            with per_ip.admit(client_ip(request)):
+                return view_method(self, request, *args, **kwargs)
+        except TooManyAttempts:
+            return Response(
+                {"detail": "Too many concurrent attempts from this address."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers=retry_after,
+            )
+        except HashingOverloaded:
+            return Response(
+                {"detail": "Authentication is busy, try again shortly."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers=retry_after,
+            )
+
+    return wrapper
@@ -1,3 +1,47 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .hashing import HashingExecutor, HashingOverloaded, client_ip
+
+
+class HashingExecutorTests(SimpleTestCase):
+    def test_timed_out_hash_keeps_its_slot_until_it_finishes(self):
+        executor = HashingExecutor(workers=1, max_queue=0, queue_timeout=0.05)
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow_hash():
+            release.wait(5)
+            finished.set()
+            return "hash"
+
+        with self.assertRaises(HashingOverloaded):
+            executor.run(slow_hash)
+        # The first hash is still running, so there is no slot for a second one
+        with self.assertRaisesRegex(HashingOverloaded, "queue is full"):
+            executor.run(lambda: "hash")
+
+        release.set()
+        finished.wait(5)
+        executor._pool.submit(lambda: None).result(5)
+        self.assertEqual(executor.run(lambda: "hash"), "hash")
+
+
+class ClientIPTests(SimpleTestCase):
+    def ip(self, forwarded_for, **extra):
+        return client_ip(RequestFactory().get("/", HTTP_X_FORWARDED_FOR=forwarded_for, REMOTE_ADDR="10.0.0.1", **extra))
+
+    @override_settings(PASSWORD_HASHING_CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR", PASSWORD_HASHING_TRUSTED_PROXIES=1)
+    def test_spoofed_entries_are_ignored(self):
+        self.assertEqual(self.ip("1.2.3.4, 203.0.113.7"), "203.0.113.7")
+        self.assertEqual(self.ip("203.0.113.7"), "203.0.113.7")
+
+    @override_settings(PASSWORD_HASHING_CLIENT_IP_HEADER="HTTP_X_FORWARDED_FOR", PASSWORD_HASHING_TRUSTED_PROXIES=2)
+    def test_trusted_hops_are_skipped(self):
+        self.assertEqual(self.ip("1.2.3.4, 203.0.113.7, 10.0.0.2"), "203.0.113.7")
+        self.assertEqual(self.ip("203.0.113.7"), "203.0.113.7")
+
+    @override_settings(PASSWORD_HASHING_CLIENT_IP_HEADER="")
+    def test_without_header_uses_remote_addr(self):
+        self.assertEqual(self.ip("1.2.3.4"), "10.0.0.1")
@@ -2,6 +2,7 @@ from django.http import HttpResponse
 from rest_framework import generics
 from django.contrib.auth.models import User
 from .serializers import RegisterSerializer
+from .hashing import hashing_admission
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework.views import APIView
@@ -15,6 +16,10 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
 
+    @hashing_admission
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -26,6 +31,10 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
+    @hashing_admission
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
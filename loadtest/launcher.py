@@ -0,0 +1,299 @@
+"""
+Launch the whole stack locally for load testing.
+
+Starts, in order:
+- the database: SQLite files in the run directory, or the docker-compose
+  Postgres (`--db postgres`)
+- the schema steps: core-backend's `migrate` and `python -m comment.migrate`
+- core-backend
+- comment
+- mcp, over SSE
+- a fake Ollama (ai-service/benchmarks/fake_ollama.py)
+- ai-service
+
+Each service counts as started once its readiness URL (if it has one)
+returns 200. All services share one JWT secret. Each service logs to
+<run-dir>/<service>.log. With `--trace`, each service also writes its spans
+to <run-dir>/<service>.spans.jsonl.
+
+Run from the repository root and stop with Ctrl-C:
+    python -m loadtest.launcher --db sqlite --llm-latency 0.2
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+
+JWT_SECRET = "loadtest-secret-key-shared-by-every-service"
+POSTGRES = {"user": "user", "password": "password", "host": "127.0.0.1", "port": 5444, "name": "taskmanager"}
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode}")
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on {host}:{port} after {timeout}s")
+
+
+def wait_for_ready(url: str, timeout: float = 30.0, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+@dataclass
+class Service:
+    cmd: List[str]
+    cwd: Path
+    env: Dict[str, str]
+    port: int
+    ready_path: Optional[str] = None  # polled until it returns 200 once the port is open
+
+
+@dataclass
+class Ports:
+    core: int = 8000
+    mcp: int = 8001
+    ai: int = 8002
+    comment: int = 8003
+    llm: int = 11434
+
+
+@dataclass
+class Stack:
+    """The four services, a database and a fake LLM as child processes"""
+
+    db: str = "sqlite"
+    run_dir: Optional[Path] = None
+    ports: Ports = field(default_factory=Ports)
+    python: str = sys.executable
+    core_server: str = "runserver"  # or "uvicorn" (ASGI, --core-workers processes)
+    core_workers: int = 1
+    llm_latency: float = 0.2
+    llm_iterations: int = 1
+    llm_capacity: int = 0
+    trace: bool = False
+    processes: Dict[str, subprocess.Popen] = field(default_factory=dict)
+
+    @property
+    def urls(self) -> Dict[str, str]:
+        return {
+            "core": f"http://127.0.0.1:{self.ports.core}",
+            "comment": f"http://127.0.0.1:{self.ports.comment}",
+            "mcp": f"http://127.0.0.1:{self.ports.mcp}/sse",
+            "ai": f"http://127.0.0.1:{self.ports.ai}",
+            "llm": f"http://127.0.0.1:{self.ports.llm}/api/chat",
+        }
+
+    def __enter__(self) -> "Stack":
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ─────────────────────────────
+    def _env(self, service: str, **extra) -> Dict[str, str]:
+        env = {**os.environ, "DJANGO_SECRET_KEY": JWT_SECRET, "JWT_ALGORITHM": "HS256", "LOG_LEVEL": "WARNING"}
+        if self.trace:
+            env["TRACE_JSONL_PATH"] = str(self.run_dir / f"{service}.spans.jsonl")
+        env.update({k: str(v) for k, v in extra.items()})
+        return env
+
+    def _core_db(self) -> Dict[str, str]:
+        if self.db == "sqlite":
+            return {"DB_ENGINE": "django.db.backends.sqlite3", "DB_NAME": str(self.run_dir / "core.sqlite3")}
+        return {
+            "DB_ENGINE": "django.db.backends.postgresql",
+            "DB_NAME": POSTGRES["name"],
+            "DB_USER": POSTGRES["user"],
+            "DB_PASSWORD": POSTGRES["password"],
+            "DB_HOST": POSTGRES["host"],
+            "DB_PORT": POSTGRES["port"],
+        }
+
+    def _comment_db(self) -> str:
+        if self.db == "sqlite":
+            return f"sqlite:///{self.run_dir / 'comment.sqlite3'}"
+        return "postgresql://{user}:{password}@{host}:{port}/{name}".format(**POSTGRES)
+
+    def services(self) -> Dict[str, Service]:
+        """How to run each service, in start order"""
+        if self.core_server == "uvicorn":
+            core_cmd = [
+                self.python, "-m", "uvicorn", "django_app.asgi:application",
+                "--host", "127.0.0.1", "--port", str(self.ports.core),
+                "--workers", str(self.core_workers), "--log-level", "warning",
+            ]
+        else:
+            core_cmd = [self.python, "manage.py", "runserver", f"127.0.0.1:{self.ports.core}", "--noreload"]
+        return {
+            "core": Service(core_cmd, ROOT / "core-backend", self._env("core", **self._core_db()),
+                            self.ports.core, "/users/"),
+            "comment": Service(
+                [self.python, "-m", "uvicorn", "comment.main:app", "--host", "127.0.0.1",
+                 "--port", str(self.ports.comment), "--log-level", "warning"],
+                ROOT,
+                self._env("comment", DATABASE_URL=self._comment_db(), APP_NAME="comment", PORT=self.ports.comment,
+                          CORE_BASE_URL=self.urls["core"]),
+                self.ports.comment,
+                "/ready",
+            ),
+            "mcp": Service(
+                [self.python, "server.py"],
+                ROOT / "mcp",
+                self._env("mcp", COMMENT_BASE_URL=self.urls["comment"], HOST="127.0.0.1",
+                          PORT=self.ports.mcp, TRANSPORT="sse"),
+                self.ports.mcp,
+            ),
+            "llm": Service(
+                [self.python, "-m", "benchmarks.fake_ollama", "--port", str(self.ports.llm),
+                 "--iterations", str(self.llm_iterations), "--latency", str(self.llm_latency),
+                 "--capacity", str(self.llm_capacity)],
+                ROOT / "ai-service",
+                self._env("llm"),
+                self.ports.llm,
+            ),
+            "ai": Service(
+                [self.python, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(self.ports.ai), "--log-level", "warning"],
+                ROOT / "ai-service",
+                self._env("ai", OPEN_AI_KEY="loadtest", PORT=self.ports.ai, LLM_BACKEND="ollama",
+                          OLLAMA_URL=self.urls["llm"], MCP_URL=self.urls["mcp"], MCP_TRANSPORT="sse",
+                          CORE_BASE_URL=self.urls["core"], COMMENT_BASE_URL=self.urls["comment"]),
+                self.ports.ai,
+                "/ready",
+            ),
+        }
+
+    def spawn(self, name: str, timeout: float = 60.0, **env) -> Tuple[float, float]:
+        """Start one service and wait until it is ready; returns (listening, ready) seconds"""
+        service = self.services()[name]
+        log = open(self.run_dir / f"{name}.log", "a")
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            service.cmd, cwd=service.cwd, env={**service.env, **env}, stdout=log, stderr=subprocess.STDOUT
+        )
+        self.processes[name] = process
+        try:
+            wait_for_port("127.0.0.1", service.port, timeout=timeout, process=process)
+            listening = time.perf_counter() - started
+            if service.ready_path:
+                wait_for_ready(f"http://127.0.0.1:{service.port}{service.ready_path}", timeout, process)
+        except RuntimeError as e:
+            raise RuntimeError(f"{name} failed to start ({e}); see {log.name}") from None
+        return listening, time.perf_counter() - started
+
+    def terminate(self, name: str):
+        process = self.processes.pop(name)
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def migrate(self):
+        """The explicit schema steps: Django migrations and the comment tables"""
+        steps = [
+            ([self.python, "manage.py", "migrate", "--noinput"], ROOT / "core-backend", self._env("core", **self._core_db())),
+            ([self.python, "-m", "comment.migrate"], ROOT, self.services()["comment"].env),
+        ]
+        for cmd, cwd, env in steps:
+            # A freshly started Postgres accepts connections a little after its port opens
+            for attempt in range(10):
+                result = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+                if result.returncode == 0:
+                    break
+                time.sleep(1)
+            else:
+                raise RuntimeError(f"{' '.join(cmd)} failed:\n{result.stderr}")
+
+    def start(self):
+        self.run_dir = Path(self.run_dir or tempfile.mkdtemp(prefix="loadtest-"))
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Run directory: {self.run_dir}")
+
+        if self.db == "postgres":
+            subprocess.run(["docker", "compose", "up", "-d", "db"], cwd=ROOT, check=True)
+            wait_for_port(POSTGRES["host"], POSTGRES["port"], timeout=60)
+
+        try:
+            self.migrate()
+            for name in self.services():
+                listening, ready = self.spawn(name)
+                print(f"✅ {name} listening after {listening:.2f}s, ready after {ready:.2f}s")
+        except BaseException:
+            self.stop()
+            raise
+
+    def stop(self):
+        for name in reversed(list(self.processes)):
+            self.terminate(name)
+
+
+def add_stack_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--db", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument("--run-dir", type=Path, help="logs and SQLite files (default: a new temp dir)")
+    parser.add_argument("--core-server", choices=["runserver", "uvicorn"], default="runserver")
+    parser.add_argument("--core-workers", type=int, default=1, help="uvicorn workers for core-backend")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake LLM time per call (s)")
+    parser.add_argument("--llm-iterations", type=int, default=1, help="tool rounds per chat")
+    parser.add_argument("--llm-capacity", type=int, default=0, help="LLM calls served at once, 0 for unlimited")
+    parser.add_argument("--trace", action="store_true", help="write every service's spans to the run dir")
+
+
+def stack_from_args(args) -> Stack:
+    return Stack(
+        db=args.db,
+        run_dir=args.run_dir,
+        core_server=args.core_server,
+        core_workers=args.core_workers,
+        llm_latency=args.llm_latency,
+        llm_iterations=args.llm_iterations,
+        llm_capacity=args.llm_capacity,
+        trace=args.trace,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+
+    with stack_from_args(args) as stack:
+        for name, url in stack.urls.items():
+            print(f"{name:<8} {url}")
+        try:
+            while all(p.poll() is None for p in stack.processes.values()):
+                time.sleep(1)
+            print("A service exited; stopping the stack")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
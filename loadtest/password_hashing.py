@@ -0,0 +1,124 @@
+"""
+Task-list latency under a login burst, with and without hashing isolation.
+
+Brings the stack up with the launcher and registers one user with a few
+tasks. core-backend is then started twice:
+- inline: PASSWORD_HASHING_ISOLATED=false, so every request thread runs
+  its own PBKDF2
+- isolated: hashing runs on the bounded pool from users/hashing.py
+
+In each mode it offers open-loop Poisson load for `--duration` seconds:
+- logins at `--login-rate`, each from its own X-Forwarded-For address so
+  per-IP admission does not apply
+- task lists at `--task-rate`
+
+The report lists task p50/p99 and login p50/p99, each with status counts.
+Isolation keeps task p99 flat while logins queue behind
+PASSWORD_HASHING_WORKERS threads; excess logins get 503 instead of
+slowing every request.
+
+Run from the repository root:
+    python -m loadtest.password_hashing --login-rate 4 --task-rate 20 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict
+
+import httpx
+
+from loadtest.launcher import add_stack_arguments, stack_from_args
+from loadtest.run import OperationStats, _auth, create_accounts
+
+
+async def offered_load(urls, account, password: str, args) -> Dict[str, OperationStats]:
+    stats = {"task_list": OperationStats(), "login": OperationStats()}
+
+    async def login(client):
+        address = f"10.{random.randrange(256)}.{random.randrange(256)}.{random.randrange(1, 255)}"
+        return await client.post(
+            f"{urls['core']}/users/login/",
+            json={"username": account.username, "password": password},
+            headers={"X-Forwarded-For": address},
+        )
+
+    async def task_list(client):
+        return await client.get(f"{urls['core']}/tasks/", headers=_auth(account))
+
+    async def one(client, name, operation):
+        started = time.perf_counter()
+        try:
+            response = await operation(client)
+            stats[name].statuses[str(response.status_code)] += 1
+            if response.status_code >= 400:
+                stats[name].errors += 1
+        except httpx.HTTPError as e:
+            stats[name].statuses[type(e).__name__] += 1
+            stats[name].errors += 1
+        stats[name].latencies_ms.append((time.perf_counter() - started) * 1000)
+
+    async def arrivals(client, name, operation, rate, deadline, pending):
+        while True:
+            await asyncio.sleep(random.expovariate(rate))
+            if time.monotonic() >= deadline:
+                return
+            pending.add(asyncio.create_task(one(client, name, operation)))
+
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        pending = set()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(
+            arrivals(client, "login", login, args.login_rate, deadline, pending),
+            arrivals(client, "task_list", task_list, args.task_rate, deadline, pending),
+        )
+        await asyncio.gather(*pending)
+    return stats
+
+
+async def setup(urls):
+    async with httpx.AsyncClient(timeout=120) as client:
+        (account,) = await create_accounts(client, urls, users=1, tasks_per_user=5)
+    return account
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    parser.add_argument("--login-rate", type=float, default=4.0, help="logins per second")
+    parser.add_argument("--task-rate", type=float, default=20.0, help="task lists per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per mode")
+    parser.add_argument("--workers", type=int, default=1, help="PASSWORD_HASHING_WORKERS in isolated mode")
+    parser.add_argument("--iterations", type=int, help="PASSWORD_HASHER_ITERATIONS (default: Django's)")
+    args = parser.parse_args()
+
+    common = {"PASSWORD_HASHING_CLIENT_IP_HEADER": "HTTP_X_FORWARDED_FOR"}
+    if args.iterations:
+        common["PASSWORD_HASHER_ITERATIONS"] = str(args.iterations)
+    modes = {
+        "inline": {**common, "PASSWORD_HASHING_ISOLATED": "false"},
+        "isolated": {**common, "PASSWORD_HASHING_ISOLATED": "true", "PASSWORD_HASHING_WORKERS": str(args.workers)},
+    }
+    # The password create_accounts registers with
+    password = "Load-test-password-1"
+
+    results = {}
+    with stack_from_args(args) as stack:
+        account = asyncio.run(setup(stack.urls))
+        for mode, env in modes.items():
+            stack.terminate("core")
+            stack.spawn("core", **env)
+            results[mode] = asyncio.run(offered_load(stack.urls, account, password, args))
+
+    print(f"\n{args.login_rate:g} logins/s + {args.task_rate:g} task lists/s for {args.duration:g}s per mode")
+    print(f"{'mode':<10} {'operation':<10} {'count':>6} {'p50 ms':>9} {'p99 ms':>9}   statuses")
+    for mode, stats in results.items():
+        for name, op in stats.items():
+            cuts = op.percentiles()
+            statuses = " ".join(f"{k}:{v}" for k, v in sorted(op.statuses.items()))
+            print(f"{mode:<10} {name:<10} {len(op.latencies_ms):>6} {cuts['p50']:>9.1f} {cuts['p99']:>9.1f}   {statuses}")
+
+
+if __name__ == "__main__":
+    main()
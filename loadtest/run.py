@@ -0,0 +1,403 @@
+"""
+Mixed-workload load test of the whole stack.
+
+Brings the stack up with the launcher (or targets one that is already
+running, with `--no-launch`). It registers `--users` accounts, each with a
+few tasks, then offers an open-loop Poisson load at each rate in
+`--rates`, `--duration` seconds per step. Every arrival picks an operation
+from `--mix`:
+
+    task_create     POST core    /tasks/
+    task_list       GET  core    /tasks/
+    comment_create  POST comment /api/v1/comments/   (on one of the user's tasks)
+    comment_list    GET  comment /api/v1/comments/?entity_id=
+    chat            POST ai      /api/v1/chat/       (fake LLM -> mcp -> comment)
+    task_feed       GET  ai      /api/v1/tasks/      (core page + one comment summary)
+
+Each step reports, per operation, the count, error rate and latency
+percentiles. It also reports each service's server-side time, taken from
+the span histograms on its /metrics. By Little's law, server busy-seconds
+per second is the average number of requests in flight. The service whose
+in-flight count climbs while throughput stops following the offered rate
+is the bottleneck.
+
+A step is saturated when throughput falls below 90% of the offered rate,
+more than 1% of requests fail, or any operation's p95 exceeds `--slo-ms`.
+`--out` writes every step's histograms and per-service numbers as JSON.
+
+Run from the repository root:
+    python -m loadtest.run --db sqlite --rates 5 10 20 40 --duration 20
+    python -m loadtest.run --no-launch --mix chat=1 --rates 1 2 4 8
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from loadtest.launcher import Stack, add_stack_arguments, stack_from_args
+
+DEFAULT_MIX = "task_create=2,task_list=4,comment_create=2,comment_list=4,chat=1"
+# Histogram bucket upper bounds, in milliseconds
+BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+PROMPTS = [
+    "what are the comments on task {task}?",
+    "summarize the discussion on task {task}",
+    "show me the latest comments for task {task}",
+]
+
+
+@dataclass
+class Account:
+    username: str
+    token: str
+    task_ids: List[int] = field(default_factory=list)
+
+
+@dataclass
+class OperationStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def histogram(self) -> List[int]:
+        counts = [0] * (len(BOUNDS_MS) + 1)
+        for ms in self.latencies_ms:
+            counts[next((i for i, bound in enumerate(BOUNDS_MS) if ms <= bound), len(BOUNDS_MS))] += 1
+        return counts
+
+    def percentiles(self) -> Dict[str, float]:
+        samples = self.latencies_ms
+        if len(samples) < 2:
+            value = samples[0] if samples else float("nan")
+            return {"p50": value, "p95": value, "p99": value, "max": value}
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+        return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98], "max": max(samples)}
+
+
+# ─────────────────────────────
+# Operations
+# ─────────────────────────────
+async def task_create(client, urls, account):
+    response = await client.post(
+        f"{urls['core']}/tasks/",
+        json={"title": f"load test {random.randrange(10**6)}", "description": "created by loadtest"},
+        headers=_auth(account),
+    )
+    if response.status_code == 201:
+        account.task_ids.append(response.json()["id"])
+    return response
+
+
+async def task_list(client, urls, account):
+    return await client.get(f"{urls['core']}/tasks/", headers=_auth(account))
+
+
+async def comment_create(client, urls, account):
+    return await client.post(
+        f"{urls['comment']}/api/v1/comments/",
+        json={"content": f"load test comment {random.randrange(10**6)}", "entity_id": random.choice(account.task_ids)},
+        headers=_auth(account),
+    )
+
+
+async def comment_list(client, urls, account):
+    return await client.get(
+        f"{urls['comment']}/api/v1/comments/",
+        params={"entity_id": random.choice(account.task_ids)},
+        headers=_auth(account),
+    )
+
+
+async def chat(client, urls, account):
+    prompt = random.choice(PROMPTS).format(task=random.choice(account.task_ids))
+    return await client.post(f"{urls['ai']}/api/v1/chat/", json={"text": prompt}, headers=_auth(account))
+
+
+async def task_feed(client, urls, account):
+    return await client.get(f"{urls['ai']}/api/v1/tasks/", params={"page_size": 20}, headers=_auth(account))
+
+
+OPERATIONS = {
+    "task_create": task_create,
+    "task_list": task_list,
+    "comment_create": comment_create,
+    "comment_list": comment_list,
+    "chat": chat,
+    "task_feed": task_feed,
+}
+
+
+def _auth(account: Account) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {account.token}"}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def create_accounts(client: httpx.AsyncClient, urls, users: int, tasks_per_user: int) -> List[Account]:
+    run = random.randrange(10**6)
+
+    async def one(i: int) -> Account:
+        username, password = f"load{run}_{i}", "Load-test-password-1"
+        response = await client.post(
+            f"{urls['core']}/users/register/",
+            json={"username": username, "email": f"{username}@example.com", "password": password, "password2": password},
+        )
+        response.raise_for_status()
+        response = await client.post(f"{urls['core']}/users/login/", json={"username": username, "password": password})
+        response.raise_for_status()
+        account = Account(username, response.json()["access"])
+        for _ in range(tasks_per_user):
+            (await task_create(client, urls, account)).raise_for_status()
+        return account
+
+    return list(await asyncio.gather(*(one(i) for i in range(users))))
+
+
+# ─────────────────────────────
+# Server-side metrics
+# ─────────────────────────────
+_SAMPLE = re.compile(r'^span_duration_seconds_(sum|count)\{(.*)\} ([0-9.eE+-]+)$')
+
+
+async def scrape(client: httpx.AsyncClient, urls) -> Dict[str, Dict[str, float]]:
+    """Busy seconds and span counts per service (and per ai-service span kind)"""
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: {"sum": 0.0, "count": 0.0})
+    for service in ("core", "comment", "ai"):
+        try:
+            text = (await client.get(f"{urls[service]}/metrics")).text
+        except httpx.HTTPError:
+            continue
+        for line in text.splitlines():
+            match = _SAMPLE.match(line)
+            if not match:
+                continue
+            kind, labels, value = match.groups()
+            labels = dict(re.findall(r'(\w+)="([^"]*)"', labels))
+            if labels.get("route", "").rstrip("/").endswith("metrics"):
+                continue
+            name = service if labels["span"] == "http" else f"{service}:{labels['span']}"
+            if labels["span"] in ("http", "llm.chat", "mcp.call_tool"):
+                totals[name][kind] += float(value)
+    return totals
+
+
+# ─────────────────────────────
+# Load steps
+# ─────────────────────────────
+async def run_step(client, urls, accounts, weights, rate: float, duration: float, max_in_flight: int) -> Dict:
+    stats: Dict[str, OperationStats] = defaultdict(OperationStats)
+    names, shares = list(weights), list(weights.values())
+    pending = set()
+    dropped = 0
+
+    async def one(name: str):
+        account = random.choice(accounts)
+        started = time.perf_counter()
+        try:
+            response = await OPERATIONS[name](client, urls, account)
+            status = str(response.status_code)
+            failed = response.status_code >= 400
+        except httpx.HTTPError as e:
+            status, failed = type(e).__name__, True
+        entry = stats[name]
+        entry.latencies_ms.append((time.perf_counter() - started) * 1000)
+        entry.statuses[status] += 1
+        entry.errors += failed
+
+    before = await scrape(client, urls)
+    started = time.perf_counter()
+    next_at = started
+    offered = 0
+    while True:
+        next_at += random.expovariate(rate)
+        if next_at - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        offered += 1
+        if len(pending) >= max_in_flight:
+            dropped += 1
+            continue
+        task = asyncio.create_task(one(random.choices(names, shares)[0]))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.wait(pending)
+    elapsed = time.perf_counter() - started
+    after = await scrape(client, urls)
+
+    services = {}
+    for name, totals in after.items():
+        busy = totals["sum"] - before.get(name, {}).get("sum", 0.0)
+        count = totals["count"] - before.get(name, {}).get("count", 0.0)
+        if count:
+            services[name] = {
+                "requests": int(count),
+                "mean_ms": busy / count * 1000,
+                "in_flight": busy / elapsed,
+            }
+
+    completed = sum(len(s.latencies_ms) for s in stats.values())
+    errors = sum(s.errors for s in stats.values())
+    return {
+        "rate": rate,
+        "offered_per_s": offered / duration,
+        "completed_per_s": completed / elapsed,
+        "elapsed_s": elapsed,
+        "errors": errors,
+        "error_rate": errors / completed if completed else 0.0,
+        "dropped": dropped,
+        "operations": {
+            name: {
+                "count": len(s.latencies_ms),
+                "errors": s.errors,
+                "statuses": dict(s.statuses),
+                **s.percentiles(),
+                "histogram": dict(zip([*map(str, BOUNDS_MS), "+Inf"], s.histogram())),
+            }
+            for name, s in sorted(stats.items())
+        },
+        "services": services,
+    }
+
+
+def is_saturated(step: Dict, slo_ms: float) -> List[str]:
+    reasons = []
+    if step["completed_per_s"] < 0.9 * step["offered_per_s"]:
+        reasons.append(f"throughput {step['completed_per_s']:.1f}/s of {step['offered_per_s']:.1f}/s offered")
+    if step["error_rate"] > 0.01:
+        reasons.append(f"{step['error_rate']:.1%} errors")
+    if step["dropped"]:
+        reasons.append(f"{step['dropped']} arrivals dropped at the client in-flight cap")
+    slow = [name for name, op in step["operations"].items() if op["p95"] > slo_ms]
+    if slow:
+        reasons.append(f"p95 over {slo_ms:.0f} ms for {', '.join(slow)}")
+    return reasons
+
+
+def print_step(step: Dict):
+    print(
+        f"\n── {step['rate']:g}/s offered: {step['offered_per_s']:.1f}/s arrived, "
+        f"{step['completed_per_s']:.1f}/s completed, {step['error_rate']:.1%} errors, {step['dropped']} dropped"
+    )
+    print(f"  {'operation':<15} {'count':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, op in step["operations"].items():
+        print(
+            f"  {name:<15} {op['count']:>6} {op['errors']:>6} {op['p50']:>8.0f} "
+            f"{op['p95']:>8.0f} {op['p99']:>8.0f} {op['max']:>8.0f}"
+        )
+    print(f"  {'service':<20} {'requests':>8} {'mean ms':>8} {'in flight':>9}")
+    for name, service in sorted(step["services"].items()):
+        print(f"  {name:<20} {service['requests']:>8} {service['mean_ms']:>8.1f} {service['in_flight']:>9.2f}")
+
+
+def print_histograms(step: Dict):
+    print(f"\nLatency histograms at {step['rate']:g}/s (ms upper bound: count)")
+    for name, op in step["operations"].items():
+        peak = max(op["histogram"].values()) or 1
+        print(f"  {name}")
+        for bound, count in op["histogram"].items():
+            if count:
+                print(f"    {bound:>6} {count:>6} {'█' * max(1, round(30 * count / peak))}")
+
+
+def print_saturation(steps: List[Dict], slo_ms: float):
+    print("\nSaturation report")
+    saturated = None
+    for step in steps:
+        reasons = is_saturated(step, slo_ms)
+        print(f"  {step['rate']:>6g}/s  {'SATURATED: ' + '; '.join(reasons) if reasons else 'ok'}")
+        if reasons and saturated is None:
+            saturated = step
+    if saturated is None:
+        print("  No step saturated; raise --rates to find the limit.")
+        return
+
+    # Compare in-flight requests per service against the last healthy step
+    index = steps.index(saturated)
+    baseline = steps[index - 1]["services"] if index else {}
+    growth = {
+        name: service["in_flight"] - baseline.get(name, {}).get("in_flight", 0.0)
+        for name, service in saturated["services"].items()
+        if ":" not in name
+    }
+    if growth:
+        bottleneck = max(growth, key=growth.get)
+        print(
+            f"  Likely bottleneck at {saturated['rate']:g}/s: {bottleneck} "
+            f"(in flight grew by {growth[bottleneck]:.2f}, "
+            f"mean {saturated['services'][bottleneck]['mean_ms']:.0f} ms per request)"
+        )
+        for name, service in sorted(saturated["services"].items()):
+            if name.startswith(f"{bottleneck}:"):
+                print(f"    {name}: {service['in_flight']:.2f} in flight, mean {service['mean_ms']:.0f} ms")
+
+
+async def load_test(urls: Dict[str, str], args) -> List[Dict]:
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        accounts = await create_accounts(client, urls, args.users, args.tasks_per_user)
+        print(f"Created {len(accounts)} users with {args.tasks_per_user} tasks each")
+        steps = []
+        for rate in args.rates:
+            step = await run_step(client, urls, accounts, weights, rate, args.duration, args.max_in_flight)
+            print_step(step)
+            steps.append(step)
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    parser.add_argument("--no-launch", action="store_true", help="use services already running on the default ports")
+    parser.add_argument("--rates", type=float, nargs="+", default=[5, 10, 20, 40], help="requests per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per rate step")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation=weight,...")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tasks-per-user", type=int, default=3)
+    parser.add_argument("--max-in-flight", type=int, default=500, help="client-side cap on open requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 latency target per operation")
+    parser.add_argument("--seed", type=int, help="random seed for arrivals and operation choice")
+    parser.add_argument("--out", help="write the full report as JSON")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    stack: Optional[Stack] = None
+    if args.no_launch:
+        urls = Stack().urls
+    else:
+        stack = stack_from_args(args)
+        stack.start()
+        urls = stack.urls
+    try:
+        steps = asyncio.run(load_test(urls, args))
+    finally:
+        if stack:
+            stack.stop()
+
+    print_histograms(steps[-1])
+    print_saturation(steps, args.slo_ms)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"mix": parse_mix(args.mix), "db": args.db, "steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cold-start benchmark of each service.
+
+Measures, over `--runs` restarts of every service:
+- import: a fresh interpreter importing the service's app module
+- listen: from spawning the process until its port accepts connections
+- ready: until its readiness URL returns 200, or the port opens for
+  services without one
+
+The rest of the stack stays up while one service restarts. ai-service's
+ready time therefore includes MCP discovery and LLM warm-up against the
+fake LLM. `--legacy` adds rows for the old start-up behaviour:
+- ai-service with STARTUP_BLOCKING, which listens only after tools load
+- comment with DB_CREATE_ON_STARTUP, which runs create_all on every boot
+
+Run from the repository root:
+    python -m loadtest.startup --runs 5 --legacy
+"""
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List
+
+from loadtest.launcher import add_stack_arguments, stack_from_args, Stack
+
+IMPORTS = {
+    "core": "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_app.settings'); "
+            "import django; django.setup(); import django_app.urls",
+    "comment": "import comment.main",
+    "mcp": "import server",
+    "llm": "import benchmarks.fake_ollama",
+    "ai": "import app.main",
+}
+
+LEGACY = {
+    "ai (blocking)": ("ai", {"STARTUP_BLOCKING": "true"}),
+    "comment (create_all)": ("comment", {"DB_CREATE_ON_STARTUP": "true"}),
+}
+
+
+def import_time(stack: Stack, name: str, env: Dict[str, str]) -> float:
+    service = stack.services()[name]
+    code = f"import time; started = time.perf_counter(); {IMPORTS[name]}; print(time.perf_counter() - started)"
+    result = subprocess.run(
+        [stack.python, "-c", code], cwd=service.cwd, env={**service.env, **env},
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(stack: Stack, name: str, runs: int, env: Dict[str, str]) -> Dict[str, List[float]]:
+    samples = {"import": [], "listen": [], "ready": []}
+    for _ in range(runs):
+        samples["import"].append(import_time(stack, name, env))
+        stack.terminate(name)
+        listening, ready = stack.spawn(name, **env)
+        samples["listen"].append(listening)
+        samples["ready"].append(ready)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--legacy", action="store_true", help="also measure the old blocking start-up paths")
+    args = parser.parse_args()
+
+    rows = {name: (name, {}) for name in IMPORTS}
+    if args.legacy:
+        rows.update(LEGACY)
+
+    results = {}
+    with stack_from_args(args) as stack:
+        for label, (name, env) in rows.items():
+            results[label] = measure(stack, name, args.runs, env)
+        # Put the default configuration back for anything that follows
+        if args.legacy:
+            for name in {name for name, _ in LEGACY.values()}:
+                stack.terminate(name)
+                stack.spawn(name)
+
+    print(f"\n{'service':<22} {'import ms':>10} {'listen ms':>10} {'ready ms':>10}   (median of {args.runs})")
+    for label, samples in results.items():
+        print(
+            f"{label:<22} {statistics.median(samples['import']) * 1000:>10.0f} "
+            f"{statistics.median(samples['listen']) * 1000:>10.0f} "
+            f"{statistics.median(samples['ready']) * 1000:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
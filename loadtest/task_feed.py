@@ -0,0 +1,139 @@
+"""
+Page render latency: client-side N+1 vs the server-side task feed.
+
+Brings the stack up with the launcher and registers one user with
+`--tasks` tasks, each with `--comments` comments. It then times rendering
+one page of `--page-size` tasks with their comments, in four ways:
+
+    n+1 serial      GET core /tasks/?page=, then GET comment per task in turn
+    n+1 parallel    the same, with the comment requests issued at once over
+                    6 connections per host (what a browser allows)
+    feed            GET ai /api/v1/tasks/ (core page + one batched comment query)
+    feed cached     the same with TASK_FEED_CACHE_TTL set, after one warm-up
+
+Each pattern renders `--iterations` pages, cycling through the pages of
+the user's tasks. The report lists p50/p95 latency and the number of HTTP
+requests the client made per page.
+
+Run from the repository root:
+    python -m loadtest.task_feed --tasks 200 --comments 5 --page-size 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from loadtest.launcher import add_stack_arguments, stack_from_args
+from loadtest.run import Account, _auth, create_accounts
+
+BROWSER_CONNECTIONS_PER_HOST = 6
+
+
+async def seed_comments(client: httpx.AsyncClient, urls, account: Account, per_task: int):
+    gate = asyncio.Semaphore(20)
+
+    async def one(task_id: int, i: int):
+        async with gate:
+            response = await client.post(
+                f"{urls['comment']}/api/v1/comments/",
+                json={"content": f"comment {i} on task {task_id}", "entity_id": task_id},
+                headers=_auth(account),
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(one(task_id, i) for task_id in account.task_ids for i in range(per_task)))
+
+
+async def task_page(client, urls, account, page: int, page_size: int) -> List[Dict]:
+    response = await client.get(
+        f"{urls['core']}/tasks/", params={"page": page, "page_size": page_size}, headers=_auth(account)
+    )
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+async def comments_of(client, urls, account, task_id: int) -> List[Dict]:
+    response = await client.get(
+        f"{urls['comment']}/api/v1/comments/", params={"entity_id": task_id}, headers=_auth(account)
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def n_plus_one_serial(client, urls, account, page, page_size) -> int:
+    tasks = await task_page(client, urls, account, page, page_size)
+    for task in tasks:
+        await comments_of(client, urls, account, task["id"])
+    return 1 + len(tasks)
+
+
+async def n_plus_one_parallel(client, urls, account, page, page_size) -> int:
+    tasks = await task_page(client, urls, account, page, page_size)
+    await asyncio.gather(*(comments_of(client, urls, account, task["id"]) for task in tasks))
+    return 1 + len(tasks)
+
+
+async def feed(client, urls, account, page, page_size) -> int:
+    response = await client.get(
+        f"{urls['ai']}/api/v1/tasks/", params={"page": page, "page_size": page_size}, headers=_auth(account)
+    )
+    response.raise_for_status()
+    return 1
+
+
+async def measure(
+    render: Callable[..., Awaitable[int]], urls, account: Account, pages: int, args
+) -> Dict[str, float]:
+    limits = httpx.Limits(max_connections=BROWSER_CONNECTIONS_PER_HOST)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        # One untimed page opens the connections, as an already-loaded app would have
+        await render(client, urls, account, 1, args.page_size)
+        latencies, requests = [], 0
+        for i in range(args.iterations):
+            started = time.perf_counter()
+            requests = await render(client, urls, account, i % pages + 1, args.page_size)
+            latencies.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "requests": requests}
+
+
+async def benchmark(stack, args):
+    urls = stack.urls
+    async with httpx.AsyncClient(timeout=60) as client:
+        (account,) = await create_accounts(client, urls, users=1, tasks_per_user=args.tasks)
+        await seed_comments(client, urls, account, args.comments)
+    pages = -(-args.tasks // args.page_size)
+
+    results = {
+        "n+1 serial": await measure(n_plus_one_serial, urls, account, pages, args),
+        "n+1 parallel": await measure(n_plus_one_parallel, urls, account, pages, args),
+        "feed": await measure(feed, urls, account, pages, args),
+    }
+    stack.terminate("ai")
+    stack.spawn("ai", TASK_FEED_CACHE_TTL="60")
+    results["feed cached"] = await measure(feed, urls, account, pages, args)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_stack_arguments(parser)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--comments", type=int, default=5, help="comments per task")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50, help="pages rendered per pattern")
+    args = parser.parse_args()
+
+    with stack_from_args(args) as stack:
+        results = asyncio.run(benchmark(stack, args))
+
+    print(f"\n{'pattern':<14} {'p50 ms':>9} {'p95 ms':>9} {'requests':>9}   ({args.page_size} tasks per page)")
+    for name, result in results.items():
+        print(f"{name:<14} {result['p50']:>9.1f} {result['p95']:>9.1f} {result['requests']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Tool-call throughput of the streamable-http server at different worker counts.
+
+Run from the mcp/ directory:
+    python benchmark.py --workers 1 2 4 8 --clients 32 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+def wait_for_port(host, port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"MCP server did not start on {host}:{port}")
+
+
+async def client_loop(url, deadline, token):
+    calls = 0
+    async with streamablehttp_client(url) as (read_stream, write_stream, _):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                await session.call_tool(
+                    "fetch_comments", arguments={"entity_id": 1, "token": token}
+                )
+                calls += 1
+    return calls
+
+
+async def measure(url, clients, duration, token):
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    counts = await asyncio.gather(
+        *(client_loop(url, deadline, token) for _ in range(clients))
+    )
+    return sum(counts) / (time.monotonic() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--token", default="benchmark")
+    args = parser.parse_args()
+
+    url = f"http://{args.host}:{args.port}/mcp"
+    print(f"{'workers':>8} {'calls/s':>10}")
+    for workers in args.workers:
+        env = {
+            **os.environ,
+            "TRANSPORT": "streamable-http",
+            "HOST": args.host,
+            "PORT": str(args.port),
+            "WORKERS": str(workers),
+        }
+        server = subprocess.Popen(
+            [sys.executable, "server.py"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(args.host, args.port)
+            rate = asyncio.run(measure(url, args.clients, args.duration, args.token))
+            print(f"{workers:>8} {rate:>10.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
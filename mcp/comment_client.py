@@ -1,32 +1,44 @@
 from config import settings
-import requests
+import httpx
 import logging
+import tracing
 
 logging.basicConfig(level=logging.INFO)
 
 class CommentClient:
-    _instance = None
-
-    def __new__(cls, token):
-        if cls._instance is None:
-            cls._instance = super(CommentClient, cls).__new__(cls)
-            cls._instance.base_url = settings.COMMENT_BASE_URL
-            cls._instance.token = token
-        return cls._instance
+    # One pooled async HTTP client per worker process; the token is per call
+    # so a single client can safely serve every user. Async so a slow
+    # comment service never blocks the event loop the tools run on.
+    _http = httpx.AsyncClient(timeout=settings.COMMENT_TIMEOUT)
+
+    def __init__(self, token):
+        self.base_url = settings.COMMENT_BASE_URL
+        self.token = token
+
+    async def _request(self, method, path, **kwargs):
+        """Send one request to the comment service inside a `comment.http` span"""
+        with tracing.span("comment.http", method=method, route=path) as span:
+            response = await self._http.request(method, f"{self.base_url}{path}", **kwargs)
+            span.set(status_code=response.status_code, response_bytes=len(response.content))
+            if response.status_code >= 500:
+                span.status = "error"
+            return response
     
-    def fetch_comments(self, entity_id):
+    async def fetch_comments(self, entity_id):
         headers = {
             "Authorization": f"Bearer {self.token}"
         }
 
-        response = requests.get(
-            f"{self.base_url}/api/v1/comments/?entity_id={entity_id}",
+        response = await self._request(
+            "GET",
+            "/api/v1/comments/",
+            params={"entity_id": entity_id},
             headers=headers
         )
         
         return response.text
     
-    def create_comment(self, entity_id, content):
+    async def create_comment(self, entity_id, content):
         headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json"
@@ -37,11 +49,29 @@ class CommentClient:
             "entity_id": entity_id
         }
 
-        response = requests.post(
-            f"{self.base_url}/api/v1/comments/",
+        response = await self._request(
+            "POST",
+            "/api/v1/comments/",
             headers=headers,
             json=body
         )
         
         return response.text
-    
+
+    async def search_comments(self, query, entity_ids=None, page=1):
+        headers = {
+            "Authorization": f"Bearer {self.token}"
+        }
+
+        params = {"q": query, "page": page}
+        if entity_ids:
+            params["entity_ids"] = entity_ids
+
+        response = await self._request(
+            "GET",
+            "/api/v1/comments/search",
+            params=params,
+            headers=headers
+        )
+
+        return response.text
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +7,15 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
 
     COMMENT_BASE_URL:str
+    COMMENT_TIMEOUT: float = 30.0  # seconds per request to the comment service
+
+    HOST: str = "127.0.0.1"
+    PORT: int = 8001
+    TRANSPORT: str = "sse"  # "sse" or "streamable-http"
+    WORKERS: int = 1  # Only used with streamable-http; SSE sessions live in one process
+
+    # Tracing (spans are always exported at /metrics)
+    TRACE_JSONL_PATH: Optional[str] = None  # also append every finished span here as JSON
 
 
 settings = Settings()
@@ -1,12 +1,21 @@
 # server.py
 from mcp.server.fastmcp import FastMCP
+import uvicorn
 from pydantic import Field
+from starlette.responses import PlainTextResponse
+from typing import List, Optional
 from comment_client import CommentClient
+from config import settings
+import tracing
 
+# Tools keep no per-connection state, so with streamable-http every request
+# can be served by any worker process behind the same port.
 mcp = FastMCP(
     "Comment MCP",
-    host="127.0.0.1",
-    port=8001,
+    host=settings.HOST,
+    port=settings.PORT,
+    stateless_http=True,
+    json_response=True,
 )
 
 
@@ -17,7 +26,7 @@ async def get_comments(
 ):
     try:
         cc = CommentClient(token=token)
-        return cc.fetch_comments(entity_id=entity_id)
+        return await cc.fetch_comments(entity_id=entity_id)
     except Exception as e:
         return {"error": str(e), "entity_id": entity_id}
 
@@ -30,10 +39,49 @@ async def get_comments(
 ):
     try:
         cc = CommentClient(token=token)
-        return cc.create_comment(entity_id=entity_id, content=content)
+        return await cc.create_comment(entity_id=entity_id, content=content)
     except Exception as e:
         return {"error": str(e), "entity_id": entity_id}
 
 
+@mcp.tool(
+    name="search_comments",
+    description="Search the text of comments the user wrote, best match first, "
+    "optionally only on the given entities",
+)
+async def search_comments(
+    query: str = Field(description="Words to look for"),
+    token: str = Field(description="Access token of user"),
+    entity_ids: Optional[List[int]] = Field(default=None, description="Only search comments on these entity ids"),
+    page: int = Field(default=1, description="Page of 20 results, starting at 1"),
+):
+    try:
+        cc = CommentClient(token=token)
+        return await cc.search_comments(query=query, entity_ids=entity_ids, page=page)
+    except Exception as e:
+        return {"error": str(e), "query": query}
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics(request):
+    """Span metrics of this process in the Prometheus text format"""
+    return PlainTextResponse(tracing.render_metrics())
+
+
+def create_app():
+    """ASGI app factory used by each uvicorn worker"""
+    return tracing.TracingMiddleware(mcp.streamable_http_app())
+
+
 if __name__ == "__main__":
-    mcp.run(transport="sse")
+    if settings.TRANSPORT == "streamable-http":
+        uvicorn.run(
+            "server:create_app",
+            factory=True,
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS,
+        )
+    else:
+        # What mcp.run(transport="sse") serves, wrapped in the tracing middleware
+        uvicorn.run(tracing.TracingMiddleware(mcp.sse_app()), host=settings.HOST, port=settings.PORT)
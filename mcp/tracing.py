@@ -0,0 +1,15 @@
+"""
+Tracing for the MCP server, configured from its settings.
+
+Spans, /metrics and the HTTP middleware come from the shared
+observability package (observability/, installed from
+observability/pyproject.toml).
+"""
+from observability.asgi import TracingMiddleware
+from observability.tracing import Span, configure, observe, render_metrics, span
+
+from config import settings
+
+__all__ = ["Span", "TracingMiddleware", "observe", "render_metrics", "span"]
+
+configure(jsonl_path=settings.TRACE_JSONL_PATH)
@@ -0,0 +1,13 @@
+"""
+Tracing shared by every service in this repository.
+
+observability.tracing holds the spans and their exporters (Prometheus text
+for /metrics and an optional JSONL file); observability.asgi holds the
+HTTP middleware for the ASGI services. Each service keeps a small
+`tracing` module of its own that configures these from its settings and,
+for Django, adds its own middleware.
+
+It is an installable project of its own (observability/pyproject.toml);
+each service installs it as a path dependency, e.g.
+    pip install ./observability
+"""
@@ -0,0 +1,38 @@
+"""HTTP middleware for the ASGI services (FastAPI, Starlette)."""
+from .tracing import span
+
+
+class TracingMiddleware:
+    """ASGI middleware that wraps each HTTP request, body included, in a span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        with span("http", method=scope["method"], path=scope["path"]) as current:
+            sizes = {"request_bytes": 0, "response_bytes": 0}
+
+            async def counting_receive():
+                message = await receive()
+                sizes["request_bytes"] += len(message.get("body", b""))
+                return message
+
+            async def counting_send(message):
+                if message["type"] == "http.response.start":
+                    current.set(status_code=message["status"])
+                    if message["status"] >= 500:
+                        current.status = "error"
+                elif message["type"] == "http.response.body":
+                    sizes["response_bytes"] += len(message.get("body", b""))
+                await send(message)
+
+            try:
+                await self.app(scope, counting_receive, counting_send)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    current.set(route=getattr(route, "path", scope["path"]))
+                current.set(**sizes)
@@ -0,0 +1,169 @@
+"""
+Spans, and their export as Prometheus metrics and JSON lines.
+
+`span` times a block as a span nested under the current one, using a
+context variable, so nesting follows asyncio tasks and threads. Every
+finished span is added to the histograms `render_metrics` returns and,
+once `configure` has been given a path, appended to that file as JSON.
+"""
+import json
+import logging
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger("Tracing")
+
+# Histogram buckets for span durations, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Span attributes that become Prometheus labels; keep them low-cardinality
+LABELS = ("method", "route", "tool", "backend", "priority")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    duration_ms: float = 0.0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a span nested under the current one
+
+    Numeric attributes ending in `_bytes` or `_tokens` are also summed into
+    the Prometheus counters, so record sizes with those suffixes.
+    """
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(8),
+        span_id=secrets.token_hex(4),
+        parent_id=parent.span_id if parent else None,
+        start=time.time(),
+        attributes=attributes,
+    )
+    token = _current.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass  # finalized from another context, e.g. an abandoned async generator
+        _record(current)
+
+
+def observe(name: str, seconds: float, status: str = "ok", **attributes: Any) -> Span:
+    """Record a duration measured elsewhere, e.g. time spent waiting in a queue, as a finished span"""
+    parent = _current.get()
+    finished = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(8),
+        span_id=secrets.token_hex(4),
+        parent_id=parent.span_id if parent else None,
+        start=time.time() - seconds,
+        duration_ms=round(seconds * 1000, 3),
+        status=status,
+        attributes=attributes,
+    )
+    _record(finished)
+    return finished
+
+
+# ─────────────────────────────
+# Exporters
+# ─────────────────────────────
+class _Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets: Dict[tuple, list] = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.sums: Dict[tuple, float] = defaultdict(float)
+        self.counters: Dict[tuple, float] = defaultdict(float)
+
+    def observe(self, s: Span):
+        labels = [("span", s.name)]
+        labels += [(label, s.attributes[label]) for label in LABELS if label in s.attributes]
+        key = ",".join(f'{label}="{value}"' for label, value in labels)
+        seconds = s.duration_ms / 1000
+        with self.lock:
+            self.buckets[(key, s.status)][bisect_left(BUCKETS, seconds)] += 1
+            self.sums[(key, s.status)] += seconds
+            for attribute, value in s.attributes.items():
+                if isinstance(value, (int, float)) and attribute.endswith(("_bytes", "_tokens")):
+                    self.counters[(key, attribute)] += value
+
+    def render(self) -> str:
+        lines = ["# TYPE span_duration_seconds histogram"]
+        with self.lock:
+            for (key, status), counts in sorted(self.buckets.items()):
+                labels = f'{key},status="{status}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, counts):
+                    cumulative += count
+                    lines.append(f'span_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                cumulative += counts[-1]
+                lines.append(f'span_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+                lines.append(f"span_duration_seconds_sum{{{labels}}} {self.sums[(key, status)]}")
+                lines.append(f"span_duration_seconds_count{{{labels}}} {cumulative}")
+            lines.append("# TYPE span_attribute_total counter")
+            for (key, attribute), value in sorted(self.counters.items()):
+                lines.append(f'span_attribute_total{{{key},attribute="{attribute}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = _Metrics()
+_jsonl_lock = threading.Lock()
+_jsonl_file = None
+_jsonl_path: Optional[str] = None
+
+
+def configure(jsonl_path: Optional[str] = None):
+    """Also append every finished span to `jsonl_path` as JSON, if set"""
+    global _jsonl_path
+    _jsonl_path = jsonl_path
+
+
+def _record(s: Span):
+    metrics.observe(s)
+    if _jsonl_path:
+        _write_jsonl(s)
+    logger.debug(f"span {s.name} {s.duration_ms}ms {s.attributes}")
+
+
+def _write_jsonl(s: Span):
+    global _jsonl_file
+    line = json.dumps(asdict(s), default=str)
+    with _jsonl_lock:
+        if _jsonl_file is None:
+            _jsonl_file = open(_jsonl_path, "a", buffering=1)
+        _jsonl_file.write(line + "\n")
+
+
+def render_metrics() -> str:
+    """Span metrics in the Prometheus text exposition format"""
+    return metrics.render()